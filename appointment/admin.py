@@ -2,3 +2,5 @@ from django.contrib import admin
 from appointment import models
 
 admin.site.register(models.Appointment)
+admin.site.register(models.DoctorSchedule)
+admin.site.register(models.AppointmentSeries)
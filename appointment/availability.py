@@ -0,0 +1,154 @@
+"""Free appointment slots computed from doctor schedules and booked appointments.
+
+Times are handled as minutes since midnight. For each doctor and day the
+working hours are merged into intervals, the booked appointments are
+subtracted with one sweep over both sorted lists, and the free intervals are
+cut into slots on the schedule's grid (e.g. every 15 minutes from 09:00).
+"""
+
+from collections import defaultdict
+from datetime import time, timedelta
+from django.db.models import Q
+from django.utils import timezone
+from appointment.models import Appointment, DoctorSchedule
+from appointment.recurrence import series_intervals
+
+# Longest date range a single availability request may cover.
+MAX_DAYS = 62
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals):
+    """Return sorted, non-overlapping (start, end) intervals covering the same minutes."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(free, busy):
+    """Return the parts of the sorted intervals ``free`` not covered by the sorted intervals ``busy``."""
+    result = []
+    index = 0
+    for start, end in free:
+        # Skip bookings that end before this interval.
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+        cursor = start
+        scan = index
+        while scan < len(busy) and busy[scan][0] < end:
+            if busy[scan][0] > cursor:
+                result.append((cursor, busy[scan][0]))
+            cursor = max(cursor, busy[scan][1])
+            scan += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def cut_slots(shift, free, step, duration):
+    """Return the slot start times on ``shift``'s grid of ``step`` minutes that fit in ``free``."""
+    slots = []
+    for start, end in free:
+        if end <= shift[0] or start >= shift[1]:
+            continue
+        offset = max(0, start - shift[0])
+        slot = shift[0] + -(-offset // step) * step
+        while slot + duration <= min(end, shift[1]):
+            slots.append(slot)
+            slot += step
+    return slots
+
+
+def schedules_for(start, end, doctor_ids=None, clinic_id=None):
+    """Return the schedules of the given doctors (or of the clinic) that apply between two dates."""
+    schedules = DoctorSchedule.objects.filter(
+        Q(schedule_valid_from__isnull=True) | Q(schedule_valid_from__lte=end),
+        Q(schedule_valid_until__isnull=True) | Q(schedule_valid_until__gte=start),
+    )
+    if doctor_ids:
+        schedules = schedules.filter(schedule_doctor__in=doctor_ids)
+    if clinic_id:
+        schedules = schedules.filter(
+            Q(schedule_clinic=clinic_id)
+            | Q(schedule_clinic__isnull=True, schedule_doctor__doctor_clinic=clinic_id))
+    return list(schedules)
+
+
+def booked_intervals(doctor_ids, start, end):
+    """Return {(doctor id, date): sorted busy (start, end) minutes} for the non-cancelled appointments.
+
+    Occurrences of appointment series are included without storing them.
+    """
+    rows = (Appointment.objects
+            .filter(appointment_doctor__in=doctor_ids,
+                    appointment_date__gte=start, appointment_date__lte=end)
+            .exclude(appointment_status=Appointment.Status.CANCELLED)
+            .values_list("appointment_doctor", "appointment_date", "appointment_time", "appointment_duration"))
+    busy = series_intervals(doctor_ids, start, end)
+    for doctor_id, day, start_time, duration in rows:
+        minutes = to_minutes(start_time)
+        busy[(doctor_id, day)].append((minutes, minutes + duration))
+    return {key: merge_intervals(intervals) for key, intervals in busy.items()}
+
+
+def find_availability(start, end, doctor_ids=None, clinic_id=None, duration=None, now=None):
+    """Return the free slots of doctors between two dates (inclusive).
+
+    Runs a handful of queries, for the schedules, the booked appointments
+    and the appointment series, whatever the length of the range. Slots are ``duration``
+    minutes long, or the schedule's slot length. Slots already in the past
+    are left out.
+    :returns: list of ``{"doctor", "date", "slots"}`` for each doctor and day
+        with at least one free slot, ordered by doctor and date
+    """
+    now = timezone.localtime(now)
+    schedules = schedules_for(start, end, doctor_ids, clinic_id)
+    busy = booked_intervals({schedule.schedule_doctor_id for schedule in schedules}, start, end)
+
+    by_weekday = defaultdict(list)
+    for schedule in schedules:
+        by_weekday[(schedule.schedule_doctor_id, schedule.schedule_weekday)].append(schedule)
+
+    availability = []
+    doctors = sorted({schedule.schedule_doctor_id for schedule in schedules})
+    for doctor_id in doctors:
+        day = start
+        while day <= end:
+            shifts = [
+                schedule for schedule in by_weekday[(doctor_id, day.weekday())]
+                if (schedule.schedule_valid_from is None or schedule.schedule_valid_from <= day)
+                and (schedule.schedule_valid_until is None or schedule.schedule_valid_until >= day)
+            ]
+            if shifts:
+                working = merge_intervals(
+                    (to_minutes(shift.schedule_start), to_minutes(shift.schedule_end)) for shift in shifts)
+                free = subtract_intervals(working, busy.get((doctor_id, day), []))
+                slots = set()
+                for shift in shifts:
+                    slots.update(cut_slots(
+                        (to_minutes(shift.schedule_start), to_minutes(shift.schedule_end)), free,
+                        shift.schedule_slot_minutes, duration or shift.schedule_slot_minutes))
+                if day == now.date():
+                    slots = {slot for slot in slots if slot >= to_minutes(now)}
+                elif day < now.date():
+                    slots = set()
+                if slots:
+                    availability.append({
+                        "doctor": doctor_id,
+                        "date": day,
+                        "slots": [to_time(slot) for slot in sorted(slots)],
+                    })
+            day += timedelta(days=1)
+    return availability
+
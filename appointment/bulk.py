@@ -0,0 +1,155 @@
+"""Creating, updating and cancelling many appointments in one request."""
+
+from django.db import IntegrityError, connection, transaction
+from rest_framework import serializers
+from appointment.models import Appointment
+from appointment.recurrence import lock_doctors, overlaps_series
+from appointment.schedule import refresh_entries
+from appointment.serializers import (
+    DOUBLE_BOOKING_CONSTRAINT, AppointmentConflict, AppointmentSerializer, is_double_booking)
+from clinic.models import Clinic
+from users.models import Patient, Doctor
+
+# Most operations accepted in one bulk request.
+MAX_ITEMS = 500
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField looking up objects loaded beforehand into ``context["prefetched"]``."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        instance = self.context["prefetched"][self.queryset.model].get(pk)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
+
+
+class BulkAppointmentSerializer(AppointmentSerializer):
+    """Validates one bulk operation against the prefetched patients, doctors and clinics."""
+    appointment_patient = PrefetchedPrimaryKeyRelatedField(
+        queryset=Patient.objects.all())
+    appointment_doctor = PrefetchedPrimaryKeyRelatedField(
+        queryset=Doctor.objects.all())
+    appointment_clinic = PrefetchedPrimaryKeyRelatedField(
+        queryset=Clinic.objects.all(),
+        required=False)
+
+
+def referenced_ids(items, field):
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item[field]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return ids
+
+
+def prefetch(items):
+    """Load every appointment, patient, doctor and clinic the items refer to, one query per model."""
+    prefetched = {}
+    for model, field in [(Appointment, "appointment_id"), (Patient, "appointment_patient"),
+                         (Doctor, "appointment_doctor"), (Clinic, "appointment_clinic")]:
+        ids = referenced_ids(items, field)
+        prefetched[model] = model.objects.in_bulk(ids) if ids else {}
+    return prefetched
+
+
+class BulkAppointments:
+    """A list of operations on appointments, validated together and applied in one transaction.
+
+    Items with an ``appointment_id`` update that appointment (only the given
+    fields; cancel by setting ``appointment_status`` to ``CANCELLED``), other
+    items create an appointment. Nothing is applied unless every item is valid.
+    """
+
+    def __init__(self, items, request):
+        self.items = items
+        self.request = request
+        self.errors = []
+        self.creates = []
+        self.updates = []
+        self.update_fields = set()
+
+    def is_valid(self):
+        """Validate every item, collecting ``{"index", "errors"}`` for the invalid ones."""
+        if not isinstance(self.items, list) or not self.items:
+            self.errors.append({"index": None, "errors": ["Expected a non-empty list of appointments."]})
+            return False
+        if len(self.items) > MAX_ITEMS:
+            self.errors.append({"index": None, "errors": [f"At most {MAX_ITEMS} appointments per request."]})
+            return False
+        if not all(isinstance(item, dict) for item in self.items):
+            self.errors.append({"index": None, "errors": ["Every appointment must be an object."]})
+            return False
+
+        context = {"request": self.request, "prefetched": prefetch(self.items)}
+        appointments = context["prefetched"][Appointment]
+        seen = set()
+        for index, item in enumerate(self.items):
+            instance = None
+            if "appointment_id" in item:
+                instance = appointments.get(next(iter(referenced_ids([item], "appointment_id")), None))
+                if instance is None:
+                    self.errors.append({"index": index, "errors": {"appointment_id": ["Appointment not found."]}})
+                    continue
+                if instance.pk in seen:
+                    self.errors.append({"index": index, "errors": {"appointment_id": ["Appointment given twice."]}})
+                    continue
+                seen.add(instance.pk)
+            serializer = BulkAppointmentSerializer(
+                instance, data=item, partial=instance is not None, context=context)
+            if not serializer.is_valid():
+                self.errors.append({"index": index, "errors": serializer.errors})
+            elif instance is None:
+                self.creates.append((index, Appointment(created_by=self.request.user, **serializer.validated_data)))
+            else:
+                for attr, value in serializer.validated_data.items():
+                    setattr(instance, attr, value)
+                self.update_fields.update(serializer.validated_data)
+                self.updates.append((index, instance))
+        return not self.errors
+
+    def save(self):
+        """Apply the operations with one bulk update and one bulk insert, then refresh their schedule entries.
+
+        The double booking constraint is checked once every operation is
+        applied, so appointments may swap or shift slots and a slot cancelled
+        in the request may be booked again. Raises AppointmentConflict, and
+        applies nothing, if any appointment would overlap another of its doctor.
+        :returns: list of ``{"index", "status", "data"}``, in the order of the items
+        """
+        conflict = AppointmentConflict("An appointment overlaps another appointment of its doctor.")
+        appointments = [appointment for _, appointment in self.creates + self.updates]
+        constraint = connection.ops.quote_name(DOUBLE_BOOKING_CONSTRAINT)
+        try:
+            with transaction.atomic():
+                lock_doctors({appointment.appointment_doctor_id for appointment in appointments})
+                if overlaps_series(appointments):
+                    raise conflict
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SET CONSTRAINTS {constraint} DEFERRED")
+                if self.updates:
+                    Appointment.objects.bulk_update(
+                        [appointment for _, appointment in self.updates], sorted(self.update_fields))
+                if self.creates:
+                    Appointment.objects.bulk_create([appointment for _, appointment in self.creates])
+                # Check now rather than at commit, which an enclosing transaction would postpone.
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SET CONSTRAINTS {constraint} IMMEDIATE")
+                refresh_entries(appointment_ids=[appointment.pk for appointment in appointments])
+        except IntegrityError as exc:
+            if is_double_booking(exc):
+                raise conflict
+            raise
+        results = [{"index": index, "status": 201, "data": AppointmentSerializer(appointment).data}
+                   for index, appointment in self.creates]
+        results += [{"index": index, "status": 200, "data": AppointmentSerializer(appointment).data}
+                    for index, appointment in self.updates]
+        return sorted(results, key=lambda result: result["index"])
@@ -0,0 +1,14 @@
+"""Django command to rebuild the schedule entries of every appointment."""
+
+from django.core.management.base import BaseCommand
+from appointment.models import ScheduleEntry
+from appointment.schedule import rebuild_entries
+
+
+class Command(BaseCommand):
+    """Rewrite the schedule entries, e.g. after appointments were changed with raw SQL."""
+    help = "Rebuild the doctor and clinic schedule entries from the appointments."
+
+    def handle(self, *args, **options):
+        rebuild_entries()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {ScheduleEntry.objects.count()} schedule entries."))
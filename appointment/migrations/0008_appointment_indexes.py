@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0007_appointment_appointment_comments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('appointment_status', 'CANCELLED'), _negated=True), fields=['appointment_patient', '-appointment_date', '-appointment_time', '-appointment_id'], name='appointment_patient_active'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('appointment_status', 'CANCELLED'), _negated=True), fields=['appointment_doctor', '-appointment_date', '-appointment_time', '-appointment_id'], name='appointment_doctor_active'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('appointment_status', 'CANCELLED'), _negated=True), fields=['-appointment_date', '-appointment_time', '-appointment_id'], name='appointment_active'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_auto_20220930_1859'),
+        ('clinic', '0002_auto_20220930_1700'),
+        ('appointment', '0008_appointment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='appointment_duration',
+            field=models.PositiveSmallIntegerField(default=15, help_text='Length of the appointment in minutes.'),
+        ),
+        migrations.CreateModel(
+            name='DoctorSchedule',
+            fields=[
+                ('schedule_id', models.AutoField(primary_key=True, serialize=False)),
+                ('schedule_weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('schedule_start', models.TimeField()),
+                ('schedule_end', models.TimeField()),
+                ('schedule_slot_minutes', models.PositiveSmallIntegerField(default=15)),
+                ('schedule_valid_from', models.DateField(blank=True, null=True)),
+                ('schedule_valid_until', models.DateField(blank=True, null=True)),
+                ('schedule_clinic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='clinic.clinic')),
+                ('schedule_doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='users.doctor')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='doctorschedule',
+            index=models.Index(fields=['schedule_doctor', 'schedule_weekday'], name='schedule_doctor_weekday'),
+        ),
+    ]
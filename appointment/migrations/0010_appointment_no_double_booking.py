@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:12
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0009_doctorschedule'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('appointment_status', 'CANCELLED'), _negated=True), expressions=[(django.db.models.expressions.RawSQL("int4range(appointment_doctor_id, appointment_doctor_id, '[]')", [], output_field=django.contrib.postgres.fields.ranges.IntegerRangeField()), '&&'), (django.db.models.expressions.RawSQL("tsrange(appointment_date + appointment_time, appointment_date + appointment_time + appointment_duration * interval '1 minute')", [], output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), '&&')], name='appointment_no_double_booking'),
+        ),
+    ]
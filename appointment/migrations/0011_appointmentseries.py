@@ -0,0 +1,79 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:28
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_auto_20220930_1859'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clinic', '0002_auto_20220930_1700'),
+        ('appointment', '0010_appointment_no_double_booking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('series_id', models.AutoField(primary_key=True, serialize=False)),
+                ('series_frequency', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly')], max_length=7)),
+                ('series_interval', models.PositiveSmallIntegerField(default=1)),
+                ('series_weekdays', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')]), blank=True, default=list, size=None)),
+                ('series_start', models.DateField()),
+                ('series_until', models.DateField(help_text='Date of the last occurrence, or after it.')),
+                ('series_time', models.TimeField()),
+                ('series_duration', models.PositiveSmallIntegerField(default=15, help_text='Length of each appointment in minutes.')),
+                ('series_status', models.CharField(choices=[('REQUESTED', 'Requested'), ('BOOKED', 'Booked')], default='BOOKED', max_length=15)),
+                ('series_comments', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'appointment series',
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='appointment_occurrence_date',
+            field=models.DateField(blank=True, help_text='Date of the series occurrence this appointment replaces.', null=True),
+        ),
+        migrations.AddField(
+            model_name='appointmentseries',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_series', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='appointmentseries',
+            name='series_clinic',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointment_series', to='clinic.clinic'),
+        ),
+        migrations.AddField(
+            model_name='appointmentseries',
+            name='series_doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='users.doctor'),
+        ),
+        migrations.AddField(
+            model_name='appointmentseries',
+            name='series_patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='users.patient'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='appointment_series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='appointment.appointmentseries'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentseries',
+            index=models.Index(fields=['series_doctor', 'series_until'], name='series_doctor_until'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentseries',
+            index=models.Index(fields=['series_patient', 'series_until'], name='series_patient_until'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(fields=('appointment_series', 'appointment_occurrence_date'), name='appointment_series_occurrence'),
+        ),
+    ]
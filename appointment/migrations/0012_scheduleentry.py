@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0002_auto_20220930_1700'),
+        ('users', '0009_auto_20220930_1859'),
+        ('appointment', '0011_appointmentseries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleEntry',
+            fields=[
+                ('entry_appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='schedule_entry', serialize=False, to='appointment.appointment')),
+                ('entry_patient_name', models.CharField(max_length=100)),
+                ('entry_date', models.DateField()),
+                ('entry_time', models.TimeField()),
+                ('entry_status', models.CharField(choices=[('REQUESTED', 'Requested'), ('BOOKED', 'Booked'), ('CANCELLED', 'Cancelled'), ('RESCHEDULED', 'Rescheduled'), ('ATTENDED', 'Attended')], max_length=15)),
+                ('entry_clinic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedule_entries', to='clinic.clinic')),
+                ('entry_doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_entries', to='users.doctor')),
+                ('entry_patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_entries', to='users.patient')),
+            ],
+            options={
+                'verbose_name_plural': 'schedule entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='scheduleentry',
+            index=models.Index(fields=['entry_doctor', 'entry_date', 'entry_time'], name='entry_doctor_date'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleentry',
+            index=models.Index(fields=['entry_clinic', 'entry_date', 'entry_time'], name='entry_clinic_date'),
+        ),
+        # Entries for the existing appointments.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO appointment_scheduleentry (
+                    entry_appointment_id, entry_doctor_id, entry_clinic_id, entry_patient_id,
+                    entry_patient_name, entry_date, entry_time, entry_status)
+                SELECT a.appointment_id, a.appointment_doctor_id, COALESCE(a.appointment_clinic_id, d.doctor_clinic_id),
+                       a.appointment_patient_id, p.patient_name, a.appointment_date, a.appointment_time,
+                       a.appointment_status
+                FROM appointment_appointment a
+                JOIN users_patient p ON p.patient_id = a.appointment_patient_id
+                JOIN users_doctor d ON d.doctor_id = a.appointment_doctor_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
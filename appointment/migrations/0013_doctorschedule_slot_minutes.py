@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0012_scheduleentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='doctorschedule',
+            name='schedule_slot_minutes',
+            field=models.PositiveSmallIntegerField(default=15, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:10
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.db import migrations
+import django.db.models.constraints
+import django.db.models.expressions
+
+# Pairs of non-cancelled appointments of the same doctor whose times overlap.
+OVERLAPS_SQL = """
+    SELECT a.appointment_doctor_id, a.appointment_id, b.appointment_id
+    FROM {table} a
+    JOIN {table} b ON b.appointment_doctor_id = a.appointment_doctor_id AND b.appointment_id > a.appointment_id
+    WHERE a.appointment_status <> 'CANCELLED' AND b.appointment_status <> 'CANCELLED'
+      AND tsrange(a.appointment_date + a.appointment_time,
+                  a.appointment_date + a.appointment_time + a.appointment_duration * interval '1 minute')
+       && tsrange(b.appointment_date + b.appointment_time,
+                  b.appointment_date + b.appointment_time + b.appointment_duration * interval '1 minute')
+    ORDER BY a.appointment_doctor_id, a.appointment_id, b.appointment_id
+"""
+# Overlapping pairs listed in the error.
+MAX_LISTED = 50
+# The constraint from 0010. IF EXISTS, in case 0010 was faked.
+DROP_CONSTRAINT_SQL = 'ALTER TABLE "appointment_appointment" DROP CONSTRAINT IF EXISTS "appointment_no_double_booking"'
+ADD_CONSTRAINT_SQL = """
+    ALTER TABLE "appointment_appointment" ADD CONSTRAINT "appointment_no_double_booking" EXCLUDE USING GIST (
+        (int4range(appointment_doctor_id, appointment_doctor_id, '[]')) WITH &&,
+        (tsrange(appointment_date + appointment_time,
+                 appointment_date + appointment_time + appointment_duration * interval '1 minute')) WITH &&
+    ) WHERE (NOT ("appointment_status" = 'CANCELLED'))
+"""
+
+
+def check_double_bookings(apps, schema_editor):
+    """Stop before adding the constraint if existing appointments already overlap.
+
+    They can if 0010 was faked or its constraint dropped. Which of two
+    overlapping appointments to keep is for the clinic to decide, so nothing
+    is changed: cancel or move the listed appointments and migrate again.
+    """
+    Appointment = apps.get_model('appointment', 'Appointment')
+    table = schema_editor.quote_name(Appointment._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(OVERLAPS_SQL.format(table=table))
+        overlaps = cursor.fetchall()
+    if overlaps:
+        listed = [f'doctor {doctor}: appointments {first} and {second}'
+                  for doctor, first, second in overlaps[:MAX_LISTED]]
+        if len(overlaps) > MAX_LISTED:
+            listed.append(f'and {len(overlaps) - MAX_LISTED} more')
+        raise RuntimeError(
+            f'{len(overlaps)} pair(s) of appointments overlap and would violate appointment_no_double_booking. '
+            f'Cancel or move one of each pair, then migrate again:\n' + '\n'.join(listed))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0013_doctorschedule_slot_minutes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_double_bookings, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(DROP_CONSTRAINT_SQL, ADD_CONSTRAINT_SQL)],
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='appointment',
+                    name='appointment_no_double_booking',
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(deferrable=django.db.models.constraints.Deferrable['IMMEDIATE'], expressions=[(django.db.models.expressions.RawSQL("int4range(appointment_doctor_id, appointment_doctor_id, '[]')", [], output_field=django.contrib.postgres.fields.ranges.IntegerRangeField()), '&&'), (django.db.models.expressions.RawSQL("CASE WHEN appointment_status = 'CANCELLED' THEN 'empty'::tsrange ELSE tsrange(appointment_date + appointment_time, appointment_date + appointment_time + appointment_duration * interval '1 minute') END", [], output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), '&&')], name='appointment_no_double_booking'),
+        ),
+    ]
@@ -1,9 +1,18 @@
 """Models for the Appointment Module."""
 
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import DateTimeRangeField, IntegerRangeField, RangeOperators
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.expressions import RawSQL
 from users.models import Patient, Doctor, User
 from clinic.models import Clinic
 
+# Length of an appointment, in minutes, when none is given.
+DEFAULT_DURATION = 15
+
 
 class Appointment(models.Model):
     """Appointment Model for storing appointment data."""
@@ -19,6 +28,8 @@ class Appointment(models.Model):
     appointment_id = models.AutoField(primary_key=True)
     appointment_date = models.DateField()
     appointment_time = models.TimeField()
+    appointment_duration = models.PositiveSmallIntegerField(
+        default=DEFAULT_DURATION, help_text="Length of the appointment in minutes.")
     appointment_status = models.CharField(
         choices=Status.choices, max_length=15)
     appointment_comments = models.TextField(blank=True, null=True)
@@ -32,6 +43,179 @@ class Appointment(models.Model):
     )
     created_by = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="created_by")
+    # Set when the appointment replaces (modifies or cancels) one occurrence of a series.
+    appointment_series = models.ForeignKey(
+        "AppointmentSeries", on_delete=models.SET_NULL, related_name="occurrences",
+        blank=True, null=True)
+    appointment_occurrence_date = models.DateField(
+        blank=True, null=True, help_text="Date of the series occurrence this appointment replaces.")
+
+    class Meta:
+        # Match the lists in AppointmentViewSet: not cancelled, per patient, per doctor
+        # or for all, newest first (id breaks ties for keyset pagination).
+        indexes = [
+            models.Index(
+                fields=["appointment_patient", "-appointment_date", "-appointment_time", "-appointment_id"],
+                condition=~models.Q(appointment_status="CANCELLED"),
+                name="appointment_patient_active"),
+            models.Index(
+                fields=["appointment_doctor", "-appointment_date", "-appointment_time", "-appointment_id"],
+                condition=~models.Q(appointment_status="CANCELLED"),
+                name="appointment_doctor_active"),
+            models.Index(
+                fields=["-appointment_date", "-appointment_time", "-appointment_id"],
+                condition=~models.Q(appointment_status="CANCELLED"),
+                name="appointment_active"),
+        ]
+        constraints = [
+            # No two non-cancelled appointments of a doctor may overlap. The doctor is
+            # compared as a one-value int range so the constraint needs no btree_gist.
+            # Cancelled appointments get an empty range, which overlaps nothing (a
+            # condition would keep the constraint from being deferrable). Bulk changes
+            # defer it so appointments can swap or shift slots in one transaction.
+            ExclusionConstraint(
+                name="appointment_no_double_booking",
+                expressions=[
+                    (RawSQL("int4range(appointment_doctor_id, appointment_doctor_id, '[]')", [],
+                            output_field=IntegerRangeField()), RangeOperators.OVERLAPS),
+                    (RawSQL("CASE WHEN appointment_status = 'CANCELLED' THEN 'empty'::tsrange"
+                            " ELSE tsrange(appointment_date + appointment_time, appointment_date + appointment_time"
+                            " + appointment_duration * interval '1 minute') END", [],
+                            output_field=DateTimeRangeField()), RangeOperators.OVERLAPS),
+                ],
+                deferrable=models.Deferrable.IMMEDIATE,
+            ),
+            models.UniqueConstraint(
+                fields=["appointment_series", "appointment_occurrence_date"],
+                name="appointment_series_occurrence"),
+        ]
 
     def __str__(self):
         return f"Appointment {str(self.appointment_id)}"
+
+
+class DoctorSchedule(models.Model):
+    """Weekly working hours of a doctor at a clinic, split into bookable slots."""
+
+    class Weekday(models.IntegerChoices):
+        """Days of the week, numbered like date.weekday()."""
+        MONDAY = 0, "Monday"
+        TUESDAY = 1, "Tuesday"
+        WEDNESDAY = 2, "Wednesday"
+        THURSDAY = 3, "Thursday"
+        FRIDAY = 4, "Friday"
+        SATURDAY = 5, "Saturday"
+        SUNDAY = 6, "Sunday"
+
+    schedule_id = models.AutoField(primary_key=True)
+    schedule_doctor = models.ForeignKey(
+        Doctor, on_delete=models.CASCADE, related_name="schedules")
+    schedule_clinic = models.ForeignKey(
+        Clinic, on_delete=models.CASCADE, related_name="schedules",
+        blank=True, null=True)
+    schedule_weekday = models.PositiveSmallIntegerField(choices=Weekday.choices)
+    schedule_start = models.TimeField()
+    schedule_end = models.TimeField()
+    schedule_slot_minutes = models.PositiveSmallIntegerField(
+        default=DEFAULT_DURATION, validators=[MinValueValidator(1)])
+    # Optional date range the working hours apply to, e.g. for a temporary timetable.
+    schedule_valid_from = models.DateField(blank=True, null=True)
+    schedule_valid_until = models.DateField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["schedule_doctor", "schedule_weekday"], name="schedule_doctor_weekday"),
+        ]
+
+    def clean(self):
+        if self.schedule_start >= self.schedule_end:
+            raise ValidationError({"schedule_end": "Must be after the start time."})
+
+    def __str__(self):
+        return (f"{self.schedule_doctor} {self.get_schedule_weekday_display()} "
+                f"{self.schedule_start:%H:%M}-{self.schedule_end:%H:%M}")
+
+
+class AppointmentSeries(models.Model):
+    """Appointments repeating on a rule, like an iCalendar RRULE.
+
+    Occurrences are not stored: they are expanded for the requested dates
+    (see appointment.recurrence). Modifying or cancelling one occurrence
+    stores an Appointment with ``appointment_series`` and
+    ``appointment_occurrence_date`` set, which then replaces it.
+    """
+
+    class Frequency(models.TextChoices):
+        """How often the series repeats, every ``series_interval`` days, weeks or months."""
+        DAILY = "DAILY", "Daily"
+        WEEKLY = "WEEKLY", "Weekly"
+        MONTHLY = "MONTHLY", "Monthly"
+
+    series_id = models.AutoField(primary_key=True)
+    series_frequency = models.CharField(choices=Frequency.choices, max_length=7)
+    series_interval = models.PositiveSmallIntegerField(default=1)
+    # Weekly series only; the weekday of the start date when empty.
+    series_weekdays = ArrayField(
+        models.PositiveSmallIntegerField(choices=DoctorSchedule.Weekday.choices),
+        blank=True, default=list)
+    series_start = models.DateField()
+    series_until = models.DateField(help_text="Date of the last occurrence, or after it.")
+    series_time = models.TimeField()
+    series_duration = models.PositiveSmallIntegerField(
+        default=DEFAULT_DURATION, help_text="Length of each appointment in minutes.")
+    series_status = models.CharField(
+        choices=[(Appointment.Status.REQUESTED, "Requested"), (Appointment.Status.BOOKED, "Booked")],
+        default=Appointment.Status.BOOKED, max_length=15)
+    series_comments = models.TextField(blank=True, null=True)
+    series_patient = models.ForeignKey(
+        Patient, on_delete=models.CASCADE, related_name="appointment_series")
+    series_doctor = models.ForeignKey(
+        Doctor, on_delete=models.CASCADE, related_name="appointment_series")
+    series_clinic = models.ForeignKey(
+        Clinic, on_delete=models.SET_NULL, related_name="appointment_series",
+        blank=True, null=True)
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="created_series")
+
+    class Meta:
+        verbose_name_plural = "appointment series"
+        indexes = [
+            models.Index(fields=["series_doctor", "series_until"], name="series_doctor_until"),
+            models.Index(fields=["series_patient", "series_until"], name="series_patient_until"),
+        ]
+
+    def __str__(self):
+        return f"Appointment series {str(self.series_id)}"
+
+
+class ScheduleEntry(models.Model):
+    """Compact copy of an appointment for the doctor and clinic schedules.
+
+    Kept up to date on every appointment write (see appointment.schedule),
+    with the patient's name and the clinic already resolved, so a clinic's
+    week is read from one index without joins.
+    """
+    entry_appointment = models.OneToOneField(
+        Appointment, on_delete=models.CASCADE, primary_key=True, related_name="schedule_entry")
+    entry_doctor = models.ForeignKey(
+        Doctor, on_delete=models.CASCADE, related_name="schedule_entries")
+    # The appointment's clinic, or the doctor's when it has none.
+    entry_clinic = models.ForeignKey(
+        Clinic, on_delete=models.SET_NULL, related_name="schedule_entries",
+        blank=True, null=True)
+    entry_patient = models.ForeignKey(
+        Patient, on_delete=models.CASCADE, related_name="schedule_entries")
+    entry_patient_name = models.CharField(max_length=100)
+    entry_date = models.DateField()
+    entry_time = models.TimeField()
+    entry_status = models.CharField(choices=Appointment.Status.choices, max_length=15)
+
+    class Meta:
+        verbose_name_plural = "schedule entries"
+        indexes = [
+            models.Index(fields=["entry_doctor", "entry_date", "entry_time"], name="entry_doctor_date"),
+            models.Index(fields=["entry_clinic", "entry_date", "entry_time"], name="entry_clinic_date"),
+        ]
+
+    def __str__(self):
+        return f"Schedule entry {str(self.entry_appointment_id)}"
@@ -0,0 +1,215 @@
+"""Lazy expansion of recurring appointment series.
+
+A series stores its rule (frequency, interval, weekdays and the first and
+last date) instead of one row per occurrence. The occurrences in a date
+window are computed when needed, starting directly at the window instead
+of walking the series from its first date, so long series and long
+calendars cost the same as short ones. Occurrences that were modified or
+cancelled are stored as appointments and replace the computed ones.
+"""
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+from appointment.models import Appointment, AppointmentSeries
+from users.models import Doctor
+
+# Most occurrences a series may have.
+MAX_OCCURRENCES = 366
+
+
+def occurrence_dates(series, start=None, end=None):
+    """Yield the dates of the series' occurrences between two dates (inclusive), in order.
+
+    Without ``end`` the dates are yielded up to ``series_until``, or without
+    limit when the series has no end yet (e.g. to find the n-th occurrence).
+    """
+    first = series.series_start
+    start = max(start or first, first)
+    if series.series_until and (end is None or end > series.series_until):
+        end = series.series_until
+    interval = series.series_interval or 1
+
+    if series.series_frequency == AppointmentSeries.Frequency.DAILY:
+        skipped = -(-(start - first).days // interval)
+        day = first + timedelta(days=skipped * interval)
+        while end is None or day <= end:
+            yield day
+            day += timedelta(days=interval)
+
+    elif series.series_frequency == AppointmentSeries.Frequency.WEEKLY:
+        weekdays = sorted(set(series.series_weekdays or [first.weekday()]))
+        first_week = first - timedelta(days=first.weekday())
+        skipped = (start - first_week).days // 7 // interval
+        week = first_week + timedelta(weeks=skipped * interval)
+        while end is None or week <= end:
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                if end is not None and day > end:
+                    return
+                if day >= start:
+                    yield day
+            week += timedelta(weeks=interval)
+
+    else:
+        # Monthly on the day of the month of the first date, skipping months without it.
+        months = (start.year - first.year) * 12 + start.month - first.month
+        months = months // interval * interval
+        while True:
+            year, month = divmod(first.month - 1 + months, 12)
+            year += first.year
+            month += 1
+            if end is not None and date(year, month, 1) > end:
+                return
+            if first.day <= monthrange(year, month)[1]:
+                day = date(year, month, first.day)
+                if day >= start and (end is None or day <= end):
+                    yield day
+            months += interval
+
+
+def nth_occurrence(series, count):
+    """Return the date of the series' ``count``-th occurrence, ignoring ``series_until``."""
+    until, series.series_until = series.series_until, None
+    try:
+        for number, day in enumerate(occurrence_dates(series), start=1):
+            if number == count:
+                return day
+    finally:
+        series.series_until = until
+
+
+def count_occurrences(series, limit=MAX_OCCURRENCES):
+    """Return the number of occurrences of the series, counting at most ``limit + 1``."""
+    count = 0
+    for count, _ in enumerate(occurrence_dates(series), start=1):
+        if count > limit:
+            break
+    return count
+
+
+def occurrence(series, day):
+    """Return the unsaved Appointment for the series' occurrence on a day."""
+    return Appointment(
+        appointment_date=day,
+        appointment_time=series.series_time,
+        appointment_duration=series.series_duration,
+        appointment_status=series.series_status,
+        appointment_comments=series.series_comments,
+        appointment_patient_id=series.series_patient_id,
+        appointment_doctor_id=series.series_doctor_id,
+        appointment_clinic_id=series.series_clinic_id,
+        created_by_id=series.created_by_id,
+        appointment_series=series,
+        appointment_occurrence_date=day,
+    )
+
+
+def to_interval(appointment):
+    start = appointment.appointment_time.hour * 60 + appointment.appointment_time.minute
+    return start, start + appointment.appointment_duration
+
+
+def expand(series_queryset, start, end, exclude=()):
+    """Return the occurrences of the series between two dates that weren't replaced by an appointment.
+
+    Runs one query for the series and, if there are any, one for the
+    replaced occurrences. The occurrences are unsaved Appointment objects
+    (without ``appointment_id``) sharing the series' patient, doctor and
+    clinic objects when the queryset selected them.
+    :param exclude: (series id, date) pairs to leave out as well
+    """
+    series_list = list(series_queryset.filter(series_start__lte=end, series_until__gte=start))
+    if not series_list:
+        return []
+    replaced = set(exclude)
+    replaced.update(Appointment.objects.filter(
+        appointment_series__in=series_list,
+        appointment_occurrence_date__gte=start, appointment_occurrence_date__lte=end,
+    ).values_list("appointment_series", "appointment_occurrence_date"))
+
+    occurrences = []
+    for series in series_list:
+        for day in occurrence_dates(series, start, end):
+            if (series.series_id, day) in replaced:
+                continue
+            appointment = occurrence(series, day)
+            for field in ["patient", "doctor", "clinic"]:
+                if AppointmentSeries._meta.get_field(f"series_{field}").is_cached(series):
+                    setattr(appointment, f"appointment_{field}", getattr(series, f"series_{field}"))
+            occurrences.append(appointment)
+    return occurrences
+
+
+def series_intervals(doctor_ids, start, end, exclude=(), exclude_series=None):
+    """Return {(doctor id, date): [(start, end) minutes]} of the series occurrences of doctors."""
+    series = AppointmentSeries.objects.filter(series_doctor__in=doctor_ids)
+    if exclude_series is not None:
+        series = series.exclude(pk=exclude_series)
+    busy = defaultdict(list)
+    for appointment in expand(series, start, end, exclude):
+        busy[(appointment.appointment_doctor_id, appointment.appointment_date)].append(to_interval(appointment))
+    return busy
+
+
+def overlaps(appointments, busy):
+    """Return whether any of the appointments overlaps the busy intervals of its doctor and day."""
+    for appointment in appointments:
+        start, end = to_interval(appointment)
+        for busy_start, busy_end in busy.get((appointment.appointment_doctor_id, appointment.appointment_date), []):
+            if busy_start < end and start < busy_end:
+                return True
+    return False
+
+
+def lock_doctors(doctor_ids):
+    """Lock the rows of the doctors until the end of the transaction.
+
+    The double booking constraint can't see series occurrences, so two
+    writes could each pass the series check before either is saved. Writes
+    take their doctors' locks before checking, so they wait for each other.
+    """
+    list(Doctor.objects.select_for_update().filter(pk__in=doctor_ids).order_by("pk").values_list("pk", flat=True))
+
+
+def overlaps_series(appointments):
+    """Return whether any of the appointments overlaps an occurrence of a series.
+
+    The double booking constraint only sees stored appointments, so series
+    occurrences are checked here. Cancelled appointments never overlap, and
+    an appointment replacing an occurrence doesn't overlap that occurrence.
+    """
+    appointments = [appointment for appointment in appointments
+                    if appointment.appointment_status != Appointment.Status.CANCELLED]
+    if not appointments:
+        return False
+    exclude = {(appointment.appointment_series_id, appointment.appointment_occurrence_date)
+               for appointment in appointments if appointment.appointment_series_id}
+    busy = series_intervals(
+        {appointment.appointment_doctor_id for appointment in appointments},
+        min(appointment.appointment_date for appointment in appointments),
+        max(appointment.appointment_date for appointment in appointments),
+        exclude)
+    return overlaps(appointments, busy)
+
+
+def series_overlaps(series):
+    """Return whether an occurrence of the series overlaps an appointment or another series of its doctor."""
+    days = list(occurrence_dates(series))
+    if not days:
+        return False
+    replaced = set()
+    if series.pk is not None:
+        replaced.update(Appointment.objects.filter(appointment_series=series)
+                        .values_list("appointment_occurrence_date", flat=True))
+    occurrences = [occurrence(series, day) for day in days if day not in replaced]
+
+    busy = series_intervals([series.series_doctor_id], days[0], days[-1], exclude_series=series.pk)
+    booked = (Appointment.objects
+              .filter(appointment_doctor=series.series_doctor_id,
+                      appointment_date__gte=days[0], appointment_date__lte=days[-1])
+              .exclude(appointment_status=Appointment.Status.CANCELLED)
+              .only("appointment_doctor", "appointment_date", "appointment_time", "appointment_duration"))
+    for appointment in booked:
+        busy[(appointment.appointment_doctor_id, appointment.appointment_date)].append(to_interval(appointment))
+    return overlaps(occurrences, busy)
@@ -0,0 +1,110 @@
+"""Compact doctor and clinic schedules, read from the denormalized ScheduleEntry table.
+
+Each appointment has a ScheduleEntry holding only what the calendar shows,
+with the patient's name and the clinic resolved. Entries are written with
+one ``INSERT ... SELECT ... ON CONFLICT`` statement whenever appointments,
+patients or doctors change, so a clinic's week is read with one indexed
+query instead of joining and serializing full appointments. Unlike a
+materialized view, only the changed rows are rewritten.
+"""
+
+from collections import defaultdict
+from django.db import connection
+from django.db.models import Q
+from appointment.models import Appointment, AppointmentSeries, ScheduleEntry
+from appointment.recurrence import expand
+from users.models import Patient, Doctor
+
+# Columns copied into ScheduleEntry, after entry_appointment_id.
+ENTRY_COLUMNS = ["entry_doctor_id", "entry_clinic_id", "entry_patient_id", "entry_patient_name",
+                 "entry_date", "entry_time", "entry_status"]
+
+REFRESH_SQL = """
+    INSERT INTO {entry} AS entry (entry_appointment_id, {columns})
+    SELECT a.appointment_id, a.appointment_doctor_id, COALESCE(a.appointment_clinic_id, d.doctor_clinic_id),
+           a.appointment_patient_id, p.patient_name, a.appointment_date, a.appointment_time, a.appointment_status
+    FROM {appointment} a
+    JOIN {patient} p ON p.patient_id = a.appointment_patient_id
+    JOIN {doctor} d ON d.doctor_id = a.appointment_doctor_id
+    WHERE {where}
+    ON CONFLICT (entry_appointment_id) DO UPDATE SET ({columns}) = ({excluded})
+    WHERE ({current}) IS DISTINCT FROM ({excluded})
+"""
+
+
+def refresh_entries(appointment_ids=None, patient_ids=None, doctor_ids=None):
+    """Write the schedule entries of the given appointments, or of the appointments of patients or doctors.
+
+    Runs one query, and none when no ids are given. Entries of deleted
+    appointments are deleted with them.
+    """
+    conditions = []
+    params = []
+    for column, ids in [("appointment_id", appointment_ids), ("appointment_patient_id", patient_ids),
+                        ("appointment_doctor_id", doctor_ids)]:
+        if ids:
+            conditions.append(f"a.{column} = ANY(%s)")
+            params.append(list(ids))
+    if not conditions:
+        return
+    run_refresh(" OR ".join(conditions), params)
+
+
+def rebuild_entries():
+    """Write the schedule entries of every appointment."""
+    run_refresh("TRUE", [])
+
+
+def run_refresh(where, params):
+    quote = connection.ops.quote_name
+    sql = REFRESH_SQL.format(
+        entry=quote(ScheduleEntry._meta.db_table),
+        appointment=quote(Appointment._meta.db_table),
+        patient=quote(Patient._meta.db_table),
+        doctor=quote(Doctor._meta.db_table),
+        columns=", ".join(ENTRY_COLUMNS),
+        current=", ".join(f"entry.{column}" for column in ENTRY_COLUMNS),
+        excluded=", ".join(f"EXCLUDED.{column}" for column in ENTRY_COLUMNS),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def get_schedule(start, end, doctor_id=None, clinic_id=None):
+    """Return the appointments of a doctor or clinic between two dates (inclusive), per doctor and day.
+
+    Stored appointments come from the schedule entries and series
+    occurrences are added without an id, in two or three queries whatever
+    the number of appointments.
+    :returns: list of ``{"date", "doctor", "appointments"}`` ordered by date
+        and doctor, each appointment a ``{"id", "time", "status", "patient"}``
+        ordered by time
+    """
+    entries = ScheduleEntry.objects.filter(entry_date__gte=start, entry_date__lte=end)
+    series = AppointmentSeries.objects.select_related("series_patient")
+    if doctor_id:
+        entries = entries.filter(entry_doctor=doctor_id)
+        series = series.filter(series_doctor=doctor_id)
+    if clinic_id:
+        entries = entries.filter(entry_clinic=clinic_id)
+        series = series.filter(
+            Q(series_clinic=clinic_id)
+            | Q(series_clinic__isnull=True, series_doctor__doctor_clinic=clinic_id))
+
+    days = defaultdict(list)
+    for doctor, day, appointment_id, time, status, patient in entries.values_list(
+            "entry_doctor", "entry_date", "entry_appointment", "entry_time", "entry_status", "entry_patient_name"):
+        days[(day, doctor)].append({"id": appointment_id, "time": time, "status": status, "patient": patient})
+    for occurrence in expand(series, start, end):
+        days[(occurrence.appointment_date, occurrence.appointment_doctor_id)].append({
+            "id": None,
+            "time": occurrence.appointment_time,
+            "status": occurrence.appointment_status,
+            "patient": occurrence.appointment_patient.patient_name,
+        })
+    return [
+        {"date": day, "doctor": doctor,
+         "appointments": sorted(appointments, key=lambda appointment: appointment["time"])}
+        for (day, doctor), appointments in sorted(days.items())
+    ]
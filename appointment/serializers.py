@@ -1,12 +1,46 @@
 """Serailzers for the Appointment Module."""
 
-from rest_framework import serializers
-from appointment.models import Appointment
+import copy
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from appointment.availability import MAX_DAYS
+from appointment.models import Appointment, AppointmentSeries, DoctorSchedule
+from appointment.recurrence import (
+    MAX_OCCURRENCES, count_occurrences, lock_doctors, nth_occurrence, occurrence_dates, overlaps_series,
+    series_overlaps
+)
 from clinic.models import Clinic
 from clinic.serializers import ClinicSerializer
 from users.serializers import PatientSerializer, DoctorSerializer
 from users.models import Patient, Doctor
 
+# Name of the exclusion constraint on Appointment against overlapping bookings.
+DOUBLE_BOOKING_CONSTRAINT = "appointment_no_double_booking"
+# Name of the unique constraint allowing one appointment per series occurrence.
+SERIES_OCCURRENCE_CONSTRAINT = "appointment_series_occurrence"
+REPLACED_OCCURRENCE = "The occurrence was already replaced by another appointment."
+
+
+class AppointmentConflict(APIException):
+    """Raised when an appointment overlaps another appointment of the same doctor."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The doctor already has an appointment at this time."
+    default_code = "conflict"
+
+
+def is_double_booking(exc):
+    """Return whether an IntegrityError was raised by the double booking constraint."""
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) == DOUBLE_BOOKING_CONSTRAINT
+
+
+def is_replaced_occurrence(exc):
+    """Return whether an IntegrityError was raised because the series occurrence was already replaced."""
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) == SERIES_OCCURRENCE_CONSTRAINT
+
 
 class AppointmentSerializer(serializers.ModelSerializer):
     """Seralizer for Appointments."""
@@ -18,19 +52,38 @@ class AppointmentSerializer(serializers.ModelSerializer):
         queryset=Clinic.objects.all(),
         required=False)
     created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    appointment_series = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Appointment
-        fields = ["appointment_id", "appointment_date", "appointment_time",
+        fields = ["appointment_id", "appointment_date", "appointment_time", "appointment_duration",
                   "appointment_status", "appointment_comments", "appointment_patient",
-                  "appointment_doctor", "appointment_clinic", "created_by"]
-        read_only_fields = ["appointment_id", "created_by"]
+                  "appointment_doctor", "appointment_clinic", "created_by",
+                  "appointment_series", "appointment_occurrence_date"]
+        read_only_fields = ["appointment_id", "created_by", "appointment_occurrence_date"]
 
     def create(self, validated_data):
         """Create an appointment."""
         auth_user = self.context["request"].user
-        appointment = Appointment.objects.create(
-            created_by=auth_user, **validated_data)
+        appointment = Appointment(created_by=auth_user, **validated_data)
+        series = appointment.appointment_series
+        try:
+            with transaction.atomic():
+                # Replacing an occurrence also locks the series' doctor, so two
+                # replacements of the same occurrence wait for each other.
+                lock_doctors({appointment.appointment_doctor_id} | ({series.series_doctor_id} if series else set()))
+                if series and series.occurrences.filter(
+                        appointment_occurrence_date=appointment.appointment_occurrence_date).exists():
+                    raise AppointmentConflict(REPLACED_OCCURRENCE)
+                if overlaps_series([appointment]):
+                    raise AppointmentConflict()
+                appointment.save()
+        except IntegrityError as exc:
+            if is_double_booking(exc):
+                raise AppointmentConflict()
+            if is_replaced_occurrence(exc):
+                raise AppointmentConflict(REPLACED_OCCURRENCE)
+            raise
         return appointment
 
     def update(self, instance, validated_data):
@@ -38,7 +91,16 @@ class AppointmentSerializer(serializers.ModelSerializer):
         validated_data.pop("created_by", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        try:
+            with transaction.atomic():
+                lock_doctors([instance.appointment_doctor_id])
+                if overlaps_series([instance]):
+                    raise AppointmentConflict()
+                instance.save()
+        except IntegrityError as exc:
+            if is_double_booking(exc):
+                raise AppointmentConflict()
+            raise
         return instance
 
 
@@ -47,3 +109,177 @@ class AppointmentSerializerExtended(AppointmentSerializer):
     appointment_patient = PatientSerializer(read_only=True)
     appointment_doctor = DoctorSerializer(read_only=True)
     appointment_clinic = ClinicSerializer(read_only=True)
+
+
+class DoctorScheduleSerializer(serializers.ModelSerializer):
+    """Serializer for Doctor working hours."""
+    schedule_doctor = serializers.PrimaryKeyRelatedField(
+        queryset=Doctor.objects.all())
+    schedule_clinic = serializers.PrimaryKeyRelatedField(
+        queryset=Clinic.objects.all(),
+        required=False,
+        allow_null=True)
+
+    class Meta:
+        model = DoctorSchedule
+        fields = ["schedule_id", "schedule_doctor", "schedule_clinic", "schedule_weekday",
+                  "schedule_start", "schedule_end", "schedule_slot_minutes",
+                  "schedule_valid_from", "schedule_valid_until"]
+        read_only_fields = ["schedule_id"]
+
+    def validate(self, attrs):
+        start = attrs.get("schedule_start", getattr(self.instance, "schedule_start", None))
+        end = attrs.get("schedule_end", getattr(self.instance, "schedule_end", None))
+        if start and end and start >= end:
+            raise serializers.ValidationError({"schedule_end": "Must be after the start time."})
+        return attrs
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """Query parameters ``start`` and ``end`` of a date range, a week and at most MAX_DAYS long."""
+    start = serializers.DateField()
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        # A week from the start date by default.
+        attrs.setdefault("end", attrs["start"] + timedelta(days=6))
+        days = (attrs["end"] - attrs["start"]).days + 1
+        if days < 1:
+            raise serializers.ValidationError({"end": "Must not be before the start date."})
+        if days > MAX_DAYS:
+            raise serializers.ValidationError({"end": f"The range can be at most {MAX_DAYS} days."})
+        return attrs
+
+
+class ScheduleQuerySerializer(DateRangeSerializer):
+    """Query parameters of the schedule endpoint: a doctor or clinic and a date range."""
+    doctor = serializers.IntegerField(required=False)
+    clinic = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if "doctor" not in attrs and "clinic" not in attrs:
+            raise serializers.ValidationError("Either doctor or clinic is required.")
+        return super().validate(attrs)
+
+
+class AvailabilityQuerySerializer(ScheduleQuerySerializer):
+    """Query parameters of the availability endpoint."""
+    duration = serializers.IntegerField(required=False, min_value=1, max_value=24 * 60)
+
+
+class ScheduleItemSerializer(serializers.Serializer):
+    """One appointment of a schedule; series occurrences have no id."""
+    id = serializers.IntegerField(allow_null=True)
+    time = serializers.TimeField(format="%H:%M")
+    status = serializers.CharField()
+    patient = serializers.CharField()
+
+
+class ScheduleSerializer(serializers.Serializer):
+    """Appointments of a doctor on one day."""
+    date = serializers.DateField()
+    doctor = serializers.IntegerField()
+    appointments = ScheduleItemSerializer(many=True)
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    """Free slots of a doctor on one day."""
+    doctor = serializers.IntegerField()
+    date = serializers.DateField()
+    slots = serializers.ListField(child=serializers.TimeField(format="%H:%M"))
+
+
+class AppointmentSeriesSerializer(serializers.ModelSerializer):
+    """Serializer for recurring appointments.
+
+    The series ends on ``series_until``, or after ``series_count``
+    occurrences, which is turned into the date of the last one.
+    """
+    series_patient = serializers.PrimaryKeyRelatedField(
+        queryset=Patient.objects.all())
+    series_doctor = serializers.PrimaryKeyRelatedField(
+        queryset=Doctor.objects.all())
+    series_clinic = serializers.PrimaryKeyRelatedField(
+        queryset=Clinic.objects.all(),
+        required=False,
+        allow_null=True)
+    series_weekdays = serializers.ListField(
+        child=serializers.ChoiceField(choices=DoctorSchedule.Weekday.choices),
+        required=False)
+    series_count = serializers.IntegerField(
+        write_only=True, required=False, min_value=1, max_value=MAX_OCCURRENCES)
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = AppointmentSeries
+        fields = ["series_id", "series_frequency", "series_interval", "series_weekdays",
+                  "series_start", "series_until", "series_count", "series_time", "series_duration",
+                  "series_status", "series_comments", "series_patient", "series_doctor",
+                  "series_clinic", "created_by"]
+        read_only_fields = ["series_id", "created_by"]
+        extra_kwargs = {
+            "series_until": {"required": False},
+            "series_interval": {"min_value": 1},
+        }
+
+    def validate(self, attrs):
+        if self.instance is not None:
+            series = copy.copy(self.instance)
+        else:
+            series = AppointmentSeries()
+        count = attrs.pop("series_count", None)
+        for attr, value in attrs.items():
+            setattr(series, attr, value)
+
+        if series.series_weekdays and series.series_frequency != AppointmentSeries.Frequency.WEEKLY:
+            raise serializers.ValidationError({"series_weekdays": "Only weekly series repeat on weekdays."})
+        if count is not None:
+            if "series_until" in attrs:
+                raise serializers.ValidationError("Give either series_until or series_count, not both.")
+            attrs["series_until"] = series.series_until = nth_occurrence(series, count)
+        elif series.series_until is None:
+            raise serializers.ValidationError({"series_until": "Either series_until or series_count is required."})
+        if series.series_until < series.series_start:
+            raise serializers.ValidationError({"series_until": "Must not be before the start date."})
+        occurrences = count_occurrences(series)
+        if occurrences == 0:
+            raise serializers.ValidationError("The series has no occurrences.")
+        if occurrences > MAX_OCCURRENCES:
+            raise serializers.ValidationError(f"A series can have at most {MAX_OCCURRENCES} occurrences.")
+        return attrs
+
+    def create(self, validated_data):
+        """Create a series, unless an occurrence overlaps an appointment of the doctor."""
+        series = AppointmentSeries(created_by=self.context["request"].user, **validated_data)
+        return self.save_series(series)
+
+    def update(self, instance, validated_data):
+        """Update a series. Occurrences already modified or cancelled keep their appointment."""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        return self.save_series(instance)
+
+    def save_series(self, series):
+        # Occurrences aren't stored, so the double booking constraint can't see
+        # them; check them against the doctor's appointments and other series.
+        with transaction.atomic():
+            lock_doctors([series.series_doctor_id])
+            if series_overlaps(series):
+                raise AppointmentConflict("An occurrence overlaps another appointment of the doctor.")
+            series.save()
+        return series
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    """The occurrence of a series (in context ``series``) to modify or cancel."""
+    occurrence_date = serializers.DateField()
+
+    def validate_occurrence_date(self, value):
+        series = self.context["series"]
+        if next(occurrence_dates(series, value, value), None) is None:
+            raise serializers.ValidationError("The series has no occurrence on this date.")
+        replaced = series.occurrences.filter(appointment_occurrence_date=value).first()
+        if replaced is not None:
+            raise serializers.ValidationError(
+                f"The occurrence was already replaced by appointment {replaced.appointment_id}.")
+        return value
@@ -0,0 +1,25 @@
+"""Signal handlers keeping the schedule entries in step with appointments, patients and doctors."""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from appointment.models import Appointment
+from appointment.schedule import refresh_entries
+from users.models import Patient, Doctor
+
+
+# Bulk writes send no signals; appointment.bulk refreshes their entries itself.
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, **kwargs):
+    refresh_entries(appointment_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_entries(patient_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_entries(doctor_ids=[instance.pk])
@@ -1,14 +1,16 @@
 """Test for appointment API."""
 
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from appointment.models import Appointment
 from clinic.models import Clinic
 from appointment.serializers import AppointmentSerializer, AppointmentSerializerExtended
 from users.models import User, Patient, Doctor
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 APPOINTMENT_URL = reverse("appointment:appointment-list")
 
@@ -101,7 +103,7 @@ class PrivateAppointmentAPITests(TestCase):
         appointments = Appointment.objects.all().order_by(
             "-appointment_date", "-appointment_time")
         serializer = AppointmentSerializerExtended(appointments, many=True)
-        self.assertEqual(serializer.data, res.data)
+        self.assertEqual(serializer.data, res.data["results"])
 
     def test_retrieve_appointment_detail(self):
         """Test retrieving appointment detail for ADMIN user."""
@@ -142,7 +144,7 @@ class PrivateAppointmentAPITests(TestCase):
         patient_user2 = create_patient_user(email="patient2@example.com")
         patient2 = create_patient(patient_user2)
         Appointment.objects.create(
-            appointment_date=datetime.now().date(),
+            appointment_date=datetime.strptime("2022-02-02", "%Y-%m-%d"),
             appointment_time=datetime.now().time(),
             appointment_status=Appointment.Status.REQUESTED,
             appointment_patient=patient2,
@@ -154,9 +156,9 @@ class PrivateAppointmentAPITests(TestCase):
         patient_client.force_authenticate(patient_user)
         res = patient_client.get(APPOINTMENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data["count"], 1)
         serializer = AppointmentSerializerExtended(ap)
-        self.assertEqual(res.data, [serializer.data])
+        self.assertEqual(res.data["results"], [serializer.data])
 
     def test_creating_appointment(self):
         """Test creating appointment as a patient."""
@@ -228,3 +230,131 @@ class PrivateAppointmentAPITests(TestCase):
         exists = Appointment.objects.filter(
             appointment_id=ap.appointment_id).exists()
         self.assertFalse(exists)
+
+
+class AppointmentPaginationTests(TestCase):
+    """Test page number and keyset pagination of the appointment list."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patient_user = create_patient_user()
+        patient = create_patient(patient_user)
+        doctors = [create_doctor(create_doctor_user()),
+                   create_doctor(create_doctor_user(email="doctor2@example.com"))]
+        # Two appointments per day, at the same time, to exercise the id tie breaker.
+        for day in range(1, 6):
+            for doctor in doctors:
+                Appointment.objects.create(
+                    appointment_date=f"2022-03-{day:02d}",
+                    appointment_time="10:00:00",
+                    appointment_status=Appointment.Status.BOOKED,
+                    appointment_patient=patient,
+                    appointment_doctor=doctor,
+                    created_by=patient_user
+                )
+        self.expected = list(Appointment.objects.order_by(
+            "-appointment_date", "-appointment_time", "-appointment_id"
+        ).values_list("appointment_id", flat=True))
+
+    def test_page_number_pagination(self):
+        """Test the list is paginated by page number by default."""
+        res = self.client.get(APPOINTMENT_URL, {"page_size": 4, "page": 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 10)
+        ids = [ap["appointment_id"] for ap in res.data["results"]]
+        self.assertEqual(ids, self.expected[4:8])
+
+    def test_cursor_pagination_forwards_and_backwards(self):
+        """Test following next and previous cursors visits every appointment once, in order."""
+        res = self.client.get(APPOINTMENT_URL, {"cursor": "", "page_size": 3})
+        self.assertNotIn("count", res.data)
+        self.assertIsNone(res.data["previous"])
+        pages = []
+        while True:
+            pages.append([ap["appointment_id"] for ap in res.data["results"]])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+
+        res = self.client.get(res.data["previous"])
+        self.assertEqual([ap["appointment_id"] for ap in res.data["results"]], pages[2])
+        self.assertIsNotNone(res.data["next"])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404."""
+        res = self.client.get(APPOINTMENT_URL, {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AppointmentQueryCountTests(TestCase):
+    """Test the appointment endpoints run a fixed number of queries, however many rows they return."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.clinic = Clinic.objects.create(clinic_name="Test Clinic")
+        self.patient_user = create_patient_user()
+        self.patient = create_patient(self.patient_user)
+        self.doctor_user = create_doctor_user()
+        self.doctor = create_doctor(self.doctor_user)
+
+    def create_appointments(self, count):
+        # One a day, so they don't overlap.
+        start = Appointment.objects.count()
+        for day in range(start, start + count):
+            Appointment.objects.create(
+                appointment_date=date(2022, 3, 1) + timedelta(days=day),
+                appointment_time="10:00:00",
+                appointment_status=Appointment.Status.BOOKED,
+                appointment_patient=self.patient,
+                appointment_doctor=self.doctor,
+                appointment_clinic=self.clinic,
+                created_by=self.patient_user
+            )
+
+    def count_queries(self, client, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            res = client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing appointments doesn't query per row, for each role and pagination mode."""
+        doctor_client = APIClient()
+        doctor_client.force_authenticate(self.doctor_user)
+        cases = [(self.client, None), (self.client, {"cursor": ""}), (doctor_client, None)]
+        self.create_appointments(1)
+        single = [self.count_queries(client, APPOINTMENT_URL, params) for client, params in cases]
+        self.create_appointments(9)
+        many = [self.count_queries(client, APPOINTMENT_URL, params) for client, params in cases]
+        self.assertEqual(single, many)
+        # One query for the rows (with patient, doctor and clinic joined) and one for the count.
+        self.assertEqual(single[0], 2)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving an appointment loads its relations in one query."""
+        self.create_appointments(1)
+        ap = Appointment.objects.get()
+        with self.assertNumQueries(1):
+            self.client.get(detail_url(ap.appointment_id))
+
+    def test_create_does_not_reload_relations(self):
+        """Test the response after creating reuses the relations loaded during validation."""
+        payload = {
+            "appointment_date": "2022-09-09",
+            "appointment_time": "10:10:00",
+            "appointment_status": Appointment.Status.REQUESTED,
+            "appointment_patient": self.patient.patient_id,
+            "appointment_doctor": self.doctor.doctor_id,
+            "appointment_clinic": self.clinic.clinic_id
+        }
+        # Patient, doctor and clinic lookups, then inside a savepoint the doctor's
+        # lock and series, the insert and its schedule entry.
+        with self.assertNumQueries(9):
+            res = self.client.post(APPOINTMENT_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,170 @@
+"""Tests for doctor schedules and the availability API."""
+
+from datetime import date, datetime, time
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment.availability import cut_slots, find_availability, subtract_intervals
+from appointment.models import Appointment, DoctorSchedule
+from clinic.models import Clinic
+from users.models import User, Patient, Doctor
+
+AVAILABILITY_URL = reverse("appointment:availability")
+SCHEDULE_URL = reverse("appointment:doctorschedule-list")
+# A Monday, well in the past so "now" has to be given explicitly.
+MONDAY = date(2022, 3, 7)
+BEFORE_MONDAY = timezone.make_aware(datetime(2022, 3, 1))
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
+    """Create and return a user. Returns AdminUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def create_doctor(email="doctor@example.com", clinic=None):
+    """Create and return a doctor profile."""
+    return Doctor.objects.create(
+        doctor_name="Test Doctor",
+        doctor_dob="2000-02-12",
+        doctor_clinic=clinic,
+        user=create_user(email=email, role=User.Role.DOCTOR, is_staff=False),
+    )
+
+
+def create_schedule(doctor, weekday=0, start="09:00", end="12:00", **params):
+    """Create and return working hours for a doctor."""
+    return DoctorSchedule.objects.create(
+        schedule_doctor=doctor, schedule_weekday=weekday,
+        schedule_start=start, schedule_end=end, **params)
+
+
+class IntervalTests(TestCase):
+    """Test the interval arithmetic behind the availability engine."""
+
+    def test_subtract_intervals(self):
+        """Test bookings are cut out of the working hours."""
+        free = subtract_intervals([(540, 720), (780, 900)], [(500, 560), (600, 630), (700, 800)])
+        self.assertEqual(free, [(560, 600), (630, 700), (800, 900)])
+
+    def test_cut_slots_on_grid(self):
+        """Test slots start on the schedule's grid and fit in the free time."""
+        self.assertEqual(cut_slots((540, 720), [(550, 620)], 15, 15), [555, 570, 585, 600])
+        self.assertEqual(cut_slots((540, 720), [(550, 620)], 15, 30), [555, 570, 585])
+
+
+class AvailabilityTests(TestCase):
+    """Test free slots computed from schedules and appointments."""
+
+    def setUp(self):
+        self.clinic = Clinic.objects.create(clinic_name="Test Clinic")
+        self.doctor = create_doctor(clinic=self.clinic)
+        self.patient_user = create_user(email="patient@example.com", role=User.Role.PATIENT, is_staff=False)
+        self.patient = Patient.objects.create(
+            patient_name="Test Patient", patient_dob="2000-03-13", user=self.patient_user)
+        create_schedule(self.doctor, schedule_slot_minutes=30)
+
+    def book(self, at, duration=30, status=Appointment.Status.BOOKED, day=MONDAY):
+        return Appointment.objects.create(
+            appointment_date=day,
+            appointment_time=at,
+            appointment_duration=duration,
+            appointment_status=status,
+            appointment_patient=self.patient,
+            appointment_doctor=self.doctor,
+            created_by=self.patient_user
+        )
+
+    def test_booked_time_removed(self):
+        """Test booked appointments remove their slots, and cancelled ones don't."""
+        self.book("10:00")
+        self.book("11:00", duration=60)
+        self.book("09:00", status=Appointment.Status.CANCELLED)
+        availability = find_availability(MONDAY, MONDAY, doctor_ids=[self.doctor.doctor_id], now=BEFORE_MONDAY)
+        self.assertEqual(availability, [{
+            "doctor": self.doctor.doctor_id,
+            "date": MONDAY,
+            "slots": [time(9, 0), time(9, 30), time(10, 30)],
+        }])
+
+    def test_duration_longer_than_slot(self):
+        """Test longer appointments only get slots with enough free time after them."""
+        self.book("10:00")
+        availability = find_availability(
+            MONDAY, MONDAY, doctor_ids=[self.doctor.doctor_id], duration=60, now=BEFORE_MONDAY)
+        self.assertEqual(availability[0]["slots"], [time(9, 0), time(10, 30), time(11, 0)])
+
+    def test_weekdays_and_validity(self):
+        """Test schedules only apply on their weekday and within their validity range."""
+        create_schedule(self.doctor, weekday=2, start="14:00", end="15:00",
+                        schedule_valid_until=date(2022, 3, 9))
+        availability = find_availability(
+            MONDAY, date(2022, 3, 16), doctor_ids=[self.doctor.doctor_id], now=BEFORE_MONDAY)
+        self.assertEqual([entry["date"] for entry in availability],
+                         [MONDAY, date(2022, 3, 9), date(2022, 3, 14)])
+
+    def test_past_slots_excluded(self):
+        """Test slots earlier than now are left out."""
+        now = timezone.make_aware(datetime(2022, 3, 7, 10, 45))
+        availability = find_availability(MONDAY, MONDAY, doctor_ids=[self.doctor.doctor_id], now=now)
+        self.assertEqual(availability[0]["slots"], [time(11, 0), time(11, 30)])
+
+    def test_clinic_availability(self):
+        """Test ?clinic= covers the doctors working at the clinic, in three queries for a month."""
+        other = create_doctor(email="other@example.com")
+        create_schedule(other, schedule_clinic=self.clinic)
+        create_schedule(create_doctor(email="elsewhere@example.com"))
+        # Schedules, appointments and appointment series.
+        with self.assertNumQueries(3):
+            availability = find_availability(
+                MONDAY, date(2022, 4, 6), clinic_id=self.clinic.clinic_id, now=BEFORE_MONDAY)
+        self.assertEqual({entry["doctor"] for entry in availability},
+                         {self.doctor.doctor_id, other.doctor_id})
+
+
+class AvailabilityAPITests(TestCase):
+    """Test the availability and schedule APIs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+        self.doctor = create_doctor()
+
+    def test_availability(self):
+        """Test the free slots of a doctor are returned per day."""
+        create_schedule(self.doctor, start="09:00", end="09:30")
+        res = self.client.get(AVAILABILITY_URL, {"doctor": self.doctor.doctor_id, "start": "2099-03-02"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{"doctor": self.doctor.doctor_id, "date": "2099-03-02",
+                                     "slots": ["09:00", "09:15"]}])
+
+    def test_doctor_or_clinic_required(self):
+        """Test the request is rejected without a doctor or clinic, or with a too long range."""
+        res = self.client.get(AVAILABILITY_URL, {"start": "2099-03-02"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(AVAILABILITY_URL, {"doctor": self.doctor.doctor_id,
+                                                 "start": "2099-03-02", "end": "2099-12-31"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_schedule_admin_only(self):
+        """Test only admins can set working hours."""
+        payload = {"schedule_doctor": self.doctor.doctor_id, "schedule_weekday": 0,
+                   "schedule_start": "09:00", "schedule_end": "12:00"}
+        doctor_client = APIClient()
+        doctor_client.force_authenticate(self.doctor.user)
+        res = doctor_client.post(SCHEDULE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.post(SCHEDULE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.post(SCHEDULE_URL, {**payload, "schedule_end": "08:00"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_slot_minutes_at_least_one(self):
+        """Test working hours with zero minute slots are rejected."""
+        payload = {"schedule_doctor": self.doctor.doctor_id, "schedule_weekday": 0,
+                   "schedule_start": "09:00", "schedule_end": "12:00", "schedule_slot_minutes": 0}
+        res = self.client.post(SCHEDULE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("schedule_slot_minutes", res.data)
+        self.assertFalse(DoctorSchedule.objects.exists())
@@ -0,0 +1,195 @@
+"""Tests that doctors can't be double booked."""
+
+import threading
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment.models import Appointment, AppointmentSeries
+from users.models import User, Patient, Doctor
+
+APPOINTMENT_URL = reverse("appointment:appointment-list")
+SERIES_URL = reverse("appointment:appointmentseries-list")
+
+
+def detail_url(appointment_id):
+    """Create and return an detail url."""
+    return reverse("appointment:appointment-detail", args=[appointment_id])
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
+    """Create and return a user. Returns AdminUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def create_patient(email="patient@example.com"):
+    """Create and return a patient profile."""
+    return Patient.objects.create(
+        patient_name="Test Patient", patient_dob="2000-03-13",
+        user=create_user(email=email, role=User.Role.PATIENT, is_staff=False))
+
+
+def create_doctor(email="doctor@example.com"):
+    """Create and return a doctor profile."""
+    return Doctor.objects.create(
+        doctor_name="Test Doctor", doctor_dob="2000-02-12",
+        user=create_user(email=email, role=User.Role.DOCTOR, is_staff=False))
+
+
+def booking(patient, doctor, time="10:00:00", duration=30, **fields):
+    """Return the payload booking an appointment on 2022-09-09."""
+    return {
+        "appointment_date": "2022-09-09",
+        "appointment_time": time,
+        "appointment_duration": duration,
+        "appointment_status": Appointment.Status.BOOKED,
+        "appointment_patient": patient.patient_id,
+        "appointment_doctor": doctor.doctor_id,
+        **fields,
+    }
+
+
+@skipUnless(connection.vendor == "postgresql", "The double booking constraint needs PostgreSQL.")
+class DoubleBookingTests(TestCase):
+    """Test overlapping appointments of a doctor are rejected with 409."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+        self.patient = create_patient()
+        self.other_patient = create_patient(email="patient2@example.com")
+        self.doctor = create_doctor()
+
+    def test_overlapping_booking_rejected(self):
+        """Test booking a doctor during another appointment returns 409."""
+        res = self.client.post(APPOINTMENT_URL, booking(self.patient, self.doctor))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.post(APPOINTMENT_URL, booking(self.other_patient, self.doctor, time="10:15:00"))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_adjacent_and_other_doctor_allowed(self):
+        """Test back to back appointments and other doctors at the same time are fine."""
+        other_doctor = create_doctor(email="doctor2@example.com")
+        for payload in [booking(self.patient, self.doctor),
+                        booking(self.other_patient, self.doctor, time="10:30:00"),
+                        booking(self.other_patient, other_doctor)]:
+            res = self.client.post(APPOINTMENT_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_cancelled_appointment_frees_slot(self):
+        """Test a cancelled appointment doesn't block its time."""
+        res = self.client.post(APPOINTMENT_URL, booking(self.patient, self.doctor))
+        res = self.client.patch(detail_url(res.data["appointment_id"]),
+                                {"appointment_status": Appointment.Status.CANCELLED})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.post(APPOINTMENT_URL, booking(self.other_patient, self.doctor))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_reschedule_into_booked_time_rejected(self):
+        """Test moving an appointment onto another one returns 409 and leaves it unchanged."""
+        self.client.post(APPOINTMENT_URL, booking(self.patient, self.doctor))
+        res = self.client.post(APPOINTMENT_URL, booking(self.other_patient, self.doctor, time="11:00:00"))
+        res = self.client.patch(detail_url(res.data["appointment_id"]), {"appointment_time": "10:20:00"})
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            sorted(str(ap.appointment_time) for ap in Appointment.objects.all()), ["10:00:00", "11:00:00"])
+
+
+@skipUnless(connection.vendor == "postgresql", "The double booking constraint needs PostgreSQL.")
+class ConcurrentBookingTests(TransactionTestCase):
+    """Test simultaneous bookings of the same slot."""
+
+    def test_parallel_bookings_of_one_slot(self):
+        """Test exactly one of several parallel bookings of a slot succeeds."""
+        admin = create_user()
+        doctor = create_doctor()
+        patients = [create_patient(email=f"patient{number}@example.com") for number in range(8)]
+        barrier = threading.Barrier(len(patients))
+        results = []
+
+        def book(patient):
+            client = APIClient()
+            client.force_authenticate(admin)
+            try:
+                barrier.wait()
+                results.append(client.post(APPOINTMENT_URL, booking(patient, doctor)).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(patient,)) for patient in patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [201] + [409] * (len(patients) - 1))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_parallel_series_and_bookings(self):
+        """Test exactly one of parallel series and bookings of a slot succeeds, though series are unconstrained."""
+        admin = create_user()
+        doctor = create_doctor()
+        patients = [create_patient(email=f"patient{number}@example.com") for number in range(8)]
+        barrier = threading.Barrier(len(patients))
+        results = []
+
+        def book(number, patient):
+            client = APIClient()
+            client.force_authenticate(admin)
+            if number % 2:
+                url, payload = APPOINTMENT_URL, booking(patient, doctor)
+            else:
+                url, payload = SERIES_URL, {
+                    "series_frequency": AppointmentSeries.Frequency.DAILY,
+                    "series_start": "2022-09-08", "series_until": "2022-09-10",
+                    "series_time": "10:00", "series_duration": 30,
+                    "series_patient": patient.patient_id, "series_doctor": doctor.doctor_id,
+                }
+            try:
+                barrier.wait()
+                results.append(client.post(url, payload, format="json").status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(number, patient)) for number, patient in enumerate(patients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [201] + [409] * (len(patients) - 1))
+        self.assertEqual(Appointment.objects.count() + AppointmentSeries.objects.count(), 1)
+
+    def test_parallel_replacements_of_one_occurrence(self):
+        """Test exactly one of several parallel changes of a series occurrence is stored, the others rejected."""
+        admin = create_user()
+        doctor = create_doctor()
+        series = AppointmentSeries.objects.create(
+            series_frequency=AppointmentSeries.Frequency.DAILY, series_start="2022-09-08",
+            series_until="2022-09-10", series_time="10:00", series_duration=30,
+            series_patient=create_patient(), series_doctor=doctor, created_by=admin)
+        url = reverse("appointment:appointmentseries-occurrences", args=[series.series_id])
+        barrier = threading.Barrier(8)
+        results = []
+
+        def replace(hour):
+            client = APIClient()
+            client.force_authenticate(admin)
+            try:
+                barrier.wait()
+                results.append(client.post(
+                    url, {"occurrence_date": "2022-09-09", "appointment_time": f"{hour}:00"}).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=replace, args=(hour,)) for hour in range(11, 19)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Requests that start after the first one is stored are rejected by validation instead.
+        self.assertEqual(len(results), 8)
+        self.assertEqual(sorted(results)[0], 201)
+        self.assertTrue(all(result in (400, 409) for result in sorted(results)[1:]), results)
+        self.assertEqual(Appointment.objects.count(), 1)
@@ -0,0 +1,191 @@
+"""Tests for the bulk appointment endpoint."""
+
+from datetime import date, timedelta
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment.models import Appointment
+from users.models import User, Patient, Doctor
+
+BULK_URL = reverse("appointment:appointment-bulk")
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
+    """Create and return a user. Returns AdminUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def create_patient(email="patient@example.com"):
+    """Create and return a patient profile."""
+    return Patient.objects.create(
+        patient_name="Test Patient", patient_dob="2000-03-13",
+        user=create_user(email=email, role=User.Role.PATIENT, is_staff=False))
+
+
+def create_doctor(email="doctor@example.com"):
+    """Create and return a doctor profile."""
+    return Doctor.objects.create(
+        doctor_name="Test Doctor", doctor_dob="2000-02-12",
+        user=create_user(email=email, role=User.Role.DOCTOR, is_staff=False))
+
+
+def create_appointment(patient, doctor, user, appointment_date="2022-09-09", appointment_time="10:00:00"):
+    """Create and return a booked appointment."""
+    return Appointment.objects.create(
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
+        appointment_status=Appointment.Status.BOOKED,
+        appointment_patient=patient,
+        appointment_doctor=doctor,
+        created_by=user,
+    )
+
+
+class BulkAppointmentTests(TestCase):
+    """Test creating, updating and cancelling appointments in one request."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.patient = create_patient()
+        self.doctor = create_doctor()
+
+    def test_mixed_operations(self):
+        """Test creates, reschedules and cancellations are applied with a result per item."""
+        moved = create_appointment(self.patient, self.doctor, self.user)
+        cancelled = create_appointment(self.patient, self.doctor, self.user, appointment_time="11:00:00")
+        payload = [
+            {"appointment_id": moved.appointment_id, "appointment_date": "2022-09-10"},
+            {
+                "appointment_date": "2022-09-09",
+                "appointment_time": "14:00:00",
+                "appointment_status": Appointment.Status.BOOKED,
+                "appointment_patient": self.patient.patient_id,
+                "appointment_doctor": self.doctor.doctor_id,
+            },
+            {"appointment_id": cancelled.appointment_id, "appointment_status": Appointment.Status.CANCELLED},
+        ]
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in res.data["results"]], [200, 201, 200])
+        moved.refresh_from_db()
+        cancelled.refresh_from_db()
+        self.assertEqual(moved.appointment_date, date(2022, 9, 10))
+        self.assertEqual(moved.appointment_time.hour, 10)
+        self.assertEqual(cancelled.appointment_status, Appointment.Status.CANCELLED)
+        created = Appointment.objects.get(pk=res.data["results"][1]["data"]["appointment_id"])
+        self.assertEqual(created.created_by, self.user)
+
+    def test_invalid_item_applies_nothing(self):
+        """Test one invalid item rejects the whole request with its index."""
+        appointment = create_appointment(self.patient, self.doctor, self.user)
+        payload = [
+            {"appointment_id": appointment.appointment_id, "appointment_date": "2022-09-10"},
+            {"appointment_id": appointment.appointment_id + 100, "appointment_status": Appointment.Status.CANCELLED},
+            {"appointment_date": "2022-09-09", "appointment_time": "14:00:00",
+             "appointment_patient": self.patient.patient_id, "appointment_doctor": 0},
+        ]
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error["index"] for error in res.data["errors"]], [1, 2])
+        self.assertIn("appointment_doctor", res.data["errors"][1]["errors"])
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.appointment_date, date(2022, 9, 9))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_not_a_list(self):
+        """Test the body must be a non-empty list."""
+        res = self.client.post(BULK_URL, {"appointment_date": "2022-09-09"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_double_booking_conflict(self):
+        """Test an overlap within the batch returns 409 and applies nothing."""
+        create_appointment(self.patient, self.doctor, self.user)
+        other = create_appointment(self.patient, self.doctor, self.user, appointment_time="12:00:00")
+        res = self.client.post(BULK_URL, [
+            {"appointment_id": other.appointment_id, "appointment_time": "10:00:00"},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        other.refresh_from_db()
+        self.assertEqual(other.appointment_time.hour, 12)
+
+    def test_cancel_and_rebook_slot(self):
+        """Test a slot cancelled in the request can be booked again in the same request."""
+        cancelled = create_appointment(self.patient, self.doctor, self.user)
+        other_patient = create_patient(email="patient2@example.com")
+        res = self.client.post(BULK_URL, [
+            {
+                "appointment_date": "2022-09-09",
+                "appointment_time": "10:00:00",
+                "appointment_status": Appointment.Status.BOOKED,
+                "appointment_patient": other_patient.patient_id,
+                "appointment_doctor": self.doctor.doctor_id,
+            },
+            {"appointment_id": cancelled.appointment_id, "appointment_status": Appointment.Status.CANCELLED},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in res.data["results"]], [201, 200])
+        self.assertEqual(Appointment.objects.exclude(appointment_status=Appointment.Status.CANCELLED).get()
+                         .appointment_patient, other_patient)
+
+    def test_shift_day_by_one_slot(self):
+        """Test back to back appointments can all move one slot later, each into the next one's time."""
+        first = create_appointment(self.patient, self.doctor, self.user)
+        second = create_appointment(self.patient, self.doctor, self.user, appointment_time="10:15:00")
+        res = self.client.post(BULK_URL, [
+            {"appointment_id": first.appointment_id, "appointment_time": "10:15:00"},
+            {"appointment_id": second.appointment_id, "appointment_time": "10:30:00"},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.appointment_time.hour, first.appointment_time.minute), (10, 15))
+        self.assertEqual((second.appointment_time.hour, second.appointment_time.minute), (10, 30))
+
+    def test_admin_only(self):
+        """Test patients and doctors can't use the bulk endpoint."""
+        client = APIClient()
+        client.force_authenticate(self.doctor.user)
+        res = client.post(BULK_URL, [], format="json")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reschedule_many_in_constant_queries(self):
+        """Test rescheduling 200 appointments of several patients and doctors takes a handful of queries."""
+        patients = [create_patient(email=f"patient{i}@example.com") for i in range(5)]
+        doctors = [create_doctor(email=f"doctor{i}@example.com") for i in range(5)]
+        start = date(2022, 9, 1)
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                appointment_date=start + timedelta(days=i // 5),
+                appointment_time="10:00:00",
+                appointment_status=Appointment.Status.BOOKED,
+                appointment_patient=patients[i % 5],
+                appointment_doctor=doctors[i % 5],
+                created_by=self.user,
+            )
+            for i in range(200)
+        ])
+        payload = [
+            {
+                "appointment_id": appointment.appointment_id,
+                "appointment_date": (start + timedelta(days=i // 5 + 60)).isoformat(),
+                "appointment_doctor": doctors[(i + 1) % 5].doctor_id,
+            }
+            for i, appointment in enumerate(appointments)
+        ]
+        # Appointments and doctors, then the savepoint, the doctors' locks and
+        # series, deferring the double booking constraint, the update, checking
+        # the constraint, the schedule entries and the release.
+        with self.assertNumQueries(10):
+            res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 200)
+        self.assertFalse(Appointment.objects.filter(appointment_date__lt=start + timedelta(days=60)).exists())
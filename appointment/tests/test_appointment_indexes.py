@@ -0,0 +1,95 @@
+"""Tests that the appointment lists are served by indexes."""
+
+from datetime import date, timedelta
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from appointment.models import Appointment
+from appointment.views import AppointmentViewSet
+from backend_cms.pagination import KeysetPagination
+from users.models import User, Patient, Doctor
+
+
+def create_user(email, role):
+    """Create and return a user with the given role."""
+    return User.objects.create_user(email=email, password="testpass123", role=role,
+                                    is_staff=role == User.Role.ADMIN)
+
+
+def list_queryset(user, params=None):
+    """Return the queryset AppointmentViewSet lists for the user."""
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = AppointmentViewSet(request=request, action="list", format_kwarg=None)
+    return view.get_queryset()
+
+
+@skipUnless(connection.vendor == "postgresql", "Partial indexes and EXPLAIN output need PostgreSQL.")
+class AppointmentIndexTests(TestCase):
+    """Test every appointment list is read in order from an index, without scanning or sorting."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", User.Role.ADMIN)
+        cls.patient_user = create_user("patient@example.com", User.Role.PATIENT)
+        cls.doctor_user = create_user("doctor@example.com", User.Role.DOCTOR)
+        patients = [Patient.objects.create(patient_name="Test Patient", patient_dob="2000-03-13", user=cls.patient_user)]
+        doctors = [Doctor.objects.create(doctor_name="Test Doctor", doctor_dob="2000-02-12", user=cls.doctor_user)]
+        for number in range(1, 10):
+            patients.append(Patient.objects.create(
+                patient_name="Test Patient", patient_dob="2000-03-13",
+                user=create_user(f"patient{number}@example.com", User.Role.PATIENT)))
+            doctors.append(Doctor.objects.create(
+                doctor_name="Test Doctor", doctor_dob="2000-02-12",
+                user=create_user(f"doctor{number}@example.com", User.Role.DOCTOR)))
+        # Enough appointments, spread over several patients and doctors, for realistic plans.
+        statuses = [Appointment.Status.BOOKED, Appointment.Status.ATTENDED, Appointment.Status.CANCELLED]
+        Appointment.objects.bulk_create(
+            Appointment(
+                appointment_date=date(2020, 1, 1) + timedelta(days=day),
+                appointment_time="10:00",
+                appointment_status=statuses[(day + number) % 3],
+                appointment_patient=patients[number],
+                appointment_doctor=doctors[(day + number) % 10],
+                created_by=cls.patient_user,
+            )
+            for day in range(100) for number in range(10))
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE appointment_appointment")
+            # The tables are still small, so make the planner prefer an ordered
+            # index scan whenever there is a usable index, even for the few rows
+            # of one doctor's filtered list that would be cheaper to sort.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def assertIndexOnly(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn("Seq Scan", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_list_uses_indexes(self):
+        """Test the admin, patient and doctor lists each use their partial index."""
+        for user, index in [(self.admin, "appointment_active"),
+                            (self.patient_user, "appointment_patient_active"),
+                            (self.doctor_user, "appointment_doctor_active")]:
+            user = User.objects.get(pk=user.pk)
+            with self.subTest(role=user.role):
+                self.assertIndexOnly(list_queryset(user)[:50], index)
+                self.assertIndexOnly(list_queryset(user, {"status": "attended"})[:50], index)
+
+    def test_keyset_page_uses_index(self):
+        """Test a cursor page after the first is still read from the index."""
+        user = User.objects.get(pk=self.doctor_user.pk)
+        queryset = list_queryset(user)
+        paginator = KeysetPagination()
+        fields, _ = paginator.get_ordering(queryset)
+        position = dict(zip(fields, ["2022-03-01", "10:00:00", 100]))
+        page = queryset.filter(paginator.row_comparison(Appointment, position, after=False))
+        page = page.order_by(*["-" + field for field in fields])[:50]
+        self.assertIndexOnly(page, "appointment_doctor_active")
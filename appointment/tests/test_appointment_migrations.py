@@ -0,0 +1,59 @@
+"""Tests for the appointment migrations that check existing data."""
+
+from unittest import skipUnless
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from users.models import User, Patient, Doctor
+
+BEFORE = [("appointment", "0013_doctorschedule_slot_minutes")]
+CONSTRAINT = [("appointment", "0014_alter_appointment_no_double_booking")]
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
+    """Create and return a user. Returns AdminUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def migrate(targets):
+    """Migrate the database to the given migrations and return their models."""
+    executor = MigrationExecutor(connection)
+    executor.migrate(targets)
+    executor.loader.build_graph()
+    return executor.loader.project_state(targets).apps
+
+
+@skipUnless(connection.vendor == "postgresql", "The double booking constraint needs PostgreSQL.")
+class DoubleBookingMigrationTests(TransactionTestCase):
+    """Test the double booking constraint isn't added over existing overlaps."""
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_overlapping_appointments_listed(self):
+        """Test the migration stops and lists overlapping appointments, then runs once they are cancelled."""
+        admin = create_user()
+        patient = Patient.objects.create(
+            patient_name="Test Patient", patient_dob="2000-03-13",
+            user=create_user(email="patient@example.com", role=User.Role.PATIENT, is_staff=False))
+        doctor = Doctor.objects.create(
+            doctor_name="Test Doctor", doctor_dob="2000-02-12",
+            user=create_user(email="doctor@example.com", role=User.Role.DOCTOR, is_staff=False))
+        Appointment = migrate(BEFORE).get_model("appointment", "Appointment")
+        # As if 0010 had been faked, so overlapping appointments could be saved.
+        with connection.cursor() as cursor:
+            cursor.execute("ALTER TABLE appointment_appointment DROP CONSTRAINT appointment_no_double_booking")
+        first, second, _ = [
+            Appointment.objects.create(
+                appointment_date="2022-09-09", appointment_time=time, appointment_duration=30,
+                appointment_status="BOOKED", appointment_patient_id=patient.patient_id,
+                appointment_doctor_id=doctor.doctor_id, created_by_id=admin.id)
+            for time in ["10:00", "10:15", "10:30"]
+        ]
+
+        with self.assertRaisesMessage(
+                RuntimeError, f"doctor {doctor.doctor_id}: appointments {first.pk} and {second.pk}"):
+            migrate(CONSTRAINT)
+        Appointment.objects.filter(pk=second.pk).update(appointment_status="CANCELLED")
+        migrate(CONSTRAINT)
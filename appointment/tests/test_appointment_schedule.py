@@ -0,0 +1,193 @@
+"""Tests for the schedule entries and the schedule API."""
+
+from datetime import date, time
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment.models import Appointment, AppointmentSeries, ScheduleEntry
+from clinic.models import Clinic
+from users.models import User, Patient, Doctor
+
+APPOINTMENT_URL = reverse("appointment:appointment-list")
+BULK_URL = reverse("appointment:appointment-bulk")
+SCHEDULE_URL = reverse("appointment:schedule")
+
+
+def detail_url(appointment_id):
+    """Create and return an detail url."""
+    return reverse("appointment:appointment-detail", args=[appointment_id])
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
+    """Create and return a user. Returns AdminUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def create_patient(email="patient@example.com", name="Test Patient"):
+    """Create and return a patient profile."""
+    return Patient.objects.create(
+        patient_name=name, patient_dob="2000-03-13",
+        user=create_user(email=email, role=User.Role.PATIENT, is_staff=False))
+
+
+def create_doctor(email="doctor@example.com", clinic=None):
+    """Create and return a doctor profile."""
+    return Doctor.objects.create(
+        doctor_name="Test Doctor", doctor_dob="2000-02-12", doctor_clinic=clinic,
+        user=create_user(email=email, role=User.Role.DOCTOR, is_staff=False))
+
+
+def create_appointment(patient, doctor, user, appointment_date="2022-03-07", appointment_time="10:00", **params):
+    """Create and return a booked appointment."""
+    return Appointment.objects.create(
+        appointment_date=appointment_date, appointment_time=appointment_time,
+        appointment_status=Appointment.Status.BOOKED, appointment_patient=patient,
+        appointment_doctor=doctor, created_by=user, **params)
+
+
+class ScheduleEntryTests(TestCase):
+    """Test schedule entries follow appointment, patient and doctor changes."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.clinic = Clinic.objects.create(clinic_name="Test Clinic")
+        self.patient = create_patient()
+        self.doctor = create_doctor(clinic=self.clinic)
+
+    def test_entry_follows_appointment(self):
+        """Test creating and updating an appointment writes its entry."""
+        appointment = create_appointment(self.patient, self.doctor, self.user)
+        entry = ScheduleEntry.objects.get(pk=appointment.pk)
+        self.assertEqual(entry.entry_patient_name, "Test Patient")
+        self.assertEqual(entry.entry_clinic, self.clinic)
+
+        appointment.appointment_time = "11:00"
+        appointment.appointment_status = Appointment.Status.CANCELLED
+        appointment.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.entry_time, time(11, 0))
+        self.assertEqual(entry.entry_status, Appointment.Status.CANCELLED)
+
+        appointment.delete()
+        self.assertFalse(ScheduleEntry.objects.exists())
+
+    def test_entry_follows_patient_and_doctor(self):
+        """Test renaming the patient or moving the doctor to another clinic updates the entries."""
+        appointment = create_appointment(self.patient, self.doctor, self.user)
+        self.patient.patient_name = "Renamed Patient"
+        self.patient.save()
+        other = Clinic.objects.create(clinic_name="Other Clinic")
+        self.doctor.doctor_clinic = other
+        self.doctor.save()
+
+        entry = ScheduleEntry.objects.get(pk=appointment.pk)
+        self.assertEqual(entry.entry_patient_name, "Renamed Patient")
+        self.assertEqual(entry.entry_clinic, other)
+
+    def test_bulk_changes_refresh_entries(self):
+        """Test appointments created and updated in bulk have up to date entries."""
+        appointment = create_appointment(self.patient, self.doctor, self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.post(BULK_URL, [
+            {"appointment_id": appointment.appointment_id, "appointment_date": "2022-03-08"},
+            {"appointment_date": "2022-03-09", "appointment_time": "09:00:00",
+             "appointment_status": Appointment.Status.BOOKED,
+             "appointment_patient": self.patient.patient_id, "appointment_doctor": self.doctor.doctor_id},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(ScheduleEntry.objects.values_list("entry_date", flat=True)),
+                         [date(2022, 3, 8), date(2022, 3, 9)])
+
+    def test_rebuild_command(self):
+        """Test the rebuild command writes missing entries."""
+        create_appointment(self.patient, self.doctor, self.user)
+        ScheduleEntry.objects.all().delete()
+        call_command("rebuild_schedule", stdout=StringIO())
+        self.assertEqual(ScheduleEntry.objects.count(), 1)
+
+
+class ScheduleAPITests(TestCase):
+    """Test the compact schedule of doctors and clinics."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.clinic = Clinic.objects.create(clinic_name="Test Clinic")
+        self.patient = create_patient()
+        self.doctor = create_doctor(clinic=self.clinic)
+
+    def test_clinic_week(self):
+        """Test a clinic's week lists each doctor's day with only the appointment id, time, status and patient."""
+        other = create_doctor(email="other@example.com", clinic=self.clinic)
+        elsewhere = create_doctor(email="elsewhere@example.com")
+        first = create_appointment(self.patient, self.doctor, self.user, appointment_time="11:00")
+        second = create_appointment(self.patient, self.doctor, self.user, appointment_time="09:00")
+        third = create_appointment(self.patient, other, self.user, appointment_date="2022-03-08")
+        create_appointment(self.patient, elsewhere, self.user)
+        create_appointment(self.patient, self.doctor, self.user, appointment_date="2022-03-14")
+
+        with self.assertNumQueries(2):
+            res = self.client.get(SCHEDULE_URL, {"clinic": self.clinic.clinic_id, "start": "2022-03-07"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {"date": "2022-03-07", "doctor": self.doctor.doctor_id, "appointments": [
+                {"id": second.appointment_id, "time": "09:00", "status": "BOOKED", "patient": "Test Patient"},
+                {"id": first.appointment_id, "time": "11:00", "status": "BOOKED", "patient": "Test Patient"},
+            ]},
+            {"date": "2022-03-08", "doctor": other.doctor_id, "appointments": [
+                {"id": third.appointment_id, "time": "10:00", "status": "BOOKED", "patient": "Test Patient"},
+            ]},
+        ])
+
+    def test_series_occurrences_included(self):
+        """Test occurrences of a series are in the doctor's schedule, without an id."""
+        AppointmentSeries.objects.create(
+            series_frequency=AppointmentSeries.Frequency.DAILY, series_start="2022-03-07",
+            series_until="2022-03-08", series_time="14:00", series_patient=self.patient,
+            series_doctor=self.doctor, created_by=self.user)
+        res = self.client.get(SCHEDULE_URL, {"doctor": self.doctor.doctor_id,
+                                             "start": "2022-03-07", "end": "2022-03-07"})
+        self.assertEqual(res.data[0]["appointments"],
+                         [{"id": None, "time": "14:00", "status": "BOOKED", "patient": "Test Patient"}])
+
+    def test_doctor_or_clinic_required(self):
+        """Test a schedule needs a doctor or clinic."""
+        res = self.client.get(SCHEDULE_URL, {"start": "2022-03-07"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_patients_forbidden(self):
+        """Test patients can't see other patients' names in the schedule."""
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.patient.user_id))
+        res = client.get(SCHEDULE_URL, {"doctor": self.doctor.doctor_id, "start": "2022-03-07"})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_doctors_see_own_schedule_and_clinic(self):
+        """Test doctors can see their own schedule and their clinic's, but not other doctors or clinics."""
+        other_clinic = Clinic.objects.create(clinic_name="Other Clinic")
+        elsewhere = create_doctor(email="elsewhere@example.com", clinic=other_clinic)
+        client = APIClient()
+        client.force_authenticate(self.doctor.user)
+        for params, expected in [
+            ({"doctor": self.doctor.doctor_id}, status.HTTP_200_OK),
+            ({"clinic": self.clinic.clinic_id}, status.HTTP_200_OK),
+            ({"doctor": elsewhere.doctor_id}, status.HTTP_403_FORBIDDEN),
+            ({"clinic": other_clinic.clinic_id}, status.HTTP_403_FORBIDDEN),
+            ({"doctor": self.doctor.doctor_id, "clinic": other_clinic.clinic_id}, status.HTTP_403_FORBIDDEN),
+        ]:
+            res = client.get(SCHEDULE_URL, {**params, "start": "2022-03-07"})
+            self.assertEqual(res.status_code, expected, params)
+
+    def test_doctor_without_profile_forbidden(self):
+        """Test a doctor user without a doctor profile gets 403 instead of an error."""
+        client = APIClient()
+        client.force_authenticate(create_user(email="noprofile@example.com", role=User.Role.DOCTOR, is_staff=False))
+        res = client.get(SCHEDULE_URL, {"clinic": self.clinic.clinic_id, "start": "2022-03-07"})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,225 @@
+"""Tests for recurring appointment series."""
+
+from datetime import date, datetime
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from appointment.availability import find_availability
+from appointment.models import Appointment, AppointmentSeries, DoctorSchedule
+from appointment.recurrence import nth_occurrence, occurrence_dates
+from users.models import User, Patient, Doctor
+
+APPOINTMENT_URL = reverse("appointment:appointment-list")
+SERIES_URL = reverse("appointment:appointmentseries-list")
+# A Monday.
+MONDAY = date(2022, 3, 7)
+
+
+def occurrences_url(series_id):
+    """Create and return the url modifying occurrences of a series."""
+    return reverse("appointment:appointmentseries-occurrences", args=[series_id])
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
+    """Create and return a user. Returns AdminUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def create_patient(email="patient@example.com"):
+    """Create and return a patient profile."""
+    return Patient.objects.create(
+        patient_name="Test Patient", patient_dob="2000-03-13",
+        user=create_user(email=email, role=User.Role.PATIENT, is_staff=False))
+
+
+def create_doctor(email="doctor@example.com"):
+    """Create and return a doctor profile."""
+    return Doctor.objects.create(
+        doctor_name="Test Doctor", doctor_dob="2000-02-12",
+        user=create_user(email=email, role=User.Role.DOCTOR, is_staff=False))
+
+
+def create_series(patient, doctor, user, **params):
+    """Create and return a weekly series on Mondays at 10:00 from MONDAY, for a year."""
+    defaults = {
+        "series_frequency": AppointmentSeries.Frequency.WEEKLY,
+        "series_start": MONDAY,
+        "series_until": date(2023, 3, 6),
+        "series_time": "10:00",
+        "series_duration": 30,
+    }
+    defaults.update(params)
+    return AppointmentSeries.objects.create(
+        series_patient=patient, series_doctor=doctor, created_by=user, **defaults)
+
+
+class RecurrenceTests(TestCase):
+    """Test occurrence dates are computed directly for a window."""
+
+    def series(self, frequency, start=MONDAY, until=date(2025, 1, 1), **params):
+        return AppointmentSeries(series_frequency=frequency, series_start=start, series_until=until, **params)
+
+    def test_weekly_on_weekdays(self):
+        """Test a series every other week on Monday and Thursday, starting in a later week."""
+        series = self.series(AppointmentSeries.Frequency.WEEKLY, series_interval=2, series_weekdays=[3, 0])
+        self.assertEqual(list(occurrence_dates(series, date(2022, 3, 14), date(2022, 3, 31))),
+                         [date(2022, 3, 21), date(2022, 3, 24)])
+
+    def test_daily_interval(self):
+        """Test a series every third day keeps its grid inside the window."""
+        series = self.series(AppointmentSeries.Frequency.DAILY, series_interval=3)
+        self.assertEqual(list(occurrence_dates(series, date(2022, 3, 8), date(2022, 3, 16))),
+                         [date(2022, 3, 10), date(2022, 3, 13), date(2022, 3, 16)])
+
+    def test_monthly_skips_short_months(self):
+        """Test a monthly series on the 31st skips months without one."""
+        series = self.series(AppointmentSeries.Frequency.MONTHLY, start=date(2022, 1, 31))
+        self.assertEqual(list(occurrence_dates(series, date(2022, 1, 1), date(2022, 5, 31))),
+                         [date(2022, 1, 31), date(2022, 3, 31), date(2022, 5, 31)])
+
+    def test_until_and_count(self):
+        """Test occurrences stop at series_until and the n-th occurrence ignores it."""
+        series = self.series(AppointmentSeries.Frequency.WEEKLY, until=date(2022, 3, 20))
+        self.assertEqual(list(occurrence_dates(series)), [MONDAY, date(2022, 3, 14)])
+        self.assertEqual(nth_occurrence(series, 10), date(2022, 5, 9))
+        self.assertEqual(series.series_until, date(2022, 3, 20))
+
+
+class AppointmentSeriesAPITests(TestCase):
+    """Test creating series and listing and changing their occurrences."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.patient = create_patient()
+        self.doctor = create_doctor()
+
+    def payload(self, **params):
+        payload = {
+            "series_frequency": AppointmentSeries.Frequency.WEEKLY,
+            "series_start": MONDAY.isoformat(),
+            "series_time": "10:00",
+            "series_duration": 30,
+            "series_patient": self.patient.patient_id,
+            "series_doctor": self.doctor.doctor_id,
+        }
+        payload.update(params)
+        return payload
+
+    def test_create_with_count(self):
+        """Test a series of 12 weekly appointments ends on its 12th occurrence, without storing them."""
+        res = self.client.post(SERIES_URL, self.payload(series_count=12, series_weekdays=[0]), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["series_until"], "2022-05-23")
+        self.assertEqual(res.data["created_by"], self.user.id)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_create_needs_an_end(self):
+        """Test a series without series_until or series_count is rejected."""
+        res = self.client.post(SERIES_URL, self.payload(), format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_overlapping_appointment(self):
+        """Test a series with an occurrence during an appointment of the doctor returns 409."""
+        Appointment.objects.create(
+            appointment_date="2022-03-21", appointment_time="10:15", appointment_status=Appointment.Status.BOOKED,
+            appointment_patient=self.patient, appointment_doctor=self.doctor, created_by=self.user)
+        res = self.client.post(SERIES_URL, self.payload(series_count=4), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(AppointmentSeries.objects.exists())
+
+    def test_list_window_includes_occurrences(self):
+        """Test a date range lists stored appointments and the series occurrences, newest first."""
+        create_series(self.patient, self.doctor, self.user)
+        stored = Appointment.objects.create(
+            appointment_date="2022-03-15", appointment_time="09:00", appointment_status=Appointment.Status.BOOKED,
+            appointment_patient=self.patient, appointment_doctor=self.doctor, created_by=self.user)
+        res = self.client.get(APPOINTMENT_URL, {"start": "2022-03-07", "end": "2022-03-20"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual([ap["appointment_date"] for ap in res.data["results"]],
+                         ["2022-03-15", "2022-03-14", "2022-03-07"])
+        self.assertEqual(res.data["results"][0]["appointment_id"], stored.appointment_id)
+        self.assertIsNone(res.data["results"][1]["appointment_id"])
+        self.assertEqual(res.data["results"][1]["appointment_patient"]["patient_name"], "Test Patient")
+
+    def test_list_window_queries_independent_of_range(self):
+        """Test listing two months of several series takes the same queries as one week."""
+        for number in range(5):
+            create_series(self.patient, create_doctor(email=f"doctor{number}@example.com"), self.user,
+                          series_frequency=AppointmentSeries.Frequency.DAILY)
+        # Count and page of appointments, the series and their replaced occurrences.
+        with self.assertNumQueries(3):
+            res = self.client.get(APPOINTMENT_URL, {"start": "2022-03-07", "end": "2022-05-07", "page_size": 200})
+        self.assertEqual(res.data["count"], 5 * 62)
+
+    def test_modify_and_cancel_occurrences(self):
+        """Test changed and cancelled occurrences are stored and replace the computed ones."""
+        series = create_series(self.patient, self.doctor, self.user)
+        res = self.client.post(occurrences_url(series.series_id),
+                               {"occurrence_date": "2022-03-14", "appointment_time": "11:00"})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["appointment_series"], series.series_id)
+        self.assertEqual(res.data["appointment_time"], "11:00:00")
+        res = self.client.post(occurrences_url(series.series_id),
+                               {"occurrence_date": "2022-03-21", "appointment_status": Appointment.Status.CANCELLED})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(APPOINTMENT_URL, {"start": "2022-03-07", "end": "2022-03-27"})
+        self.assertEqual([(ap["appointment_date"], ap["appointment_time"]) for ap in res.data["results"]],
+                         [("2022-03-14", "11:00:00"), ("2022-03-07", "10:00:00")])
+
+    def test_occurrence_must_exist(self):
+        """Test only dates the series occurs on, and not replaced yet, can be changed."""
+        series = create_series(self.patient, self.doctor, self.user)
+        res = self.client.post(occurrences_url(series.series_id), {"occurrence_date": "2022-03-15"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.post(occurrences_url(series.series_id), {"occurrence_date": "2022-03-14"})
+        res = self.client.post(occurrences_url(series.series_id), {"occurrence_date": "2022-03-14"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_booking_over_occurrence(self):
+        """Test an appointment overlapping an occurrence returns 409 until the occurrence is cancelled."""
+        series = create_series(self.patient, self.doctor, self.user)
+        payload = {
+            "appointment_date": "2022-03-14",
+            "appointment_time": "10:00:00",
+            "appointment_status": Appointment.Status.BOOKED,
+            "appointment_patient": self.patient.patient_id,
+            "appointment_doctor": self.doctor.doctor_id,
+        }
+        res = self.client.post(APPOINTMENT_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        self.client.post(occurrences_url(series.series_id),
+                         {"occurrence_date": "2022-03-14", "appointment_status": Appointment.Status.CANCELLED})
+        res = self.client.post(APPOINTMENT_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_availability_excludes_occurrences(self):
+        """Test occurrences take up the doctor's free slots."""
+        DoctorSchedule.objects.create(
+            schedule_doctor=self.doctor, schedule_weekday=0, schedule_start="09:00", schedule_end="11:00",
+            schedule_slot_minutes=30)
+        create_series(self.patient, self.doctor, self.user)
+        availability = find_availability(
+            MONDAY, MONDAY, doctor_ids=[self.doctor.doctor_id],
+            now=timezone.make_aware(datetime(2022, 3, 1)))
+        self.assertEqual([slot.strftime("%H:%M") for slot in availability[0]["slots"]], ["09:00", "09:30", "10:30"])
+
+    def test_patient_sees_own_series(self):
+        """Test patients only list their own series."""
+        create_series(self.patient, self.doctor, self.user)
+        create_series(create_patient(email="patient2@example.com"), create_doctor(email="doctor2@example.com"),
+                      self.user)
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.patient.user_id))
+        res = client.get(SERIES_URL)
+        self.assertEqual(res.data["count"], 1)
+        self.assertEqual(res.data["results"][0]["series_patient"], self.patient.patient_id)
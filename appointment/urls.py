@@ -6,7 +6,11 @@ from appointment import views
 
 router = DefaultRouter()
 router.register("appointments", views.AppointmentViewSet)
+router.register("series", views.AppointmentSeriesViewSet)
+router.register("schedules", views.DoctorScheduleViewSet)
 app_name = "appointment"
 urlpatterns = [
+    path("availability/", views.AvailabilityAPIView.as_view(), name="availability"),
+    path("schedule/", views.ScheduleAPIView.as_view(), name="schedule"),
     path("", include(router.urls)),
 ]
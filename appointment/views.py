@@ -1,20 +1,48 @@
 """Views for Appointment Module."""
 
 from rest_framework import viewsets, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from appointment.models import Appointment
-from users.models import User, Patient, Doctor
-from appointment.serializers import AppointmentSerializer, AppointmentSerializerExtended
+from appointment.availability import find_availability
+from appointment.bulk import BulkAppointments
+from appointment.models import Appointment, AppointmentSeries, DoctorSchedule
+from appointment.recurrence import expand, occurrence
+from appointment.schedule import get_schedule
+from backend_cms.pagination import KeysetPagination
+from diagnosis.permissions import IsDoctorOrAdmin
+from users.authentication import CachedTokenAuthentication
+from users.models import User
+from appointment.serializers import (
+    AppointmentSerializer, AppointmentSerializerExtended, AppointmentSeriesSerializer,
+    AvailabilityQuerySerializer, AvailabilitySerializer, DateRangeSerializer,
+    DoctorScheduleSerializer, OccurrenceSerializer, ScheduleQuerySerializer, ScheduleSerializer
+)
+
+
+def series_for(user):
+    """Return the appointment series the user can see, with their patient, doctor and clinic."""
+    queryset = AppointmentSeries.objects.select_related("series_patient", "series_doctor", "series_clinic")
+    if user.role == User.Role.ADMIN:
+        return queryset
+    elif user.role == User.Role.PATIENT:
+        return queryset.filter(series_patient=user.profile)
+    else:
+        # user is a doctor
+        return queryset.filter(series_doctor=user.profile)
 
 
 class AppointmentViewSet(viewsets.ModelViewSet):
     """View for managing the Appointments API."""
     serializer_class = AppointmentSerializer
-    queryset = Appointment.objects.all()
-    authentication_classes = [TokenAuthentication]
+    # Relations nested by AppointmentSerializerExtended, loaded in the same query.
+    queryset = Appointment.objects.select_related(
+        "appointment_patient", "appointment_doctor", "appointment_clinic")
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Retrieve appointments for authenticated users."""
@@ -35,14 +63,32 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                     appointment_status=Appointment.Status.CANCELLED)
         user = self.request.user
         if user.role == User.Role.ADMIN:
-            return queryset.order_by("-appointment_date", "-appointment_time")
+            return queryset.order_by("-appointment_date", "-appointment_time", "-appointment_id")
         elif user.role == User.Role.PATIENT:
-            patient_profile = Patient.objects.get(user=user)
-            return queryset.filter(appointment_patient=patient_profile).order_by("-appointment_date", "-appointment_time")
+            return queryset.filter(appointment_patient=user.profile).order_by(
+                "-appointment_date", "-appointment_time", "-appointment_id")
         else:
             # user is a doctor
-            doctor_profile = Doctor.objects.get(user=user)
-            return queryset.filter(appointment_doctor=doctor_profile).order_by("-appointment_date", "-appointment_time")
+            return queryset.filter(appointment_doctor=user.profile).order_by(
+                "-appointment_date", "-appointment_time", "-appointment_id")
+
+    def list(self, request, *args, **kwargs):
+        """List appointments, or with ?start= (and ?end=) those in a date range, series occurrences included."""
+        if "start" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        window = DateRangeSerializer(data=request.query_params)
+        window.is_valid(raise_exception=True)
+        start, end = window.validated_data["start"], window.validated_data["end"]
+        appointments = list(self.get_queryset().filter(
+            appointment_date__gte=start, appointment_date__lte=end))
+        # Occurrences that aren't stored are never attended or cancelled.
+        if request.query_params.get("status", "").lower() not in ["attended", "cancelled"]:
+            appointments += expand(series_for(request.user), start, end)
+        appointments.sort(key=lambda ap: (ap.appointment_date, ap.appointment_time, ap.appointment_id or 0),
+                          reverse=True)
+        page = self.paginate_queryset(appointments)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         """Creates appointments using given serializer, and returns data using ExtendedSerializer."""
@@ -72,7 +118,126 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         return_serializer = AppointmentSerializerExtended(ap)
         return Response(return_serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """Create, update and cancel many appointments at once, all or nothing.
+
+        Takes a list of appointments: items with an ``appointment_id`` are
+        partial updates, the others are created. Returns one result per item,
+        or the errors of the invalid items and applies nothing.
+        """
+        operations = BulkAppointments(request.data, request)
+        if not operations.is_valid():
+            return Response({"errors": operations.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": operations.save()}, status=status.HTTP_200_OK)
+
     def get_serializer_class(self):
         if self.action == "list" or self.action == "retrieve":
             return AppointmentSerializerExtended
         return self.serializer_class
+
+
+class AppointmentSeriesViewSet(viewsets.ModelViewSet):
+    """View for managing recurring appointments."""
+    serializer_class = AppointmentSeriesSerializer
+    queryset = AppointmentSeries.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Retrieve the series of the authenticated user."""
+        return series_for(self.request.user).order_by("-series_start", "-series_id")
+
+    @action(detail=True, methods=["post"])
+    def occurrences(self, request, pk=None):
+        """Modify or cancel one occurrence of the series, storing it as an appointment.
+
+        Takes the ``occurrence_date`` and the appointment fields to change, e.g.
+        ``appointment_status`` CANCELLED, and returns the new appointment.
+        """
+        series = self.get_object()
+        target = OccurrenceSerializer(data=request.data, context={"series": series})
+        target.is_valid(raise_exception=True)
+        day = target.validated_data["occurrence_date"]
+        data = {key: value for key, value in AppointmentSerializer(occurrence(series, day)).data.items()
+                if value is not None}
+        data.update((key, value) for key, value in request.data.items() if key != "occurrence_date")
+        serializer = AppointmentSerializer(data=data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        ap = serializer.save(appointment_series=series, appointment_occurrence_date=day)
+        return_serializer = AppointmentSerializerExtended(ap)
+        return Response(return_serializer.data, status=status.HTTP_201_CREATED)
+
+
+class DoctorScheduleViewSet(viewsets.ModelViewSet):
+    """View for managing the working hours of doctors."""
+    serializer_class = DoctorScheduleSerializer
+    queryset = DoctorSchedule.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Retrieve schedules, optionally of one doctor (?doctor=) or clinic (?clinic=)."""
+        queryset = self.queryset
+        doctor = self.request.query_params.get("doctor")
+        clinic = self.request.query_params.get("clinic")
+        if doctor:
+            queryset = queryset.filter(schedule_doctor=doctor)
+        if clinic:
+            queryset = queryset.filter(schedule_clinic=clinic)
+        return queryset.order_by("schedule_doctor", "schedule_weekday", "schedule_start")
+
+    def get_permissions(self):
+        """Instantiates and returns the list of permission that this view requires"""
+        if self.action == "list" or self.action == "retrieve":
+            permission_classes = [IsAuthenticated]
+        else:
+            permission_classes = [IsAdminUser]
+        return [permission() for permission in permission_classes]
+
+
+class AvailabilityAPIView(APIView):
+    """Free appointment slots of a doctor, or of every doctor of a clinic, over a date range."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the free slots per doctor and day for ?doctor= or ?clinic=, from ?start= to ?end=."""
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        availability = find_availability(
+            params["start"], params["end"],
+            doctor_ids=[params["doctor"]] if "doctor" in params else None,
+            clinic_id=params.get("clinic"),
+            duration=params.get("duration"),
+        )
+        return Response(AvailabilitySerializer(availability, many=True).data)
+
+
+class ScheduleAPIView(APIView):
+    """Compact day by day schedule of a doctor, or of every doctor of a clinic, for the calendar."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsDoctorOrAdmin]
+
+    def get(self, request):
+        """Return the appointments per day and doctor for ?doctor= or ?clinic=, from ?start= to ?end=.
+
+        Doctors can only see their own schedule or their clinic's.
+        """
+        query = ScheduleQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        if request.user.role == User.Role.DOCTOR:
+            doctor = request.user.profile
+            # A doctor user without a Doctor profile has no schedule to see.
+            if (doctor is None
+                    or params.get("doctor", doctor.doctor_id) != doctor.doctor_id
+                    or params.get("clinic", doctor.doctor_clinic_id) != doctor.doctor_clinic_id):
+                raise PermissionDenied("Doctors can only see their own schedule or their clinic's.")
+        schedule = get_schedule(
+            params["start"], params["end"],
+            doctor_id=params.get("doctor"),
+            clinic_id=params.get("clinic"),
+        )
+        return Response(ScheduleSerializer(schedule, many=True).data)
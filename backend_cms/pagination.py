@@ -0,0 +1,141 @@
+"""Pagination shared by the list endpoints."""
+
+import base64
+import json
+from django.db import connection
+from django.db.models import BooleanField, QuerySet
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardPagination(PageNumberPagination):
+    """Page number pagination: ``?page=`` and ``?page_size=`` (up to ``max_page_size``)."""
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class KeysetPagination(StandardPagination):
+    """Page number pagination with a keyset (cursor) mode for large, ordered lists.
+
+    Send ``?cursor=`` (empty for the first page) to switch to keyset mode.
+    Each page then continues from the last row of the previous one with a
+    ``WHERE (a, b, pk) < (...)`` row comparison, so deep pages cost the same
+    as the first one instead of an OFFSET scan. The response has ``next`` and
+    ``previous`` links but no ``count``.
+
+    The ordering is taken from the queryset, which must order every field in
+    the same direction; the primary key is added as the tie breaker. Lists
+    that aren't querysets are always paginated by page number.
+    """
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params or not isinstance(queryset, QuerySet):
+            self.cursor_mode = False
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_mode = True
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields, self.descending = self.get_ordering(queryset)
+
+        values, self.reverse = self.decode_cursor(request, queryset.model)
+        if values is not None:
+            # Moving backwards means continuing past the first row in the opposite direction.
+            after = self.descending == self.reverse
+            queryset = queryset.filter(self.row_comparison(queryset.model, values, after))
+        order = [("-" if self.descending != self.reverse else "") + field for field in self.fields]
+        rows = list(queryset.order_by(*order)[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def get_ordering(self, queryset):
+        """Return the ordering field names and whether they are descending."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering:
+            raise ValueError("KeysetPagination needs an ordered queryset.")
+        directions = {field.startswith("-") for field in ordering}
+        if len(directions) > 1:
+            raise ValueError("KeysetPagination needs every ordering field in the same direction.")
+        descending = directions.pop()
+        fields = [field.lstrip("-") for field in ordering]
+        pk = queryset.model._meta.pk.name
+        if pk not in fields and "pk" not in fields:
+            fields.append(pk)
+        return fields, descending
+
+    @staticmethod
+    def row_comparison(model, values, after):
+        """Return a filter for the rows whose ordering values are greater (or less) than ``values``."""
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ", ".join(
+            f"{table}.{connection.ops.quote_name(model._meta.get_field(field).column)}" for field in values)
+        placeholders = ", ".join(["%s"] * len(values))
+        operator = ">" if after else "<"
+        return RawSQL(f"({columns}) {operator} ({placeholders})",
+                      list(values.values()), output_field=BooleanField())
+
+    def decode_cursor(self, request, model):
+        """Return the ordering values and direction encoded in the cursor, or (None, False)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values = {field: model._meta.get_field(field).to_python(value)
+                      for field, value in zip(self.fields, position["v"])}
+            if len(values) != len(self.fields):
+                raise ValueError
+            return values, bool(position.get("r"))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        position = {"v": [self.field_value(row, field) for field in self.fields]}
+        if reverse:
+            position["r"] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def field_value(row, field):
+        value = getattr(row, field)
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or self.last_row is None:
+            return None
+        return self.encode_cursor(self.last_row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        if self.first_row is None:
+            return replace_query_param(self.base_url, self.cursor_query_param, "")
+        return self.encode_cursor(self.first_row, reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
@@ -179,5 +179,53 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "users.User"
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'backend_cms.pagination.StandardPagination',
+    'PAGE_SIZE': my_env.int("API_PAGE_SIZE", default=50),
 }
+
+# Token authentication cache. Each worker keeps tokens for AUTH_TOKEN_CACHE_LOCAL_TIMEOUT
+# seconds; with AUTH_TOKEN_CACHE_ALIAS set they are also shared through that cache in CACHES.
+AUTH_TOKEN_CACHE_SIZE = my_env.int("AUTH_TOKEN_CACHE_SIZE", default=1024)
+AUTH_TOKEN_CACHE_LOCAL_TIMEOUT = my_env.int("AUTH_TOKEN_CACHE_LOCAL_TIMEOUT", default=10)
+AUTH_TOKEN_CACHE_ALIAS = my_env("AUTH_TOKEN_CACHE_ALIAS", default=None)
+AUTH_TOKEN_CACHE_TIMEOUT = my_env.int("AUTH_TOKEN_CACHE_TIMEOUT", default=5 * 60)
+
+# Speech to Text
+# Load the DeepSpeech model when the worker starts instead of on the first request.
+STT_PRELOAD_MODEL = my_env.bool("STT_PRELOAD_MODEL", default=False)
+# Number of inference processes per web worker (0 runs inference on a thread instead).
+STT_POOL_WORKERS = my_env.int("STT_POOL_WORKERS", default=1)
+# Requests allowed to wait for a free inference worker before returning 503.
+STT_POOL_QUEUE_SIZE = my_env.int("STT_POOL_QUEUE_SIZE", default=4)
+# Background threads per web worker running asynchronous transcription jobs.
+STT_JOB_THREADS = my_env.int("STT_JOB_THREADS", default=2)
+# Jobs RUNNING for longer than this are assumed lost and are requeued by process_stt_jobs.
+STT_JOB_STALE_SECONDS = my_env.int("STT_JOB_STALE_SECONDS", default=600)
+# Concurrent streaming transcriptions per web worker, and how often they report partial text.
+STT_STREAM_LIMIT = my_env.int("STT_STREAM_LIMIT", default=2)
+STT_STREAM_PARTIAL_SECONDS = my_env.float("STT_STREAM_PARTIAL_SECONDS", default=1.0)
+# Transcript cache: "lru" (per worker), "django" (shared, uses STT_CACHE_ALIAS from CACHES) or "none".
+STT_CACHE_BACKEND = my_env("STT_CACHE_BACKEND", default="lru")
+STT_CACHE_SIZE = my_env.int("STT_CACHE_SIZE", default=256)
+STT_CACHE_ALIAS = my_env("STT_CACHE_ALIAS", default="default")
+STT_CACHE_TIMEOUT = my_env.int("STT_CACHE_TIMEOUT", default=24 * 60 * 60)
+# Uploads over this many bytes or seconds of audio are rejected with 413 before decoding.
+STT_MAX_UPLOAD_BYTES = my_env.int("STT_MAX_UPLOAD_BYTES", default=20 * 1024 * 1024)
+STT_MAX_AUDIO_SECONDS = my_env.int("STT_MAX_AUDIO_SECONDS", default=10 * 60)
+# Batch transcription: files per request, total request size, and decoding threads per web worker.
+STT_BATCH_MAX_FILES = my_env.int("STT_BATCH_MAX_FILES", default=50)
+STT_BATCH_MAX_BYTES = my_env.int("STT_BATCH_MAX_BYTES", default=200 * 1024 * 1024)
+STT_BATCH_THREADS = my_env.int("STT_BATCH_THREADS", default=4)
+# Uploaded files over this size are spooled to a temporary file instead of kept in memory
+# (Django's default is 2.5 MiB; a few seconds of compressed audio is well under 1 MiB).
+FILE_UPLOAD_MAX_MEMORY_SIZE = my_env.int("FILE_UPLOAD_MAX_MEMORY_SIZE", default=1024 * 1024)
+# Decoder profile ("fast", "balanced" or "accurate") used when a request or view doesn't choose one.
+STT_DEFAULT_PROFILE = my_env("STT_DEFAULT_PROFILE", default="accurate")
+# Models loaded with a clinic's own scorer and hot words kept per inference worker.
+STT_VOCABULARY_MODELS = my_env.int("STT_VOCABULARY_MODELS", default=4)
+# Recordings at least this long are split at pauses (of STT_SEGMENT_MIN_SILENCE_MS, and into
+# pieces of at most STT_SEGMENT_MAX_SECONDS) and the pieces transcribed in parallel.
+STT_SEGMENT_MIN_SECONDS = my_env.float("STT_SEGMENT_MIN_SECONDS", default=10.0)
+STT_SEGMENT_MIN_SILENCE_MS = my_env.int("STT_SEGMENT_MIN_SILENCE_MS", default=300)
+STT_SEGMENT_MAX_SECONDS = my_env.int("STT_SEGMENT_MAX_SECONDS", default=20)
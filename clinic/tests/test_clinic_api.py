@@ -35,7 +35,7 @@ class PublicClinicAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         clinics = Clinic.objects.all().order_by("-clinic_id")
         serializer = ClinicSerializer(clinics, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_unauthenticated_post_request_unsuccessful(self):
         """Test auth required for creating new clinic."""
@@ -65,7 +65,7 @@ class PrivateClinicAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         clinics = Clinic.objects.all().order_by("-clinic_id")
         serializer = ClinicSerializer(clinics, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_retrieve_clinic_detail(self):
         """Test retrieving a Clinic's details."""
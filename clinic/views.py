@@ -1,17 +1,17 @@
 """Views for the Clinic API."""
 
 from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
 from clinic.models import Clinic
 from clinic.serializers import ClinicSerializer
+from users.authentication import CachedTokenAuthentication
 
 
 class ClinicViewSet(viewsets.ModelViewSet):
     """Views for Managing the Clinic APIs."""
     serializer_class = ClinicSerializer
     queryset = Clinic.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly, IsAdminUser]
 
     def get_queryset(self):
@@ -90,7 +90,7 @@ class PrivateDiagnosisAPITests(TestCase):
         res = self.client.get(DIAGNOSIS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         sz = DiagnosisSerializer(diagnosis)
-        self.assertEqual([sz.data], res.data)
+        self.assertEqual([sz.data], res.data["results"])
 
     def test_retrieve_diagnosis_detail_successful(self):
         """Test retrieve a single diagnosis detail"""
@@ -117,9 +117,9 @@ class PrivateDiagnosisAPITests(TestCase):
         params = {"encounter_id": f"{enc.encounter_id}"}
         res = self.client.get(DIAGNOSIS_URL, params)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data["count"], 1)
         sz = DiagnosisSerializer(diagnosis)
-        self.assertEqual(res.data, [sz.data])
+        self.assertEqual(res.data["results"], [sz.data])
 
     def test_create_diagnosis_doctor_successful(self):
         """Test creating a diagnosis as a Doctor is successful."""
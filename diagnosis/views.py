@@ -1,18 +1,18 @@
 """View for the Diagnosis API."""
 
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from diagnosis.serializers import DiagnosisSerializer
 from diagnosis.models import Diagnosis
 from diagnosis.permissions import IsDoctorOrAdmin
+from users.authentication import CachedTokenAuthentication
 
 
 class DiagnosisViewset(ModelViewSet):
     """View for managing Diagnosis API."""
     serializer_class = DiagnosisSerializer
     queryset = Diagnosis.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -21,7 +21,7 @@ class DiagnosisViewset(ModelViewSet):
         if encounter_id is not None:
             encounter_id = int(encounter_id)
             queryset = queryset.filter(diagnosis_encounter_id=encounter_id)
-        return queryset
+        return queryset.order_by("-diagnosis_id")
 
     def get_permissions(self):
         """Instantiates and returns the list of permission that this view requires"""
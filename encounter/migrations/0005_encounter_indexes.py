@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('encounter', '0004_encounter_encounter_comments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='encounter',
+            index=models.Index(fields=['encounter_patient', '-encounter_date', '-encounter_time', '-encounter_id'], name='encounter_patient_date'),
+        ),
+        migrations.AddIndex(
+            model_name='encounter',
+            index=models.Index(fields=['encounter_doctor', '-encounter_date', '-encounter_time', '-encounter_id'], name='encounter_doctor_date'),
+        ),
+        migrations.AddIndex(
+            model_name='encounter',
+            index=models.Index(fields=['-encounter_date', '-encounter_time', '-encounter_id'], name='encounter_date'),
+        ),
+    ]
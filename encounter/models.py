@@ -27,5 +27,19 @@ class Encounter(models.Model):
     encounter_created_by = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="encounter_created_by")
 
+    class Meta:
+        # Match the lists in EncounterViewSet: per patient, per doctor or for all, newest first.
+        indexes = [
+            models.Index(
+                fields=["encounter_patient", "-encounter_date", "-encounter_time", "-encounter_id"],
+                name="encounter_patient_date"),
+            models.Index(
+                fields=["encounter_doctor", "-encounter_date", "-encounter_time", "-encounter_id"],
+                name="encounter_doctor_date"),
+            models.Index(
+                fields=["-encounter_date", "-encounter_time", "-encounter_id"],
+                name="encounter_date"),
+        ]
+
     def __str__(self):
         return f"Encounter {str(self.encounter_id)}"
@@ -1,7 +1,9 @@
 """Tests for the Encounter API."""
 
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from clinic.models import Clinic
@@ -104,7 +106,7 @@ class PrivateEncounterAPITests(TestCase):
         encounters = Encounter.objects.all().order_by(
             "-encounter_date", "-encounter_time")
         serializer = EncounterSerializerExtended(encounters, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_retrieve_encounter_detail_successful(self):
         """Test retrieving an encounter detail."""
@@ -145,3 +147,49 @@ class PrivateEncounterAPITests(TestCase):
             encounter_id=res.data["encounter_id"])
         serializer = EncounterSerializerExtended(enc)
         self.assertEqual(res.data, serializer.data)
+
+
+class EncounterQueryCountTests(TestCase):
+    """Test the encounter endpoints run a fixed number of queries, however many rows they return."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.clinic = Clinic.objects.create(clinic_name="Test Clinic")
+        self.patient = create_patient(create_patient_user())
+        self.doctor = create_doctor(create_doctor_user())
+
+    def create_encounters(self, count):
+        for _ in range(count):
+            Encounter.objects.create(
+                encounter_date="2022-03-01",
+                encounter_time="10:00:00",
+                encounter_patient=self.patient,
+                encounter_doctor=self.doctor,
+                encounter_clinic=self.clinic,
+                encounter_created_by=self.user
+            )
+
+    def count_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ENCOUNTER_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing encounters doesn't query per row, in either pagination mode."""
+        self.create_encounters(1)
+        single = [self.count_queries(), self.count_queries({"cursor": ""})]
+        self.create_encounters(9)
+        self.assertEqual(single, [self.count_queries(), self.count_queries({"cursor": ""})])
+        self.assertEqual(single, [2, 1])
+
+    def test_update_query_count(self):
+        """Test the response after an update reuses the relations already loaded."""
+        self.create_encounters(1)
+        enc = Encounter.objects.get()
+        # Load the encounter with its relations, then save it.
+        with self.assertNumQueries(2):
+            res = self.client.patch(detail_url(enc.encounter_id), {"encounter_comments": "Follow up"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
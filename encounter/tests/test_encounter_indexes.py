@@ -0,0 +1,56 @@
+"""Tests that the encounter lists are served by indexes."""
+
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from encounter.views import EncounterViewSet
+from users.models import User, Patient, Doctor
+
+
+def create_user(email, role):
+    """Create and return a user with the given role."""
+    return User.objects.create_user(email=email, password="testpass123", role=role,
+                                    is_staff=role == User.Role.ADMIN)
+
+
+def list_queryset(user):
+    """Return the queryset EncounterViewSet lists for the user."""
+    request = Request(APIRequestFactory().get("/"))
+    request.user = user
+    view = EncounterViewSet(request=request, action="list", format_kwarg=None)
+    return view.get_queryset()
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN output is only checked on PostgreSQL.")
+class EncounterIndexTests(TestCase):
+    """Test every encounter list is read in order from an index, without scanning or sorting."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin@example.com", User.Role.ADMIN)
+        cls.patient_user = create_user("patient@example.com", User.Role.PATIENT)
+        cls.doctor_user = create_user("doctor@example.com", User.Role.DOCTOR)
+        Patient.objects.create(patient_name="Test Patient", patient_dob="2000-03-13", user=cls.patient_user)
+        Doctor.objects.create(doctor_name="Test Doctor", doctor_dob="2000-02-12", user=cls.doctor_user)
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # The tables are tiny, so make the planner prefer an ordered index scan
+            # whenever there is a usable index.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def test_list_uses_indexes(self):
+        """Test the admin, patient and doctor lists each use their index."""
+        for user, index in [(self.admin, "encounter_date"),
+                            (self.patient_user, "encounter_patient_date"),
+                            (self.doctor_user, "encounter_doctor_date")]:
+            user = User.objects.get(pk=user.pk)
+            with self.subTest(role=user.role):
+                plan = list_queryset(user)[:50].explain()
+                self.assertIn(f"Index Scan using {index} ", plan)
+                self.assertNotIn("Seq Scan", plan)
+                self.assertNotIn("Sort", plan)
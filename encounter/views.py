@@ -2,10 +2,11 @@
 
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from encounter.models import Encounter
-from users.models import User, Patient, Doctor
+from backend_cms.pagination import KeysetPagination
+from users.authentication import CachedTokenAuthentication
+from users.models import User
 from encounter.serializers import (
     EncounterSerializer, EncounterSerializerExtended
 )
@@ -14,22 +15,25 @@ from encounter.serializers import (
 class EncounterViewSet(viewsets.ModelViewSet):
     """View for managing the Encounters API."""
     serializer_class = EncounterSerializer
-    queryset = Encounter.objects.all()
-    authentication_classes = [TokenAuthentication]
+    # Relations nested by EncounterSerializerExtended, loaded in the same query.
+    queryset = Encounter.objects.select_related(
+        "encounter_patient", "encounter_doctor", "encounter_clinic")
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Retrieve encounters for authenticated users."""
         user = self.request.user
         if user.role == User.Role.ADMIN:
-            return self.queryset.all().order_by("-encounter_date", "-encounter_time")
+            return self.queryset.all().order_by("-encounter_date", "-encounter_time", "-encounter_id")
         elif user.role == User.Role.PATIENT:
-            patient_profile = Patient.objects.get(user=user)
-            return self.queryset.filter(encounter_patient=patient_profile).order_by("-encounter_date", "-encounter_time")
+            return self.queryset.filter(encounter_patient=user.profile).order_by(
+                "-encounter_date", "-encounter_time", "-encounter_id")
         else:
             # user is a doctor
-            doctor_profile = Doctor.objects.get(user=user)
-            return self.queryset.filter(encounter_doctor=doctor_profile).order_by("-encounter_date", "-encounter_time")
+            return self.queryset.filter(encounter_doctor=user.profile).order_by(
+                "-encounter_date", "-encounter_time", "-encounter_id")
 
     def get_serializer_class(self):
         if self.action == "list" or self.action == "retrieve":
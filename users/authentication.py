@@ -0,0 +1,163 @@
+"""Authentication classes for the API."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+# Reverse one to one relations from User to each role's profile.
+PROFILE_RELATIONS = ["user__patient_info", "user__doctor_info", "user__admin_info"]
+# User fields kept in the token cache: what authentication and permissions check.
+CACHED_USER_FIELDS = ["id", "is_active", "is_staff", "role"]
+
+
+def cached_fields(model):
+    """Return the profile fields kept in the token cache: its id and the ids it refers to."""
+    return [field.attname for field in model._meta.concrete_fields if field.primary_key or field.is_relation]
+
+
+def token_entry(token):
+    """Return the token's key, user and profile ids as a dict to cache, without the password hash or other details."""
+    user = token.user
+    profile = user.profile
+    entry = {"key": token.key, "user": {field: getattr(user, field) for field in CACHED_USER_FIELDS}}
+    if profile is not None:
+        relation = profile._meta.get_field("user").remote_field.related_name
+        entry["profile"] = (relation, {field: getattr(profile, field) for field in cached_fields(type(profile))})
+    return entry
+
+
+def token_from_entry(entry):
+    """Return a Token with its user and profile from a cached entry.
+
+    Fields that weren't cached are deferred, so they are loaded from the
+    database if a view reads them.
+    """
+    user = User.from_db(DEFAULT_DB_ALIAS, list(entry["user"]), list(entry["user"].values()))
+    profile = None
+    if "profile" in entry:
+        relation, fields = entry["profile"]
+        profile = User._meta.get_field(relation).related_model.from_db(
+            DEFAULT_DB_ALIAS, list(fields), list(fields.values()))
+        setattr(user, relation, profile)
+    user.profile = profile
+    token = Token.from_db(DEFAULT_DB_ALIAS, ["key", "user_id"], [entry["key"], user.pk])
+    token.user = user
+    return token
+
+
+class ProfileTokenAuthentication(TokenAuthentication):
+    """Token authentication that loads the user and its role profile in one query.
+
+    ``request.user.profile`` is then available without another query for the
+    rest of the request.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user", *PROFILE_RELATIONS).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        return (token.user, token)
+
+
+class TokenCache:
+    """Cache of authenticated tokens, keyed by the token key.
+
+    Each worker process keeps up to ``max_entries`` tokens for
+    ``local_timeout`` seconds. With ``alias`` set, tokens are also shared
+    between workers through that Django cache for ``timeout`` seconds. Only
+    the ids, role and flags of the user and profile are cached (see
+    token_entry), and every lookup builds new objects from them, so a request
+    can't change the user cached for the next one.
+    """
+
+    def __init__(self, max_entries, local_timeout, alias=None, timeout=None):
+        self.max_entries = max_entries
+        self.local_timeout = local_timeout
+        self.alias = alias
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def shared_key(key):
+        return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached Token (with its user and profile), or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+        if entry is not None:
+            return token_from_entry(entry[1])
+        if self.alias:
+            data = caches[self.alias].get(self.shared_key(key))
+            if data is not None:
+                self._set_local(key, data)
+                return token_from_entry(data)
+        return None
+
+    def set(self, key, token):
+        data = token_entry(token)
+        self._set_local(key, data)
+        if self.alias:
+            caches[self.alias].set(self.shared_key(key), data, self.timeout)
+
+    def _set_local(self, key, data):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.local_timeout, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.alias and keys:
+            caches[self.alias].delete_many([self.shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_LOCAL_TIMEOUT,
+    settings.AUTH_TOKEN_CACHE_ALIAS, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+class CachedTokenAuthentication(ProfileTokenAuthentication):
+    """ProfileTokenAuthentication that skips the database for recently seen tokens.
+
+    Cached tokens are dropped when the token is deleted or its user or
+    profile changes (see users.signals), so a deactivated user is rejected
+    on their next request by this worker and the shared cache. Other
+    workers may still accept them for up to AUTH_TOKEN_CACHE_LOCAL_TIMEOUT.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+        elif not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
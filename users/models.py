@@ -5,6 +5,7 @@ from django.contrib.auth.models import (
     PermissionsMixin
 )
 from django.core.validators import RegexValidator
+from django.utils.functional import cached_property
 from clinic.models import Clinic
 PHONE_REGEX = RegexValidator(regex=r'^\+?\d{9,16}$')
 
@@ -56,11 +57,21 @@ class User(AbstractBaseUser, PermissionsMixin):
         if not self.pk:
             if self.base_role is not None:
                 self.role = self.base_role
-            return super().save(*args, *kwargs)
+        return super().save(*args, **kwargs)
 
     def __str__(self):
         return self.email + " as " + self.role
 
+    @cached_property
+    def profile(self):
+        """Return the Patient, Doctor or Admin profile for the user's role, or None."""
+        related_name = {
+            User.Role.PATIENT: "patient_info",
+            User.Role.DOCTOR: "doctor_info",
+            User.Role.ADMIN: "admin_info",
+        }.get(self.role)
+        return getattr(self, related_name, None) if related_name else None
+
 
 class PatientManager(BaseUserManager):
     """Manager for Patients."""
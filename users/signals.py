@@ -0,0 +1,38 @@
+"""Signal handlers dropping cached tokens when a token, user or profile changes."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.authentication import token_cache
+from users.models import Admin, AdminUser, Doctor, DoctorUser, Patient, PatientUser, User
+
+
+def invalidate_user_tokens(user_id):
+    """Drop the cached tokens of a user."""
+    token_cache.delete(*Token.objects.filter(user_id=user_id).values_list("key", flat=True))
+
+
+# Deleting a user deletes its token through the cascade, which sends this too.
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+# Proxy models send signals with their own class as the sender.
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=PatientUser)
+@receiver(post_save, sender=DoctorUser)
+@receiver(post_save, sender=AdminUser)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=Doctor)
+@receiver(post_save, sender=Admin)
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_delete, sender=Admin)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.user_id)
@@ -0,0 +1,154 @@
+"""Tests for API authentication."""
+
+from unittest.mock import patch
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from appointment.models import Appointment
+from users.authentication import (
+    CachedTokenAuthentication, ProfileTokenAuthentication, TokenCache, token_cache
+)
+from users.models import Doctor, DoctorUser, Patient, PatientUser
+
+APPOINTMENT_URL = reverse("appointment:appointment-list")
+
+
+def create_doctor(email="doctor@example.com"):
+    """Create and return a doctor user with a profile."""
+    user = DoctorUser.objects.create_user(email=email, password="testpass123")
+    Doctor.objects.create(user=user, doctor_name="Test Doctor", doctor_dob="2000-02-12")
+    return user
+
+
+def create_patient(email="patient@example.com"):
+    """Create and return a patient user with a profile."""
+    user = PatientUser.objects.create_user(email=email, password="testpass123")
+    Patient.objects.create(user=user, patient_name="Test Patient", patient_dob="2000-03-13")
+    return user
+
+
+class ProfileTokenAuthenticationTests(TestCase):
+    """Test the user and its role profile are loaded together."""
+
+    def test_user_and_profile_in_one_query(self):
+        """Test authenticating loads the user and its profile in a single query."""
+        user = create_doctor()
+        token = Token.objects.create(user=user)
+        with self.assertNumQueries(1):
+            auth_user, _ = ProfileTokenAuthentication().authenticate_credentials(token.key)
+            self.assertEqual(auth_user.profile.doctor_name, "Test Doctor")
+
+    def test_user_without_profile(self):
+        """Test a user without a profile for its role has no profile, without extra queries."""
+        user = DoctorUser.objects.create_user(email="doctor@example.com", password="testpass123")
+        token = Token.objects.create(user=user)
+        with self.assertNumQueries(1):
+            auth_user, _ = ProfileTokenAuthentication().authenticate_credentials(token.key)
+            self.assertIsNone(auth_user.profile)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected."""
+        with self.assertRaises(AuthenticationFailed):
+            ProfileTokenAuthentication().authenticate_credentials("missing")
+
+    def test_role_scoped_list_queries(self):
+        """Test a patient's appointment list doesn't look up the patient profile again."""
+        user = create_patient()
+        doctor = create_doctor()
+        Appointment.objects.create(
+            appointment_date="2022-03-01",
+            appointment_time="10:00:00",
+            appointment_status=Appointment.Status.BOOKED,
+            appointment_patient=user.profile,
+            appointment_doctor=doctor.profile,
+            created_by=user
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        # Token with user and profile, the count, then the page of appointments.
+        with self.assertNumQueries(3):
+            res = client.get(APPOINTMENT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 1)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test tokens are cached and dropped from the cache when they change."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_doctor()
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_second_request_skips_database(self):
+        """Test a cached token is authenticated without any query."""
+        self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.role, self.user.role)
+            self.assertEqual(user.profile.doctor_id, self.user.profile.doctor_id)
+            self.assertEqual(user.profile.doctor_clinic_id, self.user.profile.doctor_clinic_id)
+
+    def test_other_fields_reloaded(self):
+        """Test fields that aren't cached are loaded from the database when read."""
+        self.auth.authenticate_credentials(self.token.key)
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(2):
+            self.assertEqual(user.email, "doctor@example.com")
+            self.assertEqual(user.profile.doctor_name, "Test Doctor")
+
+    def test_cached_user_is_a_copy(self):
+        """Test changes made to the user during one request don't leak into the cache."""
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        user.email = "changed@example.com"
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.email, "doctor@example.com")
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token drops it from the cache."""
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user drops their token from the cache."""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_profile_update_reloaded(self):
+        """Test updating a profile reloads it on the next request."""
+        self.auth.authenticate_credentials(self.token.key)
+        profile = Doctor.objects.get(user=self.user)
+        profile.doctor_name = "Renamed Doctor"
+        profile.save()
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.profile.doctor_name, "Renamed Doctor")
+
+    def test_local_entries_expire(self):
+        """Test a worker's cached tokens expire after the local timeout."""
+        cache = TokenCache(max_entries=10, local_timeout=10)
+        cache.set(self.token.key, self.token)
+        with patch("users.authentication.time.monotonic", return_value=10 ** 9):
+            self.assertIsNone(cache.get(self.token.key))
+
+    @override_settings(CACHES={"tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_shared_cache(self):
+        """Test tokens are shared through the Django cache and deleted from it."""
+        first = TokenCache(max_entries=10, local_timeout=10, alias="tokens", timeout=60)
+        second = TokenCache(max_entries=10, local_timeout=10, alias="tokens", timeout=60)
+        first.set(self.token.key, self.token)
+        self.assertEqual(second.get(self.token.key).user_id, self.user.pk)
+        self.assertNotIn(self.user.password, str(caches["tokens"].get(first.shared_key(self.token.key))))
+        first.delete(self.token.key)
+        second.clear()
+        self.assertIsNone(second.get(self.token.key))
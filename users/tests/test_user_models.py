@@ -22,6 +22,20 @@ class UserModelTests(TestCase):
         self.assertTrue(user.check_password(password))
         self.assertEqual(user.role, User.Role.PATIENT)
 
+    def test_update_existing_user_saved(self):
+        """Test saving an existing user stores the changes."""
+        user = PatientUser.objects.create_user(
+            email="test@example.com",
+            password="testpass123"
+        )
+        user.is_active = False
+        user.set_password("newpass123")
+        user.save()
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertTrue(user.check_password("newpass123"))
+        self.assertEqual(user.role, User.Role.PATIENT)
+
     def test_create_doctors_with_email_successful(self):
         """Test creating a doctor with email is successful."""
         email = "test@example.com"
@@ -1,10 +1,11 @@
 """Views for the User API."""
 
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
+from users.authentication import CachedTokenAuthentication
 from users.models import (AdminUser, DoctorUser, PatientUser,
                           User, Patient, Doctor, Admin)
 from users.serializers import (
@@ -22,7 +23,7 @@ class PatientUserCreateAPIView(generics.CreateAPIView):
 
 class DoctorUserCreateAPIView(generics.CreateAPIView):
     """Create a new DoctorUser along with Doctor data."""
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
     queryset = DoctorUser.objects.all()
     serializer_class = DoctorUserSerializer
@@ -30,7 +31,7 @@ class DoctorUserCreateAPIView(generics.CreateAPIView):
 
 class AdminUserCreateAPIView(generics.CreateAPIView):
     """Create a new AdminUser along with Admin data."""
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
     queryset = AdminUser.objects.all()
     serializer_class = AdminUserSerializer
@@ -55,7 +56,7 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Generic View to retrieve and update User with UserProfile."""
     serializer_class = PatientUserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -76,15 +77,15 @@ class PatientProfileListAPIView(generics.ListAPIView,
                                 generics.RetrieveAPIView):
     """Get list of all patient profiles or a single patient profile."""
     serializer_class = PatientSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
-    queryset = Patient.objects.all()
+    queryset = Patient.objects.order_by("patient_id")
 
 
 class PatientProfileRetrieveAPIView(generics.RetrieveAPIView):
     """Get a single patient profile."""
     serializer_class = PatientSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
     queryset = Patient.objects.all()
 
@@ -93,15 +94,15 @@ class DoctorProfileListAPIView(generics.ListAPIView,
                                generics.RetrieveAPIView):
     """Get list of all Doctor profiles or a single doctor profile."""
     serializer_class = DoctorSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Doctor.objects.all()
+    queryset = Doctor.objects.order_by("doctor_id")
 
 
 class DoctorProfileRetrieveAPIView(generics.RetrieveAPIView):
     """Get a single doctor profile."""
     serializer_class = DoctorSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     queryset = Doctor.objects.all()
 
@@ -109,14 +110,14 @@ class DoctorProfileRetrieveAPIView(generics.RetrieveAPIView):
 class AdminProfileListAPIView(generics.ListAPIView):
     """Get list of all Admin profiles or a single admin profile."""
     serializer_class = AdminSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
-    queryset = Admin.objects.all()
+    queryset = Admin.objects.order_by("admin_id")
 
 
 class AdminProfileRetrieveAPIView(generics.RetrieveAPIView):
     """Get a single Admin profile."""
     serializer_class = AdminSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser]
     queryset = Admin.objects.all()
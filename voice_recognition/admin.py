@@ -0,0 +1,5 @@
+from django.contrib import admin
+from voice_recognition.models import TranscriptionJob, ClinicVocabulary
+
+admin.site.register(TranscriptionJob)
+admin.site.register(ClinicVocabulary)
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class VoiceRecognitionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'voice_recognition'
+
+    def ready(self):
+        """Start the inference workers at startup when STT_PRELOAD_MODEL is set."""
+        if settings.STT_PRELOAD_MODEL:
+            from voice_recognition.pool import pool
+            from voice_recognition.registry import registry
+            pool.warm_up()
+            if settings.STT_STREAM_LIMIT:
+                # Streaming runs on this process's own copy of the model.
+                registry.get_model()
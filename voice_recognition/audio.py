@@ -0,0 +1,211 @@
+"""Helpers for getting uploaded audio into the decoder without extra copies."""
+
+import binascii
+import io
+import mmap
+import struct
+import av
+import numpy as np
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from rest_framework.parsers import FileUploadParser
+from voice_recognition.metrics import metrics
+from voice_recognition.models import SAMPLE_RATE, AudioTooLarge, container_duration, decode_using_pyav
+
+# Characters of base64 decoded per step; must be a multiple of 4.
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, so PyAV can read it without copying it first."""
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._buffer = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        end = min(self._position + len(target), len(self._buffer))
+        size = end - self._position
+        target[:size] = self._buffer[self._position:end]
+        self._position = end
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._buffer)
+        self._position = min(max(offset, 0), len(self._buffer))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    @property
+    def size(self):
+        return len(self._buffer)
+
+    def getbuffer(self):
+        return self._buffer
+
+
+def decode_base64_audio(encoded):
+    """Decode a base64 string (optionally a data: URL) into a single buffer.
+
+    The string is decoded in fixed size steps straight into a preallocated
+    bytearray, so no full-size intermediate bytes objects are created.
+    :returns: memoryview over the decoded bytes
+    """
+    start = 0
+    if encoded.startswith("data:"):
+        start = encoded.index(",") + 1
+    length = len(encoded) - start
+    if length % 4 or any(c in encoded for c in " \t\r\n"):
+        # Unpadded or wrapped input can't be split on 4 character boundaries.
+        return memoryview(binascii.a2b_base64(encoded[start:]))
+
+    padding = 0
+    if length:
+        padding = (encoded[-1] == "=") + (encoded[-2] == "=")
+    decoded = bytearray(length // 4 * 3 - padding)
+    position = 0
+    for offset in range(start, len(encoded), BASE64_CHUNK_SIZE):
+        chunk = binascii.a2b_base64(encoded[offset:offset + BASE64_CHUNK_SIZE])
+        decoded[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    return memoryview(decoded)
+
+
+class RawAudioParser(FileUploadParser):
+    """Parser for raw binary audio bodies, such as audio/aac or application/octet-stream.
+
+    Unlike FileUploadParser it doesn't require a Content-Disposition filename.
+    """
+    media_type = "*/*"
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(stream, media_type, parser_context) or "speech"
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def read_pcm_wav(buffer, sample_rate=SAMPLE_RATE):
+    """Return the samples of a mono 16 bit PCM wav file already at ``sample_rate``.
+
+    The returned array is a view into ``buffer`` (no copy). Returns None if the
+    buffer isn't such a wav file and has to go through the decoder instead.
+    """
+    buffer = memoryview(buffer).cast("B")
+    if len(buffer) < 12 or buffer[0:4] != b"RIFF" or buffer[8:12] != b"WAVE":
+        return None
+    pcm_format = None
+    offset = 12
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", buffer, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", buffer, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                audio_format = struct.unpack_from("<H", buffer, body + 24)[0]
+            pcm_format = (audio_format, channels, rate, bits)
+        elif chunk_id == b"data":
+            if pcm_format != (WAVE_FORMAT_PCM, 1, sample_rate, 16):
+                return None
+            # Streamed recordings may leave the data size unset; use what was received.
+            size = min(chunk_size, len(buffer) - body)
+            return np.frombuffer(buffer, dtype=np.int16, count=size // 2, offset=body)
+        # Chunks are padded to an even number of bytes.
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def get_buffer(file):
+    """Return the contents of an uploaded file as a buffer without copying, if possible."""
+    if isinstance(file, BufferReader):
+        return file.getbuffer()
+    if isinstance(file, InMemoryUploadedFile) and hasattr(file.file, "getbuffer"):
+        return file.file.getbuffer()
+    if isinstance(file, TemporaryUploadedFile) and file.size:
+        return mmap.mmap(file.file.fileno(), 0, access=mmap.ACCESS_READ)
+    return None
+
+
+def load_audio(file, max_seconds=None):
+    """Return 16kHz mono int16 samples for an uploaded audio file, and the path used.
+
+    16kHz mono 16 bit wav files are read in place ("wav"); anything else is
+    decoded and resampled with PyAV ("pyav").
+    """
+    buffer = get_buffer(file)
+    if buffer is not None:
+        samples = read_pcm_wav(buffer)
+        if samples is not None:
+            metrics.incr("stt.decode.path.wav")
+            return samples, "wav"
+    metrics.incr("stt.decode.path.pyav")
+    return decode_using_pyav(file, max_seconds), "pyav"
+
+
+def base64_length(size):
+    """Return the length of the base64 encoding of ``size`` bytes."""
+    return -(-size // 3) * 4
+
+
+def check_content_length(request, max_bytes):
+    """Raise AudioTooLarge if the request declares a body over ``max_bytes``, before reading it."""
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return
+    if max_bytes and length > max_bytes:
+        raise AudioTooLarge(f"Upload is larger than {max_bytes} bytes.")
+
+
+def audio_size(file):
+    """Return the size in bytes of an uploaded audio file."""
+    if isinstance(file, BufferReader):
+        return file.size
+    size = getattr(file, "size", None)
+    if size is None:
+        size = file.seek(0, io.SEEK_END)
+        file.seek(0)
+    return size
+
+
+def probe_duration(file):
+    """Return the duration in seconds of an uploaded audio file from its header, or None.
+
+    Only the container header is read, nothing is decoded.
+    """
+    buffer = get_buffer(file)
+    if buffer is not None:
+        samples = read_pcm_wav(buffer)
+        if samples is not None:
+            return len(samples) / SAMPLE_RATE
+    try:
+        with av.open(file) as audio:
+            return container_duration(audio)
+    except av.error.FFmpegError:
+        # Left for the decoder to report.
+        return None
+    finally:
+        file.seek(0)
+
+
+def check_audio_limits(file, max_bytes=None, max_seconds=None):
+    """Raise AudioTooLarge if an upload is over ``max_bytes`` or its header says it's over ``max_seconds``."""
+    if max_bytes and audio_size(file) > max_bytes:
+        raise AudioTooLarge(f"Upload is larger than {max_bytes} bytes.")
+    if max_seconds:
+        duration = probe_duration(file)
+        if duration and duration > max_seconds:
+            raise AudioTooLarge(f"Audio is longer than {max_seconds:g} seconds.")
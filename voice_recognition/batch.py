@@ -0,0 +1,97 @@
+"""Transcription of many audio files uploaded in one request."""
+
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from voice_recognition.audio import BufferReader
+from voice_recognition.metadata import verbose_payload
+from voice_recognition.metrics import metrics
+from voice_recognition.models import AudioTooLarge
+from voice_recognition.pipeline import transcribe_when_free
+
+# Files of all batches are decoded on these threads; inference still goes through the pool.
+executor = ThreadPoolExecutor(max_workers=settings.STT_BATCH_THREADS)
+
+
+class BatchTranscription:
+    """NDJSON body for a batch transcription response.
+
+    Uploaded zip archives are expanded into their files. Every file is
+    decoded concurrently and transcribed through the shared inference pool,
+    and one line is written per file as soon as it finishes:
+    ``{"index", "name", "data": {"text", "words"}}``, or ``{"index", "name",
+    "status", "detail"}`` if that file failed.
+    """
+
+    def __init__(self, uploads, profile, verbose=False, vocabulary=None):
+        self.uploads = uploads
+        self.profile = profile
+        self.verbose = verbose
+        self.vocabulary = vocabulary
+        self.files = []
+        self._archives = []
+        self._futures = []
+
+    def open(self):
+        """List the files of the batch. Raises ValueError if there are none or too many."""
+        for upload in self.uploads:
+            if zipfile.is_zipfile(upload):
+                upload.seek(0)
+                archive = zipfile.ZipFile(upload)
+                self._archives.append(archive)
+                self.files.extend(
+                    (info.filename, self._zip_member(archive, info))
+                    for info in archive.infolist()
+                    if not info.is_dir() and not info.filename.startswith("__MACOSX/"))
+            else:
+                upload.seek(0)
+                self.files.append((upload.name, lambda upload=upload: upload))
+        if not self.files:
+            raise ValueError("At least one audio file must be uploaded.")
+        if len(self.files) > settings.STT_BATCH_MAX_FILES:
+            raise ValueError(f"A batch can have at most {settings.STT_BATCH_MAX_FILES} files.")
+
+    @staticmethod
+    def _zip_member(archive, info):
+        def read():
+            # Never inflate more than the upload limit, whatever the header says.
+            with archive.open(info) as member:
+                return BufferReader(member.read(settings.STT_MAX_UPLOAD_BYTES + 1))
+        return read
+
+    def _transcribe(self, open_file):
+        return transcribe_when_free(open_file(), self.profile, self.verbose, self.vocabulary)
+
+    def __iter__(self):
+        try:
+            futures = {}
+            for index, (name, open_file) in enumerate(self.files):
+                futures[executor.submit(self._transcribe, open_file)] = (index, name)
+            self._futures = list(futures)
+            metrics.incr("stt.batch.files", len(futures))
+            for future in as_completed(futures):
+                index, name = futures[future]
+                yield json.dumps({"index": index, "name": name, **self._result(future)}) + "\n"
+        finally:
+            self.close()
+
+    def _result(self, future):
+        try:
+            transcript = future.result()
+        except AudioTooLarge as exc:
+            return {"status": 413, "detail": str(exc)}
+        except Exception as exc:
+            return {"status": 400, "detail": str(exc) or exc.__class__.__name__}
+        if transcript.metadata is not None:
+            return {"data": verbose_payload(transcript.metadata)}
+        return {"data": {"text": transcript.text, "words": len(transcript.text.split())}}
+
+    def close(self):
+        """Cancel files not started yet (e.g. the client disconnected) and close the archives."""
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        for archive in self._archives:
+            archive.close()
+        self._archives = []
@@ -0,0 +1,169 @@
+"""Benchmarks for the speech to text pipeline, run with ``manage.py bench_stt``."""
+
+import io
+import os
+import resource
+import subprocess
+import threading
+import time
+import wave
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from django.utils import timezone
+from voice_recognition.models import SAMPLE_RATE, decode_using_pyav
+from voice_recognition.pool import InferencePool
+from voice_recognition.registry import get_model, registries
+
+AUDIO_EXTENSIONS = (".wav", ".aac", ".m4a", ".mp3", ".ogg", ".opus", ".webm", ".flac")
+
+
+def synthetic_wav(seconds, rate=SAMPLE_RATE):
+    """Return a wav file of tone bursts separated by short pauses, like dictation."""
+    t = np.arange(int(seconds * rate)) / rate
+    audio = np.sin(2 * np.pi * 220 * t) * 8000
+    # 1.5 seconds of "speech" followed by 0.5 seconds of silence.
+    audio[(t % 2.0) >= 1.5] = 0
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(audio.astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def load_corpus(paths=(), synthetic_seconds=()):
+    """Return (name, audio bytes) for each audio file under ``paths`` and each synthetic length."""
+    corpus = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path) for name in names
+                if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, "rb") as f:
+                corpus.append((file_path, f.read()))
+    for seconds in synthetic_seconds:
+        corpus.append((f"synthetic-{seconds:g}s.wav", synthetic_wav(seconds)))
+    return corpus
+
+
+def percentiles(values):
+    """Return the mean, p50, p95, p99 and max of a list of values."""
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(np.mean(values)), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(max(values))}
+
+
+def peak_rss():
+    """Return the peak resident set size in bytes of this process and of its worker processes."""
+    # ru_maxrss is in kilobytes on Linux.
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "workers": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }
+
+
+def git_commit():
+    """Return the commit being benchmarked, if this is a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_stages(corpus, profile, repeat=1):
+    """Time decoding and inference of each file separately, in this process."""
+    model = get_model(profile)
+    files = []
+    for name, data in corpus:
+        decode_times, inference_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            audio = decode_using_pyav(io.BytesIO(data))
+            decode_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            model.transcribe_batch_with_buffer(audio)
+            inference_times.append(time.perf_counter() - start)
+        seconds = len(audio) / SAMPLE_RATE
+        decode_time = float(np.median(decode_times))
+        inference_time = float(np.median(inference_times))
+        files.append({
+            "name": name,
+            "bytes": len(data),
+            "audio_seconds": seconds,
+            "decode_time": decode_time,
+            "inference_time": inference_time,
+            # Seconds of processing per second of audio; below 1 is faster than real time.
+            "rtf": (decode_time + inference_time) / seconds if seconds else None,
+        })
+    return files
+
+
+def bench_concurrency(corpus, level, profile, repeat=1, workers=None):
+    """Run the corpus end to end through an inference pool with ``level`` concurrent clients.
+
+    The pool has ``level`` worker processes unless ``workers`` is given
+    (0 runs inference on a thread of this process).
+    """
+    workers = level if workers is None else workers
+    inference_pool = InferencePool(workers=workers, queue_size=level)
+    inference_pool.warm_up()
+    requests = [data for _ in range(repeat) for _, data in corpus]
+    latencies = []
+    audio_seconds = []
+    lock = threading.Lock()
+
+    def run(data):
+        start = time.perf_counter()
+        audio = decode_using_pyav(io.BytesIO(data))
+        inference_pool.transcribe(audio, profile)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            audio_seconds.append(len(audio) / SAMPLE_RATE)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=level) as clients:
+            list(clients.map(run, requests))
+    finally:
+        inference_pool.shutdown()
+    wall_time = time.perf_counter() - start
+    return {
+        "level": level,
+        "workers": workers,
+        "requests": len(requests),
+        "wall_time": wall_time,
+        "requests_per_second": len(requests) / wall_time,
+        # Seconds of audio transcribed per second of wall clock.
+        "audio_seconds_per_second": sum(audio_seconds) / wall_time,
+        "latency": percentiles(latencies),
+    }
+
+
+def run_benchmark(corpus, profile, levels=(1,), repeat=1, workers=None):
+    """Run every benchmark over the corpus and return the results as a dict."""
+    start = time.perf_counter()
+    get_model(profile)
+    load_time = time.perf_counter() - start
+    files = bench_stages(corpus, profile, repeat)
+    concurrency = [bench_concurrency(corpus, level, profile, repeat, workers) for level in levels]
+    return {
+        "commit": git_commit(),
+        "created_at": timezone.now().isoformat(),
+        "profile": profile,
+        "model": {"load_time": load_time, "memory_bytes": registries[profile].memory_bytes},
+        "files": files,
+        "decode_time": percentiles([f["decode_time"] for f in files]),
+        "inference_time": percentiles([f["inference_time"] for f in files]),
+        "rtf": percentiles([f["rtf"] for f in files if f["rtf"] is not None]),
+        "concurrency": concurrency,
+        "peak_rss_bytes": peak_rss(),
+    }
@@ -0,0 +1,118 @@
+"""Cache of transcripts keyed by the content of the uploaded audio."""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from voice_recognition.audio import get_buffer
+from voice_recognition.metrics import metrics
+from voice_recognition.models import MODEL_FILE_PATH, LM_FILE_PATH, DECODER_PROFILES, LM_ALPHA, LM_BETA
+
+
+class LRUCacheBackend:
+    """Size-bounded least recently used cache local to this worker process."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """Cache shared across workers through one of the Django CACHES."""
+
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+
+    def get(self, key):
+        return caches[self.alias].get(key)
+
+    def set(self, key, value):
+        caches[self.alias].set(key, value, self.timeout)
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+def audio_digest(file):
+    """Return the SHA-256 hex digest of an uploaded audio file, leaving it at the start."""
+    buffer = get_buffer(file)
+    if buffer is not None:
+        return hashlib.sha256(buffer).hexdigest()
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def decoder_fingerprint(*params):
+    """Identify the model, scorer and decoder parameters a transcript was made with."""
+    text = "|".join(str(param) for param in params)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class TranscriptCache:
+    """Maps (audio content hash, model/scorer version, decoder parameters) to a transcript."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def key(self, digest, profile, verbose=False, vocabulary=None):
+        config = DECODER_PROFILES[profile]
+        scorer = os.path.basename(LM_FILE_PATH) if config["scorer"] else None
+        fingerprint = decoder_fingerprint(
+            os.path.basename(MODEL_FILE_PATH), scorer, config["beam_width"], LM_ALPHA, LM_BETA,
+            vocabulary)
+        # Verbose transcripts also hold the token timings and candidates.
+        return f"stt:{fingerprint}:{digest}" + (":verbose" if verbose else "")
+
+    def get(self, digest, profile, verbose=False, vocabulary=None):
+        """Return the cached transcript (or metadata when ``verbose``), or None."""
+        if self.backend is None:
+            return None
+        result = self.backend.get(self.key(digest, profile, verbose, vocabulary))
+        metrics.incr("stt.cache.miss" if result is None else "stt.cache.hit")
+        return result
+
+    def set(self, digest, profile, result, verbose=False, vocabulary=None):
+        if self.backend is not None:
+            self.backend.set(self.key(digest, profile, verbose, vocabulary), result)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def create_backend():
+    """Create the cache backend configured by STT_CACHE_BACKEND."""
+    if settings.STT_CACHE_BACKEND == "lru":
+        return LRUCacheBackend(settings.STT_CACHE_SIZE)
+    if settings.STT_CACHE_BACKEND == "django":
+        return DjangoCacheBackend(settings.STT_CACHE_ALIAS, settings.STT_CACHE_TIMEOUT)
+    return None
+
+
+transcript_cache = TranscriptCache(create_backend())
@@ -0,0 +1,66 @@
+"""Background execution of speech to text jobs."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from voice_recognition.audio import BufferReader
+from voice_recognition.models import TranscriptionJob
+from voice_recognition.pipeline import transcribe_when_free
+from voice_recognition.vocabulary import load_vocabulary
+
+executor = ThreadPoolExecutor(max_workers=settings.STT_JOB_THREADS)
+
+
+def enqueue_job(job):
+    """Schedule a saved job to run in the background once the transaction commits."""
+    job_id = job.job_id
+    transaction.on_commit(lambda: executor.submit(_run_job_thread, job_id))
+
+
+def _run_job_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_job(job_id):
+    """Transcribe a pending job and store the result. Returns False if the job was already claimed."""
+    claimed = TranscriptionJob.objects.filter(
+        job_id=job_id, job_status=TranscriptionJob.Status.PENDING
+    ).update(job_status=TranscriptionJob.Status.RUNNING, job_started_at=timezone.now())
+    if not claimed:
+        return False
+
+    job = TranscriptionJob.objects.get(job_id=job_id)
+    try:
+        vocabulary = load_vocabulary(job.job_clinic_id)
+        txt = transcribe_when_free(BufferReader(job.job_audio), job.job_profile, vocabulary=vocabulary).text
+    except Exception as exc:
+        job.job_status = TranscriptionJob.Status.FAILED
+        job.job_error = str(exc) or exc.__class__.__name__
+    else:
+        job.job_status = TranscriptionJob.Status.DONE
+        job.job_text = txt
+    job.job_audio = None
+    job.job_completed_at = timezone.now()
+    job.save()
+    return True
+
+
+def requeue_stale_jobs(stale_after):
+    """Return jobs stuck in RUNNING (e.g. the worker restarted) to PENDING."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return TranscriptionJob.objects.filter(
+        job_status=TranscriptionJob.Status.RUNNING, job_started_at__lt=cutoff
+    ).update(job_status=TranscriptionJob.Status.PENDING, job_started_at=None)
+
+
+def run_pending_jobs():
+    """Run every pending job in the calling thread. Returns the number of jobs run."""
+    job_ids = TranscriptionJob.objects.filter(
+        job_status=TranscriptionJob.Status.PENDING
+    ).order_by("job_created_at").values_list("job_id", flat=True)
+    return sum(1 for job_id in job_ids if run_job(job_id))
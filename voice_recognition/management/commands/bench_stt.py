@@ -0,0 +1,78 @@
+"""Django command to benchmark the speech to text pipeline."""
+
+import json
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from voice_recognition.benchmark import load_corpus, run_benchmark
+from voice_recognition.registry import get_profile
+
+FIXTURE_DIR = "voice_recognition/tests/media"
+
+
+class Command(BaseCommand):
+    """Measure decode and inference latency, real-time factor, memory and throughput."""
+    help = "Benchmark speech to text on local audio files and write the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*",
+                            help=f"Audio files or directories (default: {FIXTURE_DIR}).")
+        parser.add_argument("--synthetic", default="",
+                            help="Comma separated lengths in seconds of generated audio to add, e.g. 5,30.")
+        parser.add_argument("--concurrency", default="1,2,4",
+                            help="Comma separated numbers of concurrent requests.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Inference processes per run (default: one per concurrent request, "
+                                 "0 runs inference on a thread).")
+        parser.add_argument("--repeat", type=int, default=3,
+                            help="Times each file is transcribed.")
+        parser.add_argument("--profile", default=settings.STT_DEFAULT_PROFILE,
+                            help="Decoder profile to benchmark.")
+        parser.add_argument("--output", default="bench_stt.json",
+                            help="File to write the JSON results to ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            profile = get_profile(options["profile"])
+            synthetic = [float(s) for s in options["synthetic"].split(",") if s]
+            levels = [int(level) for level in options["concurrency"].split(",") if level]
+        except ValueError as exc:
+            raise CommandError(exc)
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        if not levels or min(levels) < 1:
+            raise CommandError("--concurrency levels must be at least 1.")
+        paths = options["paths"]
+        if not paths and not synthetic:
+            if os.path.isdir(FIXTURE_DIR):
+                paths = [FIXTURE_DIR]
+            else:
+                synthetic = [5, 15, 30]
+        corpus = load_corpus(paths, synthetic)
+        if not corpus:
+            raise CommandError("No audio files found.")
+
+        self.stdout.write(f"Benchmarking {len(corpus)} file(s) with the '{profile}' profile...")
+        results = run_benchmark(corpus, profile, levels, options["repeat"], options["workers"])
+
+        for file in results["files"]:
+            rtf = "n/a" if file["rtf"] is None else f"{file['rtf']:.3f}"
+            self.stdout.write(
+                f"{file['name']}: {file['audio_seconds']:.1f}s audio, decode {file['decode_time']:.3f}s, "
+                f"inference {file['inference_time']:.3f}s, RTF {rtf}")
+        for run in results["concurrency"]:
+            latency = run["latency"]
+            self.stdout.write(
+                f"concurrency {run['level']}: {run['requests_per_second']:.2f} req/s, "
+                f"{run['audio_seconds_per_second']:.1f} audio s/s, p50 {latency['p50']:.3f}s, "
+                f"p95 {latency['p95']:.3f}s, p99 {latency['p99']:.3f}s")
+        rss = results["peak_rss_bytes"]
+        self.stdout.write(f"peak RSS: {rss['self'] / 2**20:.0f} MiB, workers {rss['workers'] / 2**20:.0f} MiB")
+
+        output = json.dumps(results, indent=2)
+        if options["output"] == "-":
+            self.stdout.write(output)
+        else:
+            with open(options["output"], "w") as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
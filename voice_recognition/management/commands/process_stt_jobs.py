@@ -0,0 +1,31 @@
+"""Django command to run pending speech to text jobs."""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from voice_recognition.jobs import requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    """Run transcription jobs left pending, e.g. after a worker restart."""
+    help = "Transcribe pending speech to text jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--watch", action="store_true",
+                            help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds between polls when watching.")
+        parser.add_argument("--stale-after", type=int, default=settings.STT_JOB_STALE_SECONDS,
+                            help="Requeue RUNNING jobs started more than this many seconds ago.")
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale_jobs(options["stale_after"])
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s).")
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f"Processed {count} job(s)."))
+            if not options["watch"]:
+                break
+            time.sleep(options["interval"])
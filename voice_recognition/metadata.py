@@ -0,0 +1,105 @@
+"""Compact encoding of DeepSpeech transcript metadata (token timings and candidate confidences).
+
+Transcripts are returned as parallel arrays rather than one JSON object per
+token, which keeps long dictations small:
+
+    {
+        "tokens": "the patient",             # one character per token
+        "start_times": [0.32, 0.36, ...],    # start of each token, in seconds
+        "candidates": {"text": [...], "confidence": [...]},
+    }
+"""
+
+# Candidate transcripts requested from the decoder in verbose mode.
+NUM_CANDIDATES = 3
+# DeepSpeech timesteps are 20ms, so two decimals lose nothing.
+TIME_DECIMALS = 2
+# Typical length of a character token in speech, for the end of the last word.
+TOKEN_SECONDS = 0.06
+
+
+def compact_metadata(metadata):
+    """Convert a DeepSpeech Metadata object into the compact dict encoding."""
+    transcripts = list(metadata.transcripts)
+    best = transcripts[0].tokens if transcripts else []
+    return {
+        "tokens": "".join(token.text for token in best),
+        "start_times": [round(token.start_time, TIME_DECIMALS) for token in best],
+        "candidates": {
+            "text": ["".join(token.text for token in transcript.tokens) for transcript in transcripts],
+            "confidence": [transcript.confidence for transcript in transcripts],
+        },
+    }
+
+
+def merge_metadata(parts, offsets):
+    """Join the metadata of consecutive segments, shifting their times by each segment's offset.
+
+    Candidate ``i`` of the result is candidate ``i`` of every segment (or its
+    best one, if the segment has fewer), with the confidences summed.
+    """
+    parts = [(part, offset) for part, offset in zip(parts, offsets) if part["tokens"]]
+    tokens, start_times = [], []
+    for part, offset in parts:
+        if tokens:
+            tokens.append(" ")
+            start_times.append(round(offset, TIME_DECIMALS))
+        tokens.append(part["tokens"])
+        start_times.extend(round(time + offset, TIME_DECIMALS) for time in part["start_times"])
+    count = max((len(part["candidates"]["text"]) for part, _ in parts), default=0)
+    texts, confidences = [], []
+    for index in range(count):
+        text, confidence = [], 0.0
+        for part, _ in parts:
+            candidates = part["candidates"]
+            chosen = min(index, len(candidates["text"]) - 1)
+            text.append(candidates["text"][chosen])
+            confidence += candidates["confidence"][chosen]
+        texts.append(" ".join(text))
+        confidences.append(confidence)
+    return {
+        "tokens": "".join(tokens),
+        "start_times": start_times,
+        "candidates": {"text": texts, "confidence": confidences},
+    }
+
+
+def word_timings(tokens, start_times):
+    """Return the start and end time of each word of the transcript, as two parallel lists.
+
+    A word ends where the space after it starts. The last word has no space
+    after it and ends one typical token length after its last token starts.
+    """
+    starts, ends = [], []
+    word_start = last_start = None
+    for char, time in zip(tokens, start_times):
+        if char == " ":
+            if word_start is not None:
+                starts.append(word_start)
+                ends.append(time)
+                word_start = None
+            continue
+        if word_start is None:
+            word_start = time
+        last_start = time
+    if word_start is not None:
+        starts.append(word_start)
+        ends.append(round(last_start + TOKEN_SECONDS, TIME_DECIMALS))
+    return starts, ends
+
+
+def verbose_payload(metadata):
+    """Return the response ``data`` for a verbose transcript.
+
+    ``token_times`` has the start time of each character of ``text``, and
+    ``word_times`` the start and end of each word.
+    """
+    txt = metadata["tokens"]
+    starts, ends = word_timings(txt, metadata["start_times"])
+    return {
+        "text": txt,
+        "words": len(txt.split()),
+        "token_times": metadata["start_times"],
+        "word_times": {"start": starts, "end": ends},
+        "candidates": metadata["candidates"],
+    }
@@ -0,0 +1,53 @@
+"""In-process metrics for the speech to text pipeline."""
+
+import threading
+
+
+class Metrics:
+    """Thread-safe counters and timing summaries for this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    def incr(self, name, value=1):
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Record a timing (in seconds) or any other sampled value."""
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            timing["count"] += 1
+            timing["total"] += value
+            timing["max"] = max(timing["max"], value)
+            timing["last"] = value
+
+    def mean(self, name):
+        """Return the mean of a timing, or None if it was never observed."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if not timing:
+                return None
+            return timing["total"] / timing["count"]
+
+    def snapshot(self):
+        """Return a copy of all counters and timings."""
+        with self._lock:
+            timings = {}
+            for name, timing in self._timings.items():
+                timings[name] = dict(
+                    timing, mean=timing["total"] / timing["count"])
+            return {"counters": dict(self._counters), "timings": timings}
+
+    def reset(self):
+        """Clear all counters and timings."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
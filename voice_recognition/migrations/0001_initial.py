@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionJob',
+            fields=[
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('job_status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=15)),
+                ('job_audio', models.BinaryField(blank=True, null=True)),
+                ('job_text', models.TextField(blank=True, null=True)),
+                ('job_error', models.TextField(blank=True, null=True)),
+                ('job_created_at', models.DateTimeField(auto_now_add=True)),
+                ('job_started_at', models.DateTimeField(blank=True, null=True)),
+                ('job_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('job_created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transcription_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
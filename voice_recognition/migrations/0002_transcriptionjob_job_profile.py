@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_recognition', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptionjob',
+            name='job_profile',
+            field=models.CharField(default='accurate', max_length=15),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0002_auto_20220930_1700'),
+        ('voice_recognition', '0002_transcriptionjob_job_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptionjob',
+            name='job_clinic',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transcription_jobs', to='clinic.clinic'),
+        ),
+        migrations.CreateModel(
+            name='ClinicVocabulary',
+            fields=[
+                ('vocabulary_id', models.AutoField(primary_key=True, serialize=False)),
+                ('vocabulary_scorer', models.CharField(blank=True, max_length=255)),
+                ('vocabulary_hot_words', models.JSONField(blank=True, default=dict)),
+                ('vocabulary_updated_at', models.DateTimeField(auto_now=True)),
+                ('vocabulary_clinic', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vocabulary', to='clinic.clinic')),
+            ],
+            options={
+                'verbose_name_plural': 'clinic vocabularies',
+            },
+        ),
+    ]
@@ -1,24 +1,72 @@
+from contextlib import contextmanager
 from deepspeech import Model
+from django.core.exceptions import ValidationError
+from django.db import models
+from clinic.models import Clinic
+from users.models import User
+from voice_recognition.metadata import NUM_CANDIDATES, compact_metadata
+from voice_recognition.metrics import metrics
 import numpy as np
+import os
+import threading
+import time
+import uuid
 import wave
 import av
 
+MODEL_FILE_PATH = "voice_recognition/engine/deepspeech-0.9.3-models.pbmm"
+LM_FILE_PATH = "voice_recognition/engine/deepspeech-0.9.3-models.scorer"
+BEAM_WIDTH = 500
+LM_ALPHA = 0.75
+LM_BETA = 1.85
+
+# Decoder settings trading accuracy for latency. The external scorer (language
+# model) is the dominant cost of decoding, so "fast" runs without it.
+DECODER_PROFILES = {
+    "fast": {"beam_width": 50, "scorer": False},
+    "balanced": {"beam_width": 200, "scorer": True},
+    "accurate": {"beam_width": BEAM_WIDTH, "scorer": True},
+}
+DEFAULT_PROFILE = "accurate"
+
 
 class DeepSpeechModel:
     """DeepSpeech Voice Recognition Model."""
 
-    def __init__(self) -> None:
+    def __init__(self, profile=DEFAULT_PROFILE, scorer_path=None, hot_words=()) -> None:
         # setting the environment and getting the model instance
-        model_file_path = "voice_recognition/engine/deepspeech-0.9.3-models.pbmm"
-        lm_file_path = "voice_recognition/engine/deepspeech-0.9.3-models.scorer"
-        beam_width = 500
-        lm_alpha = 0.75
-        lm_beta = 1.85
+        model_file_path = MODEL_FILE_PATH
+        lm_file_path = scorer_path or LM_FILE_PATH
+        beam_width = DECODER_PROFILES[profile]["beam_width"]
+        lm_alpha = LM_ALPHA
+        lm_beta = LM_BETA
 
+        self.profile = profile
         self.model = Model(model_file_path)
-        self.model.enableExternalScorer(lm_file_path)
-        self.model.setScorerAlphaBeta(lm_alpha, lm_beta)
+        if DECODER_PROFILES[profile]["scorer"]:
+            self.model.enableExternalScorer(lm_file_path)
+            self.model.setScorerAlphaBeta(lm_alpha, lm_beta)
         self.model.setBeamWidth(beam_width)
+        self.hot_words = tuple(hot_words)
+        self._hot_words = ()
+        self._lock = threading.Lock()
+        self._set_hot_words(self.hot_words)
+
+    def _set_hot_words(self, hot_words):
+        if hot_words == self._hot_words:
+            return
+        if self._hot_words:
+            self.model.clearHotWords()
+        for word, boost in hot_words:
+            self.model.addHotWord(word, boost)
+        self._hot_words = hot_words
+
+    @contextmanager
+    def using(self, hot_words=None):
+        """Hold the model with the given hot words set (default: its own) while decoding starts."""
+        with self._lock:
+            self._set_hot_words(self.hot_words if hot_words is None else tuple(hot_words))
+            yield self.model
 
     def read_wave_file(self, filename: str):
         with wave.open(filename, 'rb') as w:
@@ -29,32 +77,168 @@ class DeepSpeechModel:
 
     def transcibe_batch(self, audio_filename: str):
         buffer, rate = self.read_wave_file(audio_filename)
+        return self.transcribe_batch_with_buffer(buffer)
+
+    def transcribe_batch_with_buffer(self, buffer, hot_words=None):
         data16 = np.frombuffer(buffer, dtype=np.int16)
-        return self.model.stt(data16)
+        with self.using(hot_words) as model:
+            return model.stt(data16)
 
-    def transcribe_batch_with_buffer(self, buffer):
+    def transcribe_with_metadata(self, buffer, num_results=NUM_CANDIDATES, hot_words=None):
+        """Transcribe a buffer and return token timings and candidate confidences from the same pass."""
         data16 = np.frombuffer(buffer, dtype=np.int16)
-        return self.model.stt(data16)
+        with self.using(hot_words) as model:
+            return compact_metadata(model.sttWithMetadata(data16, num_results))
 
+    def create_stream(self, hot_words=None):
+        """Create a DeepSpeech stream to feed audio into incrementally."""
+        # The stream keeps the hot words set when it is created.
+        with self.using(hot_words) as model:
+            return model.createStream()
+
+
+SAMPLE_RATE = 16000
+# Initial buffer size when the container doesn't report its duration.
+DEFAULT_DECODE_SECONDS = 30
 
-def decode_using_pyav(file):
-    """Resample the input audio to 16kHz Mono. (Deepspeech Model requirements).
-    :returns: 1D numpy array 
-    """
-    audio = av.open(file)
-    # print(f"number of channels: {audio.streams.audio}")
-    if len(audio.streams.audio) > 1:
-        print("Audio has more than 1 stream. Only one will be used.")
 
-    resampler = av.AudioResampler(format="s16", layout="mono", rate=16000)
-    resampled_frames = []
+def _resample_frames(audio):
+    """Decode the first audio stream and resample it to 16kHz Mono s16.
+
+    :yields: 1D numpy int16 views over each resampled frame (no copy)
+    """
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
     for frame in audio.decode(audio=0):
         # As of PyAV 9.0, one input frame may be resampled to multiple outputs.
-        # Convert each into a numpy ndarray...
-        iterable_frames = map(lambda f: f.to_ndarray(),
-                              resampler.resample(frame))
-        # ...then flatten each of those arrays down to 1D
-        flat_frames = list(map(lambda f: f.flatten(), iterable_frames))
-        # Add all of the resampled frames to our output list
-        resampled_frames.extend(flat_frames)
-    return np.concatenate(resampled_frames)
+        for resampled in resampler.resample(frame):
+            yield np.frombuffer(resampled.planes[0], dtype=np.int16, count=resampled.samples)
+    # Flush samples still buffered in the resampler.
+    for resampled in resampler.resample(None):
+        yield np.frombuffer(resampled.planes[0], dtype=np.int16, count=resampled.samples)
+
+
+class AudioTooLarge(Exception):
+    """Raised when an upload is over the configured size or duration limit."""
+
+
+def container_duration(audio):
+    """Return the duration in seconds reported by the container header, or None."""
+    duration = audio.duration  # in microseconds (av.time_base)
+    if duration:
+        return duration / av.time_base
+    if audio.streams.audio:
+        stream = audio.streams.audio[0]
+        if stream.duration and stream.time_base:
+            return float(stream.duration * stream.time_base)
+    return None
+
+
+def _estimate_samples(audio):
+    """Estimate the number of 16kHz samples from the container duration."""
+    duration = container_duration(audio)
+    if not duration:
+        return DEFAULT_DECODE_SECONDS * SAMPLE_RATE
+    # Leave a little headroom for rounding in the container header.
+    return int(duration * SAMPLE_RATE) + SAMPLE_RATE // 10
+
+
+def decode_using_pyav(file, max_seconds=None):
+    """Resample the input audio to 16kHz Mono. (Deepspeech Model requirements).
+
+    Samples are written straight into one buffer sized from the container
+    duration, which is doubled if the estimate turns out to be short.
+    Raises AudioTooLarge as soon as more than ``max_seconds`` have been decoded.
+    :returns: 1D numpy array
+    """
+    start = time.perf_counter()
+    max_samples = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+    with av.open(file) as audio:
+        if len(audio.streams.audio) > 1:
+            print("Audio has more than 1 stream. Only one will be used.")
+        estimate = _estimate_samples(audio)
+        if max_samples:
+            estimate = min(estimate, max_samples)
+        buffer = np.empty(estimate, dtype=np.int16)
+        size = 0
+        for samples in _resample_frames(audio):
+            end = size + len(samples)
+            if max_samples and end > max_samples:
+                raise AudioTooLarge(f"Audio is longer than {max_seconds:g} seconds.")
+            if end > len(buffer):
+                grown = np.empty(max(end, 2 * len(buffer)), dtype=np.int16)
+                grown[:size] = buffer[:size]
+                buffer = grown
+            buffer[size:end] = samples
+            size = end
+    elapsed = time.perf_counter() - start
+    metrics.observe("stt.decode.time", elapsed)
+    if elapsed > 0:
+        # Seconds of audio decoded per second of wall clock.
+        metrics.observe("stt.decode.throughput", size / SAMPLE_RATE / elapsed)
+    return buffer[:size]
+
+
+def iter_pyav_frames(file):
+    """Decode and resample the input audio to 16kHz Mono as it is read.
+
+    Works on non-seekable file-like objects, so audio can be fed to the model
+    while the rest of the upload is still arriving.
+    :yields: 1D numpy int16 arrays
+    """
+    with av.open(file) as audio:
+        yield from _resample_frames(audio)
+
+
+class TranscriptionJob(models.Model):
+    """Speech to text job that is transcribed in the background."""
+
+    class Status(models.TextChoices):
+        """Different states of a transcription job."""
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job_status = models.CharField(
+        choices=Status.choices, max_length=15, default=Status.PENDING)
+    # Raw uploaded audio, cleared once the job has finished.
+    job_audio = models.BinaryField(blank=True, null=True)
+    job_text = models.TextField(blank=True, null=True)
+    job_error = models.TextField(blank=True, null=True)
+    job_created_at = models.DateTimeField(auto_now_add=True)
+    job_started_at = models.DateTimeField(blank=True, null=True)
+    job_completed_at = models.DateTimeField(blank=True, null=True)
+    job_profile = models.CharField(max_length=15, default=DEFAULT_PROFILE)
+    job_clinic = models.ForeignKey(
+        Clinic, on_delete=models.SET_NULL, related_name="transcription_jobs", blank=True, null=True)
+    job_created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="transcription_jobs")
+
+    def __str__(self):
+        return f"Transcription Job {str(self.job_id)}"
+
+
+class ClinicVocabulary(models.Model):
+    """Clinical vocabulary (drug names, ICD terms) used to transcribe a clinic's dictations."""
+    vocabulary_id = models.AutoField(primary_key=True)
+    vocabulary_clinic = models.OneToOneField(
+        Clinic, on_delete=models.CASCADE, related_name="vocabulary")
+    # Path to a DeepSpeech .scorer built for the clinic, used instead of the default scorer.
+    vocabulary_scorer = models.CharField(max_length=255, blank=True)
+    # Words to boost, mapped to how much to boost them, e.g. {"metformin": 10.0}.
+    vocabulary_hot_words = models.JSONField(default=dict, blank=True)
+    vocabulary_updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "clinic vocabularies"
+
+    def clean(self):
+        if self.vocabulary_scorer and not os.path.isfile(self.vocabulary_scorer):
+            raise ValidationError({"vocabulary_scorer": "Scorer file not found."})
+        if not isinstance(self.vocabulary_hot_words, dict) or not all(
+                isinstance(boost, (int, float)) for boost in self.vocabulary_hot_words.values()):
+            raise ValidationError({"vocabulary_hot_words": "Must map each word to a numeric boost."})
+
+    def __str__(self):
+        return f"Vocabulary of {self.vocabulary_clinic}"
@@ -0,0 +1,80 @@
+"""Speech to text pipeline shared by the STT views and background jobs."""
+
+import time
+from typing import NamedTuple
+from django.conf import settings
+from voice_recognition.audio import check_audio_limits, load_audio
+from voice_recognition.cache import audio_digest, transcript_cache
+from voice_recognition.metadata import merge_metadata
+from voice_recognition.metrics import metrics
+from voice_recognition.models import SAMPLE_RATE
+from voice_recognition.pool import pool, PoolFull
+from voice_recognition.registry import get_profile
+from voice_recognition.vad import split_on_silence
+
+
+class Transcript(NamedTuple):
+    """Result of transcribing an uploaded file."""
+    text: str
+    # "cache", "wav" or "pyav"
+    decoder: str
+    # Token timings and candidates in verbose mode, see voice_recognition.metadata.
+    metadata: dict = None
+
+
+def _transcript(result, decoder):
+    if isinstance(result, dict):
+        return Transcript(result["tokens"], decoder, result)
+    return Transcript(result, decoder)
+
+
+def transcribe_file(file, profile=None, verbose=False, vocabulary=None):
+    """Transcribe an uploaded audio file, reusing the transcript of identical audio.
+
+    Raises PoolFull if the inference queue is full, AudioTooLarge if the file is
+    over STT_MAX_UPLOAD_BYTES or STT_MAX_AUDIO_SECONDS, and ValueError for an
+    unknown decoder profile. ``vocabulary`` is a clinic's Vocabulary.
+    """
+    profile = get_profile(profile)
+    check_audio_limits(file, settings.STT_MAX_UPLOAD_BYTES, settings.STT_MAX_AUDIO_SECONDS)
+    digest = audio_digest(file)
+    result = transcript_cache.get(digest, profile, verbose, vocabulary)
+    if result is not None:
+        return _transcript(result, "cache")
+    audio, decoder = load_audio(file, settings.STT_MAX_AUDIO_SECONDS)
+    result = transcribe_audio(audio, profile, verbose, vocabulary)
+    transcript_cache.set(digest, profile, result, verbose, vocabulary)
+    return _transcript(result, decoder)
+
+
+def transcribe_when_free(file, profile=None, verbose=False, vocabulary=None):
+    """Like transcribe_file, but waits for a free inference slot instead of raising PoolFull.
+
+    For background work (jobs, batches) that has no client waiting to retry.
+    """
+    while True:
+        try:
+            return transcribe_file(file, profile, verbose, vocabulary)
+        except PoolFull as exc:
+            time.sleep(exc.retry_after)
+
+
+def transcribe_audio(audio, profile=None, verbose=False, vocabulary=None):
+    """Transcribe 16kHz mono int16 samples, returning the text (or metadata when ``verbose``).
+
+    Recordings longer than STT_SEGMENT_MIN_SECONDS are split at pauses and
+    the segments transcribed in parallel across the inference pool.
+    """
+    if len(audio) < settings.STT_SEGMENT_MIN_SECONDS * SAMPLE_RATE:
+        return pool.transcribe(audio, profile, verbose, vocabulary)
+    segments = split_on_silence(
+        audio, min_silence_ms=settings.STT_SEGMENT_MIN_SILENCE_MS,
+        max_segment_seconds=settings.STT_SEGMENT_MAX_SECONDS)
+    metrics.observe("stt.vad.segments", len(segments))
+    if len(segments) == 1 and segments[0] == (0, len(audio)):
+        return pool.transcribe(audio, profile, verbose, vocabulary)
+    results = pool.transcribe_segments(
+        [audio[start:end] for start, end in segments], profile, verbose, vocabulary)
+    if verbose:
+        return merge_metadata(results, [start / SAMPLE_RATE for start, _ in segments])
+    return " ".join(txt for txt in results if txt)
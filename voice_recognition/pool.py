@@ -0,0 +1,216 @@
+"""Bounded pool of speech to text inference workers."""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from voice_recognition.metrics import metrics
+from voice_recognition.registry import get_model, registries, registry, vocabulary_models
+
+
+class PoolFull(Exception):
+    """Raised when the inference queue has no room for another request."""
+
+    def __init__(self, retry_after):
+        super().__init__("Speech to text queue is full.")
+        self.retry_after = retry_after
+
+
+def _warm_up():
+    """Load the model of every decoder profile in the worker that runs this task."""
+    for profile in registries:
+        get_model(profile)
+    return os.getpid()
+
+
+def _info():
+    """Return the models loaded in the worker that runs this task."""
+    return {
+        "pid": os.getpid(),
+        "model": registry.info(),
+        "profiles": {profile: profile_registry.info() for profile, profile_registry in registries.items()},
+        "vocabularies": vocabulary_models.info(),
+    }
+
+
+def _transcribe(audio, submitted_at, profile=None, verbose=False, vocabulary=None):
+    """Run inference in a pool worker. Returns the text (or metadata) and queue/inference timings."""
+    started_at = time.time()
+    model = get_model(profile, vocabulary)
+    if verbose:
+        result = model.transcribe_with_metadata(audio)
+    else:
+        result = model.transcribe_batch_with_buffer(audio)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+class InferencePool:
+    """Runs DeepSpeech inference off the web worker thread with a bounded queue.
+
+    Each worker process loads its own model through the registry. With
+    ``workers=0`` inference runs on a single thread of the current process,
+    which keeps the same queueing behaviour without forking (handy for
+    development and tests). Once ``workers + queue_size`` requests are in
+    flight, further submissions raise PoolFull instead of piling up.
+    """
+
+    def __init__(self, workers=1, queue_size=4):
+        self.workers = workers
+        self.capacity = max(workers, 1) + queue_size
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=get_model)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            self._pid = os.getpid()
+        return self._executor
+
+    def _reserve(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                metrics.incr("stt.pool.rejected")
+                raise PoolFull(self.retry_after())
+            self._in_flight += 1
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def submit(self, fn, *args):
+        """Submit a task to the pool. Raises PoolFull if the queue is full."""
+        self._reserve()
+        try:
+            with self._lock:
+                executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool.
+                with self._lock:
+                    self._executor = None
+                    executor = self._get_executor()
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _result(self, future):
+        try:
+            result, waited, elapsed = future.result()
+        except BrokenProcessPool:
+            # The worker died mid-task (e.g. out of memory); the next submit starts a fresh pool.
+            metrics.incr("stt.pool.broken")
+            raise PoolFull(self.retry_after())
+        metrics.observe("stt.pool.wait", waited)
+        metrics.observe("stt.pool.inference", elapsed)
+        return result
+
+    def transcribe(self, audio, profile=None, verbose=False, vocabulary=None):
+        """Transcribe a 16kHz mono int16 buffer and return the text.
+
+        With ``verbose`` the compact metadata (see voice_recognition.metadata)
+        is returned instead. ``vocabulary`` is a clinic's Vocabulary.
+        """
+        return self._result(
+            self.submit(_transcribe, audio, time.time(), profile, verbose, vocabulary))
+
+    def transcribe_segments(self, segments, profile=None, verbose=False, vocabulary=None):
+        """Transcribe several buffers in parallel and return their texts (or metadata) in order.
+
+        At most one segment per worker is in flight at a time, so a long
+        recording doesn't fill the queue for everyone else. Raises PoolFull
+        if the queue is full before any segment could be submitted.
+        """
+        texts = [None] * len(segments)
+        in_flight = deque()
+        for index, segment in enumerate(segments):
+            while True:
+                if len(in_flight) >= max(self.workers, 1):
+                    done, future = in_flight.popleft()
+                    texts[done] = self._result(future)
+                try:
+                    in_flight.append((index, self.submit(
+                        _transcribe, segment, time.time(), profile, verbose, vocabulary)))
+                    break
+                except PoolFull:
+                    if not in_flight:
+                        raise
+                    # Wait for one of our own segments to free a slot.
+                    done, future = in_flight.popleft()
+                    texts[done] = self._result(future)
+        for done, future in in_flight:
+            texts[done] = self._result(future)
+        return texts
+
+    def warm_up(self):
+        """Start the workers and load the model in each of them."""
+        futures = [self._get_executor().submit(_warm_up)
+                   for _ in range(max(self.workers, 1))]
+        for future in futures:
+            future.result()
+
+    def worker_info(self, timeout=5):
+        """Return the models loaded in each worker, as reported by the workers themselves.
+
+        One info task is sent per worker, taking a slot in the queue like
+        inference does. A worker may pick up more than one of them, and no
+        more are sent once the queue is full. Workers still busy after
+        ``timeout`` seconds are left out, so the list can be incomplete.
+        """
+        futures = []
+        for _ in range(max(self.workers, 1)):
+            try:
+                futures.append(self.submit(_info))
+            except PoolFull:
+                break
+        deadline = time.monotonic() + timeout
+        reports = {}
+        for future in futures:
+            try:
+                info = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except (TimeoutError, BrokenProcessPool):
+                continue
+            reports[info["pid"]] = info
+        return list(reports.values())
+
+    def shutdown(self):
+        """Stop the workers once the tasks already submitted have finished."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def retry_after(self):
+        """Estimate how many seconds until a slot frees up."""
+        mean_inference = metrics.mean("stt.pool.inference") or 1.0
+        return max(1, math.ceil(mean_inference * self.capacity / max(self.workers, 1)))
+
+    def stats(self):
+        """Return the current queue depth and capacity."""
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": in_flight,
+            "queue_depth": max(in_flight - max(self.workers, 1), 0),
+        }
+
+
+pool = InferencePool(
+    workers=settings.STT_POOL_WORKERS,
+    queue_size=settings.STT_POOL_QUEUE_SIZE,
+)
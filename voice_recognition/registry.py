@@ -0,0 +1,162 @@
+"""Process-wide registry of loaded DeepSpeech models."""
+
+import os
+import resource
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from django.conf import settings
+from voice_recognition.metadata import NUM_CANDIDATES
+from voice_recognition.models import DECODER_PROFILES, DeepSpeechModel
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux, and only ever grows.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """Loads the DeepSpeech model once per worker process and hands out the shared instance.
+
+    DRF instantiates a new view for every request, so the model cannot live on
+    the view without reloading the .pbmm and scorer each time. The registry is
+    keyed on the process id so a forked worker loads its own copy instead of
+    reusing native state inherited from the parent.
+    """
+
+    def __init__(self, factory=DeepSpeechModel):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._model = None
+        self._pid = None
+        self.load_time = None
+        self.memory_bytes = None
+
+    def is_loaded(self):
+        """Check if the model has been loaded in the current process."""
+        return self._model is not None and self._pid == os.getpid()
+
+    def get_model(self):
+        """Return the shared model, loading it on first use."""
+        if not self.is_loaded():
+            with self._lock:
+                if not self.is_loaded():
+                    self._load()
+        return self._model
+
+    def _load(self):
+        rss_before = current_rss()
+        start = time.perf_counter()
+        self._model = self._factory()
+        self.load_time = time.perf_counter() - start
+        self.memory_bytes = max(current_rss() - rss_before, 0)
+        self._pid = os.getpid()
+
+    def info(self):
+        """Return load statistics for the current process."""
+        loaded = self.is_loaded()
+        return {
+            "loaded": loaded,
+            "pid": os.getpid(),
+            "load_time": self.load_time if loaded else None,
+            "memory_bytes": self.memory_bytes if loaded else None,
+        }
+
+
+# One pre-configured model per decoder profile, so switching profile never reloads
+# a model. The .pbmm graph is memory mapped, so its pages are shared between them.
+registries = {
+    profile: ModelRegistry(factory=partial(DeepSpeechModel, profile))
+    for profile in DECODER_PROFILES
+}
+registry = registries[settings.STT_DEFAULT_PROFILE]
+
+
+class HotWordModel:
+    """A decoder profile's shared model used with a clinic's hot words.
+
+    Hot words don't need a model of their own: they are set on the shared
+    model each time a transcription or stream starts.
+    """
+
+    def __init__(self, model, hot_words):
+        self.model = model
+        self.profile = model.profile
+        self.hot_words = hot_words
+
+    def transcribe_batch_with_buffer(self, buffer):
+        return self.model.transcribe_batch_with_buffer(buffer, hot_words=self.hot_words)
+
+    def transcribe_with_metadata(self, buffer, num_results=NUM_CANDIDATES):
+        return self.model.transcribe_with_metadata(buffer, num_results, hot_words=self.hot_words)
+
+    def create_stream(self):
+        return self.model.create_stream(hot_words=self.hot_words)
+
+
+class VocabularyModels:
+    """Models configured with a clinic's own scorer (and hot words), kept per worker process.
+
+    Switching between clinics reuses the loaded model instead of reading the
+    scorer from disk again. Once more than ``max_entries`` are loaded the
+    least recently used one is dropped.
+    """
+
+    def __init__(self, max_entries, factory=DeepSpeechModel):
+        self.max_entries = max_entries
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+        self._pid = None
+
+    def get_model(self, profile, vocabulary):
+        """Return the model for a decoder profile and Vocabulary, loading it on first use."""
+        key = (profile, vocabulary)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._models.clear()
+                self._pid = os.getpid()
+            model = self._models.get(key)
+            if model is None:
+                model = self._factory(profile, vocabulary.scorer, vocabulary.hot_words)
+                self._models[key] = model
+                while len(self._models) > self.max_entries:
+                    self._models.popitem(last=False)
+            self._models.move_to_end(key)
+            return model
+
+    def info(self):
+        """Return the clinics with a model loaded in the current process."""
+        with self._lock:
+            loaded = list(self._models) if self._pid == os.getpid() else []
+        return [{"profile": profile, "clinic_id": vocabulary.clinic_id} for profile, vocabulary in loaded]
+
+
+vocabulary_models = VocabularyModels(settings.STT_VOCABULARY_MODELS)
+
+
+def get_model(profile=None, vocabulary=None):
+    """Return the DeepSpeech model for a decoder profile (and clinic vocabulary) shared by this worker process."""
+    profile = profile or settings.STT_DEFAULT_PROFILE
+    # Profiles without a scorer ignore the clinic's one, so only its hot words apply.
+    if vocabulary is not None and vocabulary.scorer and DECODER_PROFILES[profile]["scorer"]:
+        return vocabulary_models.get_model(profile, vocabulary)
+    model = registries[profile].get_model()
+    if vocabulary is not None and vocabulary.hot_words:
+        return HotWordModel(model, vocabulary.hot_words)
+    return model
+
+
+def get_profile(name=None):
+    """Return the decoder profile name to use. Raises ValueError for unknown profiles."""
+    profile = name or settings.STT_DEFAULT_PROFILE
+    if profile not in registries:
+        raise ValueError(f"Unknown decoder profile '{profile}', choose from {', '.join(registries)}.")
+    return profile
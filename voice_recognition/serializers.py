@@ -1,6 +1,7 @@
 """Serializer for Wave file for voice recognition."""
 
 from rest_framework import serializers
+from voice_recognition.models import TranscriptionJob
 
 
 class WavFileSerializer(serializers.Serializer):
@@ -11,3 +12,23 @@ class WavFileSerializer(serializers.Serializer):
 class Base64EncodedStringSerializer(serializers.Serializer):
     """Serializer for the audio, which is a base64 encoded string"""
     data = serializers.CharField(allow_blank=False)
+
+
+class TranscriptionJobSerializer(serializers.ModelSerializer):
+    """Serializer for transcription jobs. The result uses the same shape as the STT views."""
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TranscriptionJob
+        fields = ["job_id", "job_status", "job_error", "job_created_at",
+                  "job_completed_at", "data"]
+        read_only_fields = fields
+
+    def get_data(self, job):
+        """Return the transcript once the job is done."""
+        if job.job_status != TranscriptionJob.Status.DONE:
+            return None
+        return {
+            "text": job.job_text,
+            "words": len(job.job_text.split())
+        }
@@ -0,0 +1,125 @@
+"""Streaming speech to text while the audio is being uploaded."""
+
+import json
+import threading
+import time
+from django.conf import settings
+from voice_recognition.metadata import NUM_CANDIDATES, compact_metadata, verbose_payload
+from voice_recognition.metrics import metrics
+from voice_recognition.models import AudioTooLarge, iter_pyav_frames
+
+SAMPLE_RATE = 16000
+
+# Streams run on the shared in-process model rather than the inference pool,
+# since a DeepSpeech stream keeps native state between feeds.
+stream_slots = threading.BoundedSemaphore(settings.STT_STREAM_LIMIT)
+
+
+class BodyReader:
+    """Non-seekable file-like view of a request body.
+
+    PyAV pulls from it as it decodes, so decoding starts with the first bytes
+    of the upload instead of after the whole body has been buffered.
+    """
+
+    def __init__(self, request, max_bytes=None):
+        self._request = request
+        self._max_bytes = max_bytes
+        self._received = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._request.read()
+        else:
+            data = self._request.read(size)
+        self._received += len(data)
+        if self._max_bytes and self._received > self._max_bytes:
+            raise AudioTooLarge(f"Upload is larger than {self._max_bytes} bytes.")
+        return data
+
+
+def limit_duration(chunks, max_seconds):
+    """Pass 16kHz chunks through, raising AudioTooLarge after ``max_seconds`` of audio."""
+    max_samples = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if max_samples and total > max_samples:
+            raise AudioTooLarge(f"Audio is longer than {max_seconds:g} seconds.")
+        yield chunk
+
+
+def stream_transcript(model, chunks, partial_seconds, verbose=False):
+    """Feed 16kHz int16 chunks into a DeepSpeech stream.
+
+    :yields: ``{"partial": text}`` roughly every ``partial_seconds`` of audio
+        while the text changes, then the final ``{"data": {"text", "words"}}``
+        (with token timings and candidates when ``verbose``).
+    """
+    partial_samples = int(partial_seconds * SAMPLE_RATE)
+    stream = model.create_stream()
+    fed = 0
+    next_partial = partial_samples
+    last_txt = ""
+    try:
+        for chunk in chunks:
+            stream.feedAudioContent(chunk)
+            fed += len(chunk)
+            if partial_samples and fed >= next_partial:
+                next_partial = fed + partial_samples
+                txt = stream.intermediateDecode()
+                if txt != last_txt:
+                    last_txt = txt
+                    yield {"partial": txt}
+    except BaseException:
+        stream.freeStream()
+        raise
+    if verbose:
+        metadata = compact_metadata(stream.finishStreamWithMetadata(NUM_CANDIDATES))
+        yield {"data": verbose_payload(metadata)}
+        return
+    txt = stream.finishStream()
+    yield {
+        "data": {
+            "text": txt,
+            "words": len(txt.split())
+        }
+    }
+
+
+class TranscriptStream:
+    """NDJSON body for a streaming transcription response.
+
+    Holds one of the ``stream_slots`` until the response is closed, even if
+    the client disconnects before the body is iterated.
+    """
+
+    def __init__(self, file, model, partial_seconds=None, verbose=False):
+        self.file = file
+        self.model = model
+        self.verbose = verbose
+        self.partial_seconds = (settings.STT_STREAM_PARTIAL_SECONDS
+                                if partial_seconds is None else partial_seconds)
+        self._released = False
+
+    def __iter__(self):
+        start = time.perf_counter()
+        first_text = None
+        try:
+            chunks = limit_duration(iter_pyav_frames(self.file), settings.STT_MAX_AUDIO_SECONDS)
+            events = stream_transcript(self.model, chunks, self.partial_seconds, self.verbose)
+            for event in events:
+                if first_text is None:
+                    first_text = time.perf_counter() - start
+                    metrics.observe("stt.stream.first_text", first_text)
+                yield json.dumps(event) + "\n"
+        except Exception as exc:
+            yield json.dumps({"detail": str(exc) or exc.__class__.__name__}) + "\n"
+        finally:
+            metrics.observe("stt.stream.total", time.perf_counter() - start)
+            self.close()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            stream_slots.release()
@@ -10,6 +10,7 @@ from users.models import User
 VOICE_RECOGNITION_WEB_URL = reverse("Voice Recognition Speech to Text for Web")
 VOICE_RECOGNITION_MOBILE_URL = reverse(
     "Voice Recognition Speech to Text for Mobile")
+VOICE_RECOGNITION_STATUS_URL = reverse("Voice Recognition Status")
 
 
 def create_user(email="testuser@example.com", password="testpass123", role=User.Role.ADMIN, is_staff=True):
@@ -68,3 +69,10 @@ class PrivateVoiceRecognitionAPITests(TestCase):
         res = self.client.post(VOICE_RECOGNITION_WEB_URL,
                                payload, content_type="audio/wave")
         # self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_status_reports_model_info(self):
+        """Test the status endpoint reports load time and memory of the model in each inference worker."""
+        res = self.client.get(VOICE_RECOGNITION_STATUS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("load_time", res.data["workers"][0]["model"])
+        self.assertIn("memory_bytes", res.data["workers"][0]["model"])
@@ -0,0 +1,141 @@
+"""Tests for getting uploaded audio into the decoder."""
+
+import io
+import wave
+from base64 import b64encode, encodebytes
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from voice_recognition.cache import transcript_cache
+from voice_recognition.audio import (
+    BufferReader, decode_base64_audio, read_pcm_wav, load_audio, BASE64_CHUNK_SIZE
+)
+
+VOICE_RECOGNITION_WEB_URL = reverse("Voice Recognition Speech to Text for Web")
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+
+
+def create_wav(seconds, rate=16000, channels=1, sampwidth=2):
+    """Create and return a ramp as a wav file in bytes."""
+    samples = np.arange(int(seconds * rate) * channels) % 100
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sampwidth)
+        w.setframerate(rate)
+        w.writeframes(samples.astype(f"<i{sampwidth}" if sampwidth > 1 else "u1").tobytes())
+    return buffer.getvalue()
+
+
+class Base64AudioTests(TestCase):
+    """Tests for decoding base64 audio into a single buffer."""
+
+    def test_decode_matches_b64decode(self):
+        """Test decoding in chunks gives the same bytes for any padding."""
+        for size in [0, 1, 2, 3, BASE64_CHUNK_SIZE + 1, 3 * BASE64_CHUNK_SIZE]:
+            raw = bytes(range(256)) * (size // 256) + bytes(size % 256)
+            encoded = b64encode(raw).decode()
+            self.assertEqual(bytes(decode_base64_audio(encoded)), raw)
+
+    def test_decode_data_url_and_wrapped_lines(self):
+        """Test data: URLs and line-wrapped base64 are accepted."""
+        raw = create_wav(0.1)
+        data_url = "data:audio/wav;base64," + b64encode(raw).decode()
+        self.assertEqual(bytes(decode_base64_audio(data_url)), raw)
+        self.assertEqual(bytes(decode_base64_audio(encodebytes(raw).decode())), raw)
+
+    def test_buffer_reader_seek_and_read(self):
+        """Test the reader behaves like a seekable file over the buffer."""
+        reader = BufferReader(memoryview(b"hello world"))
+        self.assertEqual(reader.read(5), b"hello")
+        self.assertEqual(reader.seek(-5, io.SEEK_END), 6)
+        self.assertEqual(reader.read(), b"world")
+        self.assertEqual(reader.read(), b"")
+
+
+class PCMWavFastPathTests(TestCase):
+    """Tests for reading 16kHz mono wav files without PyAV."""
+
+    def test_read_pcm_wav_without_copy(self):
+        """Test 16kHz mono 16 bit samples are returned as a view of the upload."""
+        buffer = bytearray(create_wav(0.5))
+        samples = read_pcm_wav(buffer)
+        self.assertEqual(len(samples), 8000)
+        self.assertTrue(np.shares_memory(samples, np.frombuffer(buffer, dtype=np.uint8)))
+        self.assertEqual(list(samples[:3]), [0, 1, 2])
+
+    def test_read_pcm_wav_skips_extra_chunks(self):
+        """Test chunks before the data chunk (e.g. LIST) are skipped."""
+        wav = create_wav(0.1)
+        extra = b"LIST" + (3).to_bytes(4, "little") + b"abc" + b"\0"
+        # Insert the odd sized chunk after "fmt " (12 byte header + 24 byte fmt chunk).
+        samples = read_pcm_wav(wav[:36] + extra + wav[36:])
+        self.assertEqual(len(samples), 1600)
+
+    def test_read_pcm_wav_rejects_other_formats(self):
+        """Test wav files that need resampling or downmixing use the decoder."""
+        self.assertIsNone(read_pcm_wav(create_wav(0.1, rate=44100)))
+        self.assertIsNone(read_pcm_wav(create_wav(0.1, channels=2)))
+        self.assertIsNone(read_pcm_wav(create_wav(0.1, sampwidth=1)))
+        self.assertIsNone(read_pcm_wav(b"not a wav file"))
+
+    def test_load_audio_reports_path(self):
+        """Test load_audio reports which decoding path was used."""
+        samples, decoder = load_audio(BufferReader(create_wav(1)))
+        self.assertEqual((len(samples), decoder), (16000, "wav"))
+        samples, decoder = load_audio(BufferReader(create_wav(1, rate=8000)))
+        self.assertEqual((len(samples), decoder), (16000, "pyav"))
+
+
+@patch("voice_recognition.pipeline.pool.transcribe", return_value="to day is saturday")
+class MobileUploadAPITests(TestCase):
+    """Tests for the ways the mobile endpoint accepts audio."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.client = APIClient()
+        self.expected = {"data": {"text": "to day is saturday", "words": 4}}
+
+    def test_raw_binary_upload(self, mock_transcribe):
+        """Test a raw binary audio body is transcribed without base64."""
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, data=create_wav(1),
+                               content_type="audio/wav")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.expected)
+        self.assertEqual(len(mock_transcribe.call_args[0][0]), 16000)
+        self.assertEqual(res["X-STT-Decoder"], "wav")
+
+    def test_web_upload_resampled_with_pyav(self, mock_transcribe):
+        """Test uploads that aren't 16kHz mono are decoded with PyAV."""
+        res = self.client.post(VOICE_RECOGNITION_WEB_URL, data=create_wav(1, rate=44100),
+                               content_type="audio/wave",
+                               HTTP_CONTENT_DISPOSITION="attachment; filename=speech.wav")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-STT-Decoder"], "pyav")
+        self.assertEqual(len(mock_transcribe.call_args[0][0]), 16000)
+
+    def test_multipart_file_upload(self, mock_transcribe):
+        """Test a multipart file upload is transcribed."""
+        upload = io.BytesIO(create_wav(1))
+        upload.name = "speech.wav"
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"file": upload})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.expected)
+
+    def test_json_base64_upload(self, mock_transcribe):
+        """Test a base64 string in a JSON body is transcribed."""
+        payload = {"data": b64encode(create_wav(1)).decode()}
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.expected)
+
+    def test_json_file_field_rejected(self, mock_transcribe):
+        """Test a "file" string in a JSON body is rejected instead of read as an upload."""
+        payload = {"file": b64encode(create_wav(1)).decode()}
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_transcribe.assert_not_called()
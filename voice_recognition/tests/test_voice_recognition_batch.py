@@ -0,0 +1,121 @@
+"""Tests for the batch speech to text API."""
+
+import io
+import json
+import threading
+import wave
+import zipfile
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import User
+from voice_recognition.cache import transcript_cache
+
+VOICE_RECOGNITION_BATCH_URL = reverse("Voice Recognition Batch Speech to Text")
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.DOCTOR, is_staff=False):
+    """Create and return a user. Returns DoctorUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+def create_wav(seconds, rate=16000, value=0):
+    """Create and return a constant mono 16 bit wav file as bytes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.full(int(seconds * rate), value, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def create_upload(data, name):
+    upload = io.BytesIO(data)
+    upload.name = name
+    return upload
+
+
+def read_lines(res):
+    return [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+
+
+class PublicBatchAPITests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to transcribe batches."""
+        res = APIClient().post(VOICE_RECOGNITION_BATCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@patch("voice_recognition.pipeline.pool.transcribe", side_effect=lambda audio, *args: f"{len(audio)} samples")
+class PrivateBatchAPITests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+
+    @override_settings(STT_MAX_AUDIO_SECONDS=2)
+    def test_multipart_files(self, mock_transcribe):
+        """Test every uploaded file gets its own result line, including failures."""
+        res = self.client.post(VOICE_RECOGNITION_BATCH_URL, {
+            "files": [create_upload(create_wav(1, value=1), "one.wav"),
+                      create_upload(create_wav(3), "long.wav")],
+            "other": create_upload(b"not audio", "notes.wav"),
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = sorted(read_lines(res), key=lambda line: line["index"])
+        self.assertEqual([line["name"] for line in lines], ["one.wav", "long.wav", "notes.wav"])
+        self.assertEqual(lines[0]["data"], {"text": "16000 samples", "words": 2})
+        self.assertEqual(lines[1]["status"], 413)
+        self.assertEqual(lines[2]["status"], 400)
+
+    def test_zip_archive(self, mock_transcribe):
+        """Test a zip archive sent as the body is expanded into its audio files."""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("day/one.wav", create_wav(1, value=1))
+            zip_file.writestr("day/two.wav", create_wav(2, value=2))
+            zip_file.writestr("__MACOSX/day/._one.wav", b"resource fork")
+        res = self.client.post(VOICE_RECOGNITION_BATCH_URL, data=archive.getvalue(),
+                               content_type="application/zip")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = {line["name"]: line["data"]["text"] for line in read_lines(res)}
+        self.assertEqual(results, {"day/one.wav": "16000 samples", "day/two.wav": "32000 samples"})
+
+    def test_files_decoded_concurrently(self, mock_transcribe):
+        """Test the files of a batch are decoded at the same time, not one after another."""
+        from voice_recognition.audio import load_audio
+        both_decoding = threading.Barrier(2, timeout=5)
+
+        def decode(*args):
+            both_decoding.wait()
+            return load_audio(*args)
+
+        with patch("voice_recognition.pipeline.load_audio", side_effect=decode):
+            res = self.client.post(VOICE_RECOGNITION_BATCH_URL, {
+                "files": [create_upload(create_wav(1, value=1), "one.wav"),
+                          create_upload(create_wav(1, value=2), "two.wav")],
+            })
+            lines = read_lines(res)
+        self.assertEqual([line.get("data", {}).get("words") for line in lines], [2, 2])
+
+    @override_settings(STT_BATCH_MAX_FILES=1)
+    def test_too_many_files(self, mock_transcribe):
+        """Test batches over STT_BATCH_MAX_FILES are rejected."""
+        res = self.client.post(VOICE_RECOGNITION_BATCH_URL, {
+            "files": [create_upload(create_wav(1), "one.wav"), create_upload(create_wav(1), "two.wav")],
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_no_files(self, mock_transcribe):
+        """Test a batch without files is rejected."""
+        res = self.client.post(VOICE_RECOGNITION_BATCH_URL, {}, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
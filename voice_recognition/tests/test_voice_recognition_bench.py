@@ -0,0 +1,78 @@
+"""Tests for the speech to text benchmark command."""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from voice_recognition.benchmark import percentiles
+
+
+class FakeModel:
+    """Model that returns the number of samples instead of running inference."""
+
+    def transcribe_batch_with_buffer(self, audio):
+        return str(len(audio))
+
+
+@patch("voice_recognition.pool.get_model", return_value=FakeModel())
+@patch("voice_recognition.benchmark.get_model", return_value=FakeModel())
+class BenchSTTCommandTests(TestCase):
+    """Tests for manage.py bench_stt."""
+
+    def test_writes_json_results(self, mock_get_model, mock_pool_get_model):
+        """Test the benchmark runs offline on synthetic audio and writes JSON results."""
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            call_command("bench_stt", "--synthetic", "2,3", "--concurrency", "1,2", "--workers", "0",
+                         "--repeat", "2", "--output", output, stdout=StringIO())
+            with open(output) as f:
+                results = json.load(f)
+        self.assertEqual(results["profile"], "accurate")
+        self.assertEqual([f["audio_seconds"] for f in results["files"]], [2.0, 3.0])
+        for file in results["files"]:
+            self.assertGreater(file["decode_time"], 0)
+            self.assertGreaterEqual(file["inference_time"], 0)
+            self.assertIsNotNone(file["rtf"])
+        self.assertEqual([run["level"] for run in results["concurrency"]], [1, 2])
+        self.assertEqual(results["concurrency"][1]["requests"], 4)
+        self.assertIn("p99", results["concurrency"][0]["latency"])
+        self.assertGreater(results["peak_rss_bytes"]["self"], 0)
+
+    def test_unknown_profile(self, mock_get_model, mock_pool_get_model):
+        """Test an unknown decoder profile is reported as a command error."""
+        with self.assertRaises(CommandError):
+            call_command("bench_stt", "--synthetic", "1", "--profile", "fastest", stdout=StringIO())
+
+    def test_repeat_at_least_one(self, mock_get_model, mock_pool_get_model):
+        """Test a benchmark without any repetition is reported as a command error."""
+        with self.assertRaises(CommandError):
+            call_command("bench_stt", "--synthetic", "1", "--repeat", "0", stdout=StringIO())
+
+    def test_concurrency_at_least_one(self, mock_get_model, mock_pool_get_model):
+        """Test a concurrency level below one is reported as a command error."""
+        for levels in ["0", "1,-2", ","]:
+            with self.subTest(levels=levels), self.assertRaises(CommandError):
+                call_command("bench_stt", "--synthetic", "1", "--concurrency", levels, stdout=StringIO())
+
+    def test_empty_audio_has_no_rtf(self, mock_get_model, mock_pool_get_model):
+        """Test a file without audio is printed without a real-time factor."""
+        out = StringIO()
+        call_command("bench_stt", "--synthetic", "0", "--concurrency", "1", "--workers", "0",
+                     "--repeat", "1", "--output", "-", stdout=out)
+        self.assertIn("RTF n/a", out.getvalue())
+
+
+class PercentilesTests(TestCase):
+    """Tests for the latency summary."""
+
+    def test_percentiles(self):
+        """Test percentiles of a list of latencies."""
+        summary = percentiles(list(range(1, 101)))
+        self.assertAlmostEqual(summary["p50"], 50.5)
+        self.assertAlmostEqual(summary["p99"], 99.01)
+        self.assertEqual(summary["max"], 100)
+        self.assertIsNone(percentiles([]))
@@ -0,0 +1,79 @@
+"""Tests for the transcript cache."""
+
+import io
+import numpy as np
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from voice_recognition.cache import (
+    LRUCacheBackend, DjangoCacheBackend, TranscriptCache, audio_digest, transcript_cache
+)
+from voice_recognition.metrics import metrics
+
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+
+
+class TranscriptCacheTests(TestCase):
+    """Tests for the cache backends and keys."""
+
+    def test_lru_evicts_least_recently_used(self):
+        """Test the LRU backend keeps at most max_entries, dropping the oldest."""
+        backend = LRUCacheBackend(max_entries=2)
+        backend.set("a", "one")
+        backend.set("b", "two")
+        backend.get("a")
+        backend.set("c", "three")
+        self.assertEqual(backend.get("a"), "one")
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("c"), "three")
+
+    def test_django_backend_round_trip(self):
+        """Test transcripts can be shared through the Django cache."""
+        cache = TranscriptCache(DjangoCacheBackend("default", timeout=60))
+        cache.set("abc", "accurate", "hello")
+        self.assertEqual(cache.get("abc", "accurate"), "hello")
+        self.assertIsNone(cache.get("abc", "fast"))
+        cache.clear()
+
+    def test_key_includes_decoder_profile(self):
+        """Test the key changes with the decoder profile and its parameters."""
+        cache = TranscriptCache(LRUCacheBackend(max_entries=2))
+        key = cache.key("abc", "accurate")
+        self.assertNotEqual(cache.key("abc", "fast"), key)
+        with patch.dict("voice_recognition.cache.DECODER_PROFILES",
+                        {"accurate": {"beam_width": 100, "scorer": True}}):
+            self.assertNotEqual(cache.key("abc", "accurate"), key)
+
+    def test_audio_digest_of_stream(self):
+        """Test files without a buffer are hashed in chunks and rewound."""
+        file = io.BytesIO(b"audio" * 100000)
+        digest = audio_digest(file)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(file.tell(), 0)
+
+
+@patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+@patch("voice_recognition.pipeline.pool.transcribe", return_value="to day is saturday")
+class TranscriptCacheAPITests(TestCase):
+    """Tests for resubmitting the same recording."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.client = APIClient()
+
+    def test_resubmission_served_from_cache(self, mock_transcribe, mock_load_audio):
+        """Test the same audio is only transcribed once."""
+        metrics.reset()
+        for expected_decoder in ["pyav", "cache"]:
+            res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": "c2FtZSBhdWRpbw=="})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data["data"]["text"], "to day is saturday")
+            self.assertEqual(res["X-STT-Decoder"], expected_decoder)
+        self.assertEqual(mock_load_audio.call_count, 1)
+        self.assertEqual(mock_transcribe.call_count, 1)
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters["stt.cache.hit"], 1)
+        self.assertEqual(counters["stt.cache.miss"], 1)
@@ -0,0 +1,103 @@
+"""Tests for the asynchronous transcription jobs API."""
+
+import numpy as np
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import User
+from voice_recognition.cache import transcript_cache
+from voice_recognition.jobs import run_job
+from voice_recognition.models import TranscriptionJob
+
+JOB_CREATE_URL = reverse("Voice Recognition Job Create")
+
+
+def detail_url(job_id):
+    """Create and return a job detail url."""
+    return reverse("Voice Recognition Job Detail", args=[job_id])
+
+
+def create_user(email="testuser@example.com", password="testpass123", role=User.Role.DOCTOR, is_staff=False):
+    """Create and return a user. Returns DoctorUser by default."""
+    return User.objects.create_user(email=email, password=password, role=role, is_staff=is_staff)
+
+
+class PublicTranscriptionJobAPITests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to create jobs."""
+        res = self.client.post(JOB_CREATE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateTranscriptionJobAPITests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post_audio(self, audio=b"RIFF audio bytes", url=JOB_CREATE_URL):
+        return self.client.post(url, data=audio, content_type="audio/wave",
+                                HTTP_CONTENT_DISPOSITION="attachment; filename=speech.wav")
+
+    def test_create_job_returns_job_id(self):
+        """Test uploading audio returns a pending job immediately."""
+        res = self.post_audio()
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job = TranscriptionJob.objects.get(job_id=res.data["job_id"])
+        self.assertEqual(job.job_status, TranscriptionJob.Status.PENDING)
+        self.assertEqual(bytes(job.job_audio), b"RIFF audio bytes")
+        self.assertIsNone(res.data["data"])
+
+    @patch("voice_recognition.pipeline.pool.transcribe", return_value="to day is saturday")
+    @patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+    def test_retrieve_finished_job(self, mock_decode, mock_transcribe):
+        """Test a finished job returns the transcript, and can be fetched again."""
+        res = self.post_audio()
+        job_id = res.data["job_id"]
+        self.assertTrue(run_job(job_id))
+        self.assertFalse(run_job(job_id))
+        for _ in range(2):
+            res = self.client.get(detail_url(job_id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data["job_status"], TranscriptionJob.Status.DONE)
+            self.assertEqual(res.data["data"], {"text": "to day is saturday", "words": 4})
+        job = TranscriptionJob.objects.get(job_id=job_id)
+        self.assertIsNone(job.job_audio)
+
+    @patch("voice_recognition.pipeline.pool.transcribe", return_value="to day is saturday")
+    @patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+    def test_job_uses_requested_profile(self, mock_decode, mock_transcribe):
+        """Test the decoder profile chosen at upload is used when the job runs."""
+        res = self.post_audio(url=JOB_CREATE_URL + "?profile=fast")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        run_job(res.data["job_id"])
+        self.assertEqual(mock_transcribe.call_args[0][1], "fast")
+        res = self.post_audio(url=JOB_CREATE_URL + "?profile=fastest")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("voice_recognition.pipeline.load_audio", side_effect=ValueError("Invalid data"))
+    def test_failed_job_reports_error(self, mock_decode):
+        """Test a job that cannot be decoded is marked as failed."""
+        res = self.post_audio()
+        run_job(res.data["job_id"])
+        res = self.client.get(detail_url(res.data["job_id"]))
+        self.assertEqual(res.data["job_status"], TranscriptionJob.Status.FAILED)
+        self.assertEqual(res.data["job_error"], "Invalid data")
+
+    def test_jobs_of_other_users_not_visible(self):
+        """Test users can only retrieve their own jobs."""
+        other_user = create_user(email="other@example.com")
+        job = TranscriptionJob.objects.create(
+            job_audio=b"audio", job_created_by=other_user)
+        res = self.client.get(detail_url(job.job_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,118 @@
+"""Tests for the upload size and duration limits."""
+
+import io
+import json
+import wave
+from unittest.mock import patch
+import numpy as np
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import User
+from voice_recognition.audio import load_audio, probe_duration
+from voice_recognition.cache import transcript_cache
+from voice_recognition.models import AudioTooLarge, TranscriptionJob, decode_using_pyav
+
+VOICE_RECOGNITION_WEB_URL = reverse("Voice Recognition Speech to Text for Web")
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+VOICE_RECOGNITION_STREAM_URL = reverse(
+    "Voice Recognition Streaming Speech to Text")
+JOB_CREATE_URL = reverse("Voice Recognition Job Create")
+
+
+def create_wav(seconds, rate=44100):
+    """Create and return a silent mono 16 bit wav file as bytes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.zeros(int(seconds * rate), dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+class AudioLimitTests(TestCase):
+    """Tests for reading the duration from the header and limiting decoding."""
+
+    def test_probe_duration_from_header(self):
+        """Test the duration is read from the container header."""
+        self.assertAlmostEqual(probe_duration(io.BytesIO(create_wav(2.5))), 2.5, places=2)
+        self.assertAlmostEqual(probe_duration(io.BytesIO(create_wav(2, rate=16000))), 2)
+        self.assertIsNone(probe_duration(io.BytesIO(b"not audio")))
+
+    def test_decode_stops_at_max_seconds(self):
+        """Test decoding is abandoned once the audio passes max_seconds."""
+        with self.assertRaises(AudioTooLarge):
+            decode_using_pyav(io.BytesIO(create_wav(3)), max_seconds=1)
+        self.assertEqual(len(decode_using_pyav(io.BytesIO(create_wav(1)), max_seconds=1)), 16000)
+
+
+@override_settings(STT_MAX_UPLOAD_BYTES=200000, STT_MAX_AUDIO_SECONDS=2)
+@patch("voice_recognition.pipeline.pool.transcribe", return_value="to day is saturday")
+class UploadLimitAPITests(TestCase):
+    """Tests for rejecting oversized uploads with 413."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.client = APIClient()
+
+    def post_web(self, data):
+        return self.client.post(VOICE_RECOGNITION_WEB_URL, data=data, content_type="audio/wave",
+                                HTTP_CONTENT_DISPOSITION="attachment; filename=speech.wav")
+
+    def test_content_length_over_limit(self, mock_transcribe):
+        """Test a body declared over the byte limit is rejected before it is parsed."""
+        with patch("voice_recognition.views.transcribe_file") as mock_transcribe_file:
+            res = self.post_web(b"\0" * 200001)
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        mock_transcribe_file.assert_not_called()
+
+    def test_duration_over_limit(self, mock_transcribe):
+        """Test audio longer than the limit is rejected from its header, before decoding."""
+        with patch("voice_recognition.pipeline.load_audio") as mock_load_audio:
+            res = self.post_web(create_wav(2.1))
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        mock_load_audio.assert_not_called()
+
+    def test_base64_within_limit(self, mock_transcribe):
+        """Test base64 bodies are allowed for the encoding overhead, then checked decoded."""
+        from base64 import b64encode
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": b64encode(create_wav(1.5)).decode()},
+                               format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": b64encode(create_wav(2.2)).decode()},
+                               format="json")
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_upload_spooled_to_disk(self, mock_transcribe):
+        """Test uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are written to a temporary file."""
+        with patch("voice_recognition.pipeline.load_audio", wraps=load_audio) as mock_load_audio:
+            res = self.post_web(create_wav(1))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(mock_load_audio.call_args[0][0], TemporaryUploadedFile)
+
+    def test_job_over_limit_not_stored(self, mock_transcribe):
+        """Test an oversized job upload is rejected before it is saved."""
+        user = User.objects.create_user(email="testuser@example.com", password="testpass123",
+                                        role=User.Role.DOCTOR)
+        self.client.force_authenticate(user)
+        res = self.client.post(JOB_CREATE_URL, data=create_wav(3), content_type="audio/wave",
+                               HTTP_CONTENT_DISPOSITION="attachment; filename=speech.wav")
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(TranscriptionJob.objects.exists())
+
+    @patch("voice_recognition.views.get_model")
+    def test_stream_stops_at_max_seconds(self, mock_model, mock_transcribe):
+        """Test a streaming upload reports an error once it passes the duration limit."""
+        stream = mock_model.return_value.create_stream.return_value
+        stream.intermediateDecode.return_value = ""
+        res = self.client.post(VOICE_RECOGNITION_STREAM_URL, data=create_wav(3, rate=16000),
+                               content_type="audio/wave")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lines = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertEqual(lines[-1], {"detail": "Audio is longer than 2 seconds."})
+        stream.freeStream.assert_called_once()
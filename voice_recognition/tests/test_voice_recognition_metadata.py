@@ -0,0 +1,98 @@
+"""Tests for verbose transcripts with token timings and candidate confidences."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from voice_recognition.cache import transcript_cache
+from voice_recognition.metadata import compact_metadata, merge_metadata, word_timings
+from voice_recognition.models import DeepSpeechModel
+from voice_recognition.streaming import stream_transcript
+
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+
+
+def create_metadata(*candidates):
+    """Create a DeepSpeech-like Metadata object from (text, confidence) pairs, one token per 20ms."""
+    return SimpleNamespace(transcripts=[
+        SimpleNamespace(confidence=confidence, tokens=[
+            SimpleNamespace(text=char, timestep=index, start_time=index * 0.02)
+            for index, char in enumerate(text)
+        ])
+        for text, confidence in candidates
+    ])
+
+
+class MetadataEncodingTests(TestCase):
+    """Tests for the compact metadata encoding."""
+
+    def test_compact_metadata(self):
+        """Test tokens and times are encoded as parallel arrays with every candidate."""
+        metadata = compact_metadata(create_metadata(("hi you", -1.5), ("high you", -3.0)))
+        self.assertEqual(metadata["tokens"], "hi you")
+        self.assertEqual(metadata["start_times"], [0.0, 0.02, 0.04, 0.06, 0.08, 0.1])
+        self.assertEqual(metadata["candidates"], {"text": ["hi you", "high you"], "confidence": [-1.5, -3.0]})
+
+    def test_word_timings(self):
+        """Test each word starts at its first token and ends where the next space starts."""
+        starts, ends = word_timings("hi  you", [0.0, 0.02, 0.1, 0.2, 0.3, 0.32, 0.34])
+        self.assertEqual(starts, [0.0, 0.3])
+        # The last word ends one token length after its last token starts.
+        self.assertEqual(ends, [0.1, 0.4])
+        self.assertEqual(word_timings("a", [1.5]), ([1.5], [1.56]))
+        self.assertEqual(word_timings("", []), ([], []))
+
+    def test_merge_segments(self):
+        """Test segment times are shifted by each segment's offset and candidates joined."""
+        first = compact_metadata(create_metadata(("hi", -1.0), ("high", -2.0)))
+        second = compact_metadata(create_metadata(("you", -0.5)))
+        empty = compact_metadata(create_metadata(("", -0.1)))
+        merged = merge_metadata([first, empty, second], [0.0, 1.0, 2.0])
+        self.assertEqual(merged["tokens"], "hi you")
+        self.assertEqual(merged["start_times"], [0.0, 0.02, 2.0, 2.0, 2.02, 2.04])
+        self.assertEqual(merged["candidates"]["text"], ["hi you", "high you"])
+        self.assertEqual(merged["candidates"]["confidence"], [-1.5, -2.5])
+
+
+class VerboseTranscriptionTests(TestCase):
+    """Tests for verbose mode in the model and the API."""
+
+    @patch("voice_recognition.models.Model")
+    def test_model_uses_single_metadata_pass(self, mock_model):
+        """Test verbose transcription runs sttWithMetadata once and never stt."""
+        mock_model.return_value.sttWithMetadata.return_value = create_metadata(("hi", -1.0))
+        metadata = DeepSpeechModel().transcribe_with_metadata(np.zeros(160, dtype=np.int16))
+        self.assertEqual(metadata["tokens"], "hi")
+        mock_model.return_value.sttWithMetadata.assert_called_once()
+        mock_model.return_value.stt.assert_not_called()
+
+    @patch("voice_recognition.models.Model")
+    def test_stream_final_event_verbose(self, mock_model):
+        """Test a verbose stream finishes with the metadata instead of a second decode."""
+        stream = mock_model.return_value.createStream.return_value
+        stream.finishStreamWithMetadata.return_value = create_metadata(("hi", -1.0))
+        events = list(stream_transcript(DeepSpeechModel(), [np.zeros(160, dtype=np.int16)], 0, verbose=True))
+        self.assertEqual(events[-1]["data"]["word_times"], {"start": [0.0], "end": [0.08]})
+        stream.finishStream.assert_not_called()
+
+    @patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+    @patch("voice_recognition.pipeline.pool.transcribe")
+    def test_verbose_response(self, mock_transcribe, mock_load_audio):
+        """Test ?verbose=true returns word and token timings and candidate confidences."""
+        transcript_cache.clear()
+        mock_transcribe.return_value = compact_metadata(create_metadata(("hi you", -1.5), ("high you", -3.0)))
+        res = APIClient().post(VOICE_RECOGNITION_MOBILE_URL + "?verbose=true", {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["data"], {
+            "text": "hi you",
+            "words": 2,
+            "token_times": [0.0, 0.02, 0.04, 0.06, 0.08, 0.1],
+            "word_times": {"start": [0.0, 0.06], "end": [0.04, 0.16]},
+            "candidates": {"text": ["hi you", "high you"], "confidence": [-1.5, -3.0]},
+        })
+        self.assertTrue(mock_transcribe.call_args[0][2])
+        self.assertEqual(mock_transcribe.call_count, 1)
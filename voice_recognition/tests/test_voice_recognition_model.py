@@ -1,7 +1,12 @@
 """Tests for the Deepspeech Voice Recognition Model."""
 
+import io
+import wave
+import numpy as np
+from unittest.mock import patch
 from django.test import TestCase
-from voice_recognition.models import DeepSpeechModel
+from voice_recognition.models import DeepSpeechModel, decode_using_pyav
+from voice_recognition.registry import ModelRegistry
 
 AUDIO_FILES_LOW = {
     "One": {
@@ -23,6 +28,20 @@ AUDIO_FILES_HIGH = {
 }
 
 
+def create_wav(seconds, rate=16000, channels=1):
+    """Create and return a 440Hz tone as a 16 bit wav file in a BytesIO."""
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 10000).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.repeat(tone, channels).tobytes())
+    buffer.seek(0)
+    return buffer
+
+
 class VoiceRecognitionModelTests(TestCase):
     """Tests for the Deepspeech Voice Recognition model."""
 
@@ -38,3 +57,45 @@ class VoiceRecognitionModelTests(TestCase):
         """Test Speech to Text on a system audio file two."""
         txt = self.model.transcibe_batch(AUDIO_FILES_LOW["Two"]["path"])
         self.assertEqual(txt, AUDIO_FILES_LOW["Two"]["expected"])
+
+
+class ModelRegistryTests(TestCase):
+    """Tests for the process-wide model registry."""
+
+    def test_model_loaded_once(self):
+        """Test the registry loads the model once and shares the instance."""
+        loaded = []
+
+        def factory():
+            loaded.append(object())
+            return loaded[-1]
+
+        registry = ModelRegistry(factory=factory)
+        self.assertFalse(registry.is_loaded())
+        first = registry.get_model()
+        second = registry.get_model()
+        self.assertIs(first, second)
+        self.assertEqual(len(loaded), 1)
+        info = registry.info()
+        self.assertTrue(info["loaded"])
+        self.assertGreaterEqual(info["load_time"], 0)
+        self.assertGreaterEqual(info["memory_bytes"], 0)
+
+
+class DecodeUsingPyAVTests(TestCase):
+    """Tests for decoding and resampling audio with PyAV."""
+
+    def test_decode_resamples_to_16khz_mono(self):
+        """Test stereo 44.1kHz audio is decoded to every 16kHz mono sample."""
+        audio = decode_using_pyav(create_wav(2.5, rate=44100, channels=2))
+        self.assertEqual(audio.dtype, np.int16)
+        self.assertEqual(audio.ndim, 1)
+        self.assertEqual(len(audio), 2.5 * 16000)
+
+    @patch("voice_recognition.models._estimate_samples", return_value=10)
+    def test_decode_grows_buffer_when_estimate_short(self, mock_estimate):
+        """Test the buffer grows when the container under-reports its duration."""
+        expected = np.frombuffer(
+            wave.open(create_wav(1.2), "rb").readframes(-1), dtype=np.int16)
+        audio = decode_using_pyav(create_wav(1.2))
+        np.testing.assert_array_equal(audio, expected)
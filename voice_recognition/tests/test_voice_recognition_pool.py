@@ -0,0 +1,90 @@
+"""Tests for the speech to text inference pool."""
+
+import os
+import threading
+import numpy as np
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from voice_recognition.pool import InferencePool, PoolFull
+
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+
+
+class InferencePoolTests(TestCase):
+    """Tests for queueing and backpressure in the inference pool."""
+
+    def test_submit_rejected_when_queue_full(self):
+        """Test submitting beyond capacity raises PoolFull with a retry hint."""
+        inference_pool = InferencePool(workers=0, queue_size=1)
+        release = threading.Event()
+        running = inference_pool.submit(release.wait)
+        queued = inference_pool.submit(release.wait)
+        self.assertEqual(inference_pool.stats()["in_flight"], 2)
+        with self.assertRaises(PoolFull) as ctx:
+            inference_pool.submit(release.wait)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        release.set()
+        running.result()
+        queued.result()
+        self.assertEqual(inference_pool.stats()["in_flight"], 0)
+
+    def test_slot_released_after_failure(self):
+        """Test a failing task frees its slot in the queue."""
+        inference_pool = InferencePool(workers=0, queue_size=0)
+
+        def fail():
+            raise ValueError("bad audio")
+
+        with self.assertRaises(ValueError):
+            inference_pool.submit(fail).result()
+        self.assertEqual(inference_pool.stats()["in_flight"], 0)
+
+    def test_worker_dying_mid_task_is_busy(self):
+        """Test a worker dying while running a task raises PoolFull instead of an error."""
+        inference_pool = InferencePool(workers=1, queue_size=0)
+        future = Future()
+        future.set_exception(BrokenProcessPool("A worker died."))
+        with self.assertRaises(PoolFull):
+            inference_pool._result(future)
+
+    @patch("voice_recognition.pool.registries", {})
+    def test_worker_info_from_workers(self):
+        """Test the worker info is reported by the process running the inference."""
+        inference_pool = InferencePool(workers=0, queue_size=0)
+        [info] = inference_pool.worker_info()
+        self.assertEqual(info["pid"], os.getpid())
+        self.assertIn("model", info)
+        inference_pool.shutdown()
+
+    @patch("voice_recognition.pool.registries", {})
+    def test_worker_info_takes_a_slot(self):
+        """Test worker info isn't queued past the pool's capacity, so a full pool reports no workers."""
+        inference_pool = InferencePool(workers=0, queue_size=0)
+        release = threading.Event()
+        running = inference_pool.submit(release.wait)
+        self.assertEqual(inference_pool.worker_info(timeout=0.1), [])
+        self.assertEqual(inference_pool.stats()["in_flight"], 1)
+        release.set()
+        running.result()
+        inference_pool.shutdown()
+
+
+class InferencePoolAPITests(TestCase):
+    """Tests for backpressure responses from the speech to text API."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+    @patch("voice_recognition.pipeline.pool.transcribe", side_effect=PoolFull(7))
+    def test_queue_full_returns_503(self, mock_transcribe, mock_decode):
+        """Test a full queue returns 503 with a Retry-After header."""
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "7")
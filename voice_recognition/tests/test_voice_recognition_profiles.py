@@ -0,0 +1,73 @@
+"""Tests for the speech to text decoder profiles."""
+
+import numpy as np
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from voice_recognition.cache import transcript_cache
+from voice_recognition.models import DeepSpeechModel
+from voice_recognition.registry import get_profile
+
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+VOICE_RECOGNITION_COMMANDS_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile Commands")
+
+
+class DecoderProfileModelTests(TestCase):
+    """Tests for configuring the model for each profile."""
+
+    @patch("voice_recognition.models.Model")
+    def test_fast_profile_disables_scorer(self, mock_model):
+        """Test the fast profile runs without the external scorer and with a narrow beam."""
+        DeepSpeechModel("fast")
+        mock_model.return_value.enableExternalScorer.assert_not_called()
+        mock_model.return_value.setBeamWidth.assert_called_once_with(50)
+
+    @patch("voice_recognition.models.Model")
+    def test_accurate_profile_enables_scorer(self, mock_model):
+        """Test the accurate profile uses the scorer and the full beam width."""
+        DeepSpeechModel("accurate")
+        mock_model.return_value.enableExternalScorer.assert_called_once()
+        mock_model.return_value.setBeamWidth.assert_called_once_with(500)
+
+    def test_unknown_profile_rejected(self):
+        """Test an unknown profile name raises ValueError."""
+        self.assertEqual(get_profile(None), "accurate")
+        with self.assertRaises(ValueError):
+            get_profile("fastest")
+
+
+@patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+@patch("voice_recognition.pipeline.pool.transcribe", return_value="open notes")
+class DecoderProfileAPITests(TestCase):
+    """Tests for choosing the decoder profile per request or per endpoint."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.client = APIClient()
+
+    def test_profile_per_request(self, mock_transcribe, mock_load_audio):
+        """Test ?profile= selects the decoder profile."""
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL + "?profile=balanced", {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-STT-Profile"], "balanced")
+        self.assertEqual(mock_transcribe.call_args[0][1], "balanced")
+
+    def test_profile_per_endpoint(self, mock_transcribe, mock_load_audio):
+        """Test the commands endpoint uses the fast profile by default."""
+        res = self.client.post(VOICE_RECOGNITION_COMMANDS_URL, {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-STT-Profile"], "fast")
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": "AAAA"})
+        self.assertEqual(res["X-STT-Profile"], "accurate")
+        # Transcripts of different profiles are cached separately.
+        self.assertEqual(res["X-STT-Decoder"], "pyav")
+
+    def test_unknown_profile_returns_400(self, mock_transcribe, mock_load_audio):
+        """Test an unknown profile is rejected before any decoding."""
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL + "?profile=fastest", {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_load_audio.assert_not_called()
@@ -0,0 +1,104 @@
+"""Tests for streaming speech to text."""
+
+import io
+import json
+import wave
+import numpy as np
+from unittest.mock import patch
+from django.conf import settings
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from voice_recognition.streaming import stream_slots, stream_transcript
+
+VOICE_RECOGNITION_STREAM_URL = reverse(
+    "Voice Recognition Streaming Speech to Text")
+
+
+class FakeStream:
+    """DeepSpeech stream that 'recognises' one word per second of audio."""
+
+    def __init__(self):
+        self.samples = 0
+        self.freed = False
+
+    def feedAudioContent(self, chunk):
+        self.samples += len(chunk)
+
+    def intermediateDecode(self):
+        return " ".join(["word"] * (self.samples // 16000))
+
+    def finishStream(self):
+        return self.intermediateDecode()
+
+    def freeStream(self):
+        self.freed = True
+
+
+class FakeModel:
+    def __init__(self):
+        self.stream = FakeStream()
+
+    def create_stream(self):
+        return self.stream
+
+
+def create_wav(seconds, rate=16000):
+    """Create and return a silent mono 16 bit wav file as bytes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.zeros(int(seconds * rate), dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+class StreamTranscriptTests(TestCase):
+    """Tests for feeding audio into a DeepSpeech stream."""
+
+    def test_partials_then_final_transcript(self):
+        """Test partial transcripts are emitted as audio arrives, then the final text."""
+        chunks = [np.zeros(8000, dtype=np.int16) for _ in range(6)]
+        events = list(stream_transcript(FakeModel(), chunks, partial_seconds=1))
+        self.assertEqual(events[:2], [{"partial": "word"}, {"partial": "word word"}])
+        self.assertEqual(events[-1], {"data": {"text": "word word word", "words": 3}})
+
+    def test_stream_freed_on_error(self):
+        """Test the native stream is freed when decoding fails midway."""
+        model = FakeModel()
+
+        def chunks():
+            yield np.zeros(8000, dtype=np.int16)
+            raise ValueError("Invalid data")
+
+        with self.assertRaises(ValueError):
+            list(stream_transcript(model, chunks(), partial_seconds=1))
+        self.assertTrue(model.stream.freed)
+
+
+class StreamingAPITests(TestCase):
+    """Tests for the streaming speech to text API."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @patch("voice_recognition.views.get_model", return_value=FakeModel())
+    def test_stream_wav_upload(self, mock_model):
+        """Test streaming a wav upload returns partial and final transcripts as NDJSON."""
+        res = self.client.post(VOICE_RECOGNITION_STREAM_URL, data=create_wav(3, rate=44100),
+                               content_type="audio/wave")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        lines = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertIn("partial", lines[0])
+        self.assertEqual(lines[-1], {"data": {"text": "word word word", "words": 3}})
+
+    @patch("voice_recognition.views.get_model", side_effect=OSError("Scorer not found"))
+    def test_slot_released_when_model_fails(self, mock_model):
+        """Test a model failing to load doesn't keep the stream slot."""
+        for _ in range(settings.STT_STREAM_LIMIT + 1):
+            with self.assertRaises(OSError):
+                self.client.post(VOICE_RECOGNITION_STREAM_URL, data=create_wav(1), content_type="audio/wave")
+        self.assertTrue(stream_slots.acquire(blocking=False))
+        stream_slots.release()
@@ -0,0 +1,105 @@
+"""Tests for splitting recordings at silence."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from voice_recognition.pipeline import transcribe_audio
+from voice_recognition.pool import InferencePool
+from voice_recognition.vad import split_on_silence
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=10000):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (np.sin(2 * np.pi * 440 * t) * amplitude).astype(np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+class SplitOnSilenceTests(TestCase):
+    """Tests for the energy based voice activity detection."""
+
+    def test_split_at_pauses(self):
+        """Test speech separated by pauses is split into one segment per utterance."""
+        audio = np.concatenate([silence(0.5), tone(2), silence(1), tone(3), silence(0.5)])
+        segments = split_on_silence(audio)
+        self.assertEqual(len(segments), 2)
+        first, second = segments
+        self.assertLessEqual(first[0], int(0.5 * RATE))
+        self.assertTrue(int(2.5 * RATE) <= first[1] <= int(3.5 * RATE))
+        self.assertEqual(second[0], first[1])
+        self.assertGreaterEqual(second[1], int(6.5 * RATE))
+
+    def test_short_pause_not_split(self):
+        """Test pauses shorter than min_silence_ms don't split the speech."""
+        audio = np.concatenate([tone(1), silence(0.1), tone(1)])
+        self.assertEqual(split_on_silence(audio, min_silence_ms=300), [(0, len(audio))])
+
+    def test_long_speech_split_at_max_length(self):
+        """Test continuous speech is cut into pieces no longer than max_segment_seconds."""
+        audio = tone(25)
+        segments = split_on_silence(audio, max_segment_seconds=10)
+        self.assertEqual(segments[0][0], 0)
+        self.assertEqual(segments[-1][1], len(audio))
+        for start, end in segments:
+            self.assertLessEqual(end - start, 10 * RATE)
+
+    def test_silence_dropped(self):
+        """Test a recording with no speech has no segments."""
+        self.assertEqual(split_on_silence(silence(5)), [])
+
+
+class SegmentedTranscriptionTests(TestCase):
+    """Tests for transcribing segments in parallel through the pool."""
+
+    def test_segments_run_in_parallel_and_keep_order(self):
+        """Test segments are transcribed concurrently and returned in order."""
+        inference_pool = InferencePool(workers=2, queue_size=0)
+        both_running = threading.Barrier(2, timeout=5)
+
+        class Model:
+            def transcribe_batch_with_buffer(self, audio):
+                both_running.wait()
+                return str(len(audio))
+
+        with patch("voice_recognition.pool.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("voice_recognition.pool.get_model", return_value=Model()):
+            texts = inference_pool.transcribe_segments([silence(1), silence(2)])
+        self.assertEqual(texts, [str(RATE), str(2 * RATE)])
+        self.assertEqual(inference_pool.stats()["in_flight"], 0)
+
+    def test_segments_wait_for_free_slot(self):
+        """Test a request with more segments than queue slots still completes."""
+        inference_pool = InferencePool(workers=0, queue_size=0)
+
+        class Model:
+            def transcribe_batch_with_buffer(self, audio):
+                return str(len(audio))
+
+        with patch("voice_recognition.pool.get_model", return_value=Model()):
+            texts = inference_pool.transcribe_segments([silence(1)] * 4)
+        self.assertEqual(texts, [str(RATE)] * 4)
+
+    @override_settings(STT_SEGMENT_MIN_SECONDS=1)
+    @patch("voice_recognition.pipeline.pool")
+    def test_transcripts_stitched_in_order(self, mock_pool):
+        """Test the segment transcripts are joined in order, skipping empty ones."""
+        mock_pool.transcribe_segments.return_value = ["the patient", "", "is well"]
+        audio = np.concatenate([tone(1), silence(1), tone(1), silence(1), tone(1)])
+        self.assertEqual(transcribe_audio(audio), "the patient is well")
+        segments = mock_pool.transcribe_segments.call_args[0][0]
+        self.assertEqual(sum(len(segment) for segment in segments), len(audio))
+        mock_pool.transcribe.assert_not_called()
+
+    @patch("voice_recognition.pipeline.pool")
+    def test_short_audio_not_segmented(self, mock_pool):
+        """Test short recordings go to the model in one piece."""
+        mock_pool.transcribe.return_value = "yes"
+        audio = np.concatenate([tone(1), silence(1), tone(1)])
+        self.assertEqual(transcribe_audio(audio), "yes")
+        mock_pool.transcribe_segments.assert_not_called()
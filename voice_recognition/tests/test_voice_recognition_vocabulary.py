@@ -0,0 +1,165 @@
+"""Tests for per-clinic speech to text vocabularies."""
+
+import numpy as np
+from functools import partial
+from unittest.mock import MagicMock, patch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from clinic.models import Clinic
+from users.models import AdminUser, Doctor, DoctorUser
+from voice_recognition.cache import transcript_cache
+from voice_recognition.models import ClinicVocabulary, DeepSpeechModel
+from voice_recognition.registry import ModelRegistry, VocabularyModels, get_model
+from voice_recognition.vocabulary import Vocabulary, load_vocabulary
+
+VOICE_RECOGNITION_MOBILE_URL = reverse(
+    "Voice Recognition Speech to Text for Mobile")
+
+
+def create_vocabulary(clinic, hot_words=None, scorer=""):
+    """Create and return a clinic vocabulary."""
+    return ClinicVocabulary.objects.create(
+        vocabulary_clinic=clinic,
+        vocabulary_hot_words=hot_words or {},
+        vocabulary_scorer=scorer,
+    )
+
+
+class VocabularyModelTests(TestCase):
+    """Tests for configuring and caching models with a clinic vocabulary."""
+
+    @patch("voice_recognition.models.Model")
+    def test_hot_words_and_scorer_applied(self, mock_model):
+        """Test the clinic scorer replaces the default one and each hot word is boosted."""
+        DeepSpeechModel("accurate", "/srv/clinic.scorer", (("metformin", 8.0),))
+        mock_model.return_value.enableExternalScorer.assert_called_once_with("/srv/clinic.scorer")
+        mock_model.return_value.addHotWord.assert_called_once_with("metformin", 8.0)
+
+    def test_models_cached_per_clinic(self):
+        """Test each clinic's model is loaded once and the least recently used is evicted."""
+        factory = MagicMock(side_effect=lambda *args: object())
+        models = VocabularyModels(max_entries=2, factory=factory)
+        first = Vocabulary(1, "v1", "/srv/1.scorer", (("metformin", 8.0),))
+        second = Vocabulary(2, "v1", "/srv/2.scorer", (("warfarin", 8.0),))
+        third = Vocabulary(3, "v1", "/srv/3.scorer", (("insulin", 8.0),))
+
+        model = models.get_model("accurate", first)
+        self.assertIs(models.get_model("accurate", first), model)
+        self.assertEqual(factory.call_count, 1)
+        factory.assert_called_with("accurate", "/srv/1.scorer", (("metformin", 8.0),))
+
+        models.get_model("accurate", second)
+        models.get_model("accurate", first)
+        models.get_model("accurate", third)
+        self.assertEqual([entry["clinic_id"] for entry in models.info()], [1, 3])
+
+    @patch("voice_recognition.models.Model")
+    def test_hot_words_share_profile_model(self, mock_model):
+        """Test clinics with only hot words use the profile's model, with their hot words set per task."""
+        registry = ModelRegistry(factory=partial(DeepSpeechModel, "accurate"))
+        with patch.dict("voice_recognition.registry.registries", {"accurate": registry}), \
+                patch("voice_recognition.registry.vocabulary_models") as mock_vocabulary_models:
+            first = get_model("accurate", Vocabulary(1, "v1", None, (("metformin", 8.0),)))
+            second = get_model("accurate", Vocabulary(2, "v1", None, (("warfarin", 5.0),)))
+            self.assertIs(first.model, registry.get_model())
+            self.assertIs(second.model, registry.get_model())
+
+            deepspeech = mock_model.return_value
+            first.transcribe_batch_with_buffer(b"")
+            deepspeech.addHotWord.assert_called_once_with("metformin", 8.0)
+            second.transcribe_batch_with_buffer(b"")
+            deepspeech.clearHotWords.assert_called_once()
+            deepspeech.addHotWord.assert_called_with("warfarin", 5.0)
+            get_model("accurate").transcribe_batch_with_buffer(b"")
+            self.assertEqual(deepspeech.clearHotWords.call_count, 2)
+            self.assertEqual(deepspeech.addHotWord.call_count, 2)
+        mock_vocabulary_models.get_model.assert_not_called()
+
+    @patch("voice_recognition.registry.vocabulary_models")
+    def test_fast_profile_ignores_scorer(self, mock_vocabulary_models):
+        """Test a clinic scorer loads no model of its own for a profile without a scorer."""
+        registry = ModelRegistry(factory=MagicMock)
+        vocabulary = Vocabulary(1, "v1", "/srv/1.scorer", (("metformin", 8.0),))
+        with patch.dict("voice_recognition.registry.registries", {"fast": registry}):
+            model = get_model("fast", vocabulary)
+        self.assertIs(model.model, registry.get_model())
+        self.assertEqual(model.hot_words, (("metformin", 8.0),))
+        mock_vocabulary_models.get_model.assert_not_called()
+        get_model("accurate", vocabulary)
+        mock_vocabulary_models.get_model.assert_called_once_with("accurate", vocabulary)
+
+    def test_load_vocabulary(self):
+        """Test a clinic's vocabulary is loaded with its hot words sorted."""
+        clinic = Clinic.objects.create(clinic_name="North Clinic")
+        self.assertIsNone(load_vocabulary(clinic.clinic_id))
+        create_vocabulary(clinic, {"warfarin": 5, "metformin": 8.0})
+        vocabulary = load_vocabulary(clinic.clinic_id)
+        self.assertEqual(vocabulary.clinic_id, clinic.clinic_id)
+        self.assertIsNone(vocabulary.scorer)
+        self.assertEqual(vocabulary.hot_words, (("metformin", 8.0), ("warfarin", 5.0)))
+
+
+@patch("voice_recognition.pipeline.load_audio", return_value=(np.zeros(16000, dtype=np.int16), "pyav"))
+@patch("voice_recognition.pipeline.pool.transcribe", return_value="start metformin")
+class VocabularyAPITests(TestCase):
+    """Tests for choosing the clinic vocabulary per request."""
+
+    def setUp(self):
+        transcript_cache.clear()
+        self.client = APIClient()
+        self.clinic = Clinic.objects.create(clinic_name="North Clinic")
+        create_vocabulary(self.clinic, {"metformin": 8.0})
+
+    def test_clinic_per_request(self, mock_transcribe, mock_load_audio):
+        """Test ?clinic= from staff passes that clinic's vocabulary to the inference pool."""
+        self.client.force_authenticate(AdminUser.objects.create_user(email="admin@example.com", password="testpass123"))
+        url = VOICE_RECOGNITION_MOBILE_URL + f"?clinic={self.clinic.clinic_id}"
+        res = self.client.post(url, {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        vocabulary = mock_transcribe.call_args[0][3]
+        self.assertEqual(vocabulary.clinic_id, self.clinic.clinic_id)
+        self.assertEqual(vocabulary.hot_words, (("metformin", 8.0),))
+
+    def test_doctor_clinic_by_default(self, mock_transcribe, mock_load_audio):
+        """Test a doctor's own clinic vocabulary is used without ?clinic=."""
+        user = DoctorUser.objects.create_user(email="doctor@example.com", password="testpass123")
+        Doctor.objects.create(
+            user=user, doctor_name="Doctor", doctor_dob="1980-01-01", doctor_clinic=self.clinic)
+        self.client.force_authenticate(user)
+        self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": "AAAA"})
+        self.assertEqual(mock_transcribe.call_args[0][3].clinic_id, self.clinic.clinic_id)
+
+    def test_other_clinic_forbidden(self, mock_transcribe, mock_load_audio):
+        """Test only staff can choose a clinic other than their own."""
+        url = VOICE_RECOGNITION_MOBILE_URL + f"?clinic={self.clinic.clinic_id}"
+        res = self.client.post(url, {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        user = DoctorUser.objects.create_user(email="doctor@example.com", password="testpass123")
+        Doctor.objects.create(
+            user=user, doctor_name="Doctor", doctor_dob="1980-01-01",
+            doctor_clinic=Clinic.objects.create(clinic_name="South Clinic"))
+        self.client.force_authenticate(user)
+        res = self.client.post(url, {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        mock_transcribe.assert_not_called()
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL + f"?clinic={user.profile.doctor_clinic_id}",
+                               {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_transcripts_cached_per_clinic(self, mock_transcribe, mock_load_audio):
+        """Test the same audio is transcribed again for a clinic with another vocabulary."""
+        self.client.force_authenticate(AdminUser.objects.create_user(email="admin@example.com", password="testpass123"))
+        self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": "AAAA"})
+        self.client.post(VOICE_RECOGNITION_MOBILE_URL, {"data": "AAAA"})
+        self.assertEqual(mock_transcribe.call_count, 1)
+        self.assertIsNone(mock_transcribe.call_args[0][3])
+        self.client.post(VOICE_RECOGNITION_MOBILE_URL + f"?clinic={self.clinic.clinic_id}", {"data": "AAAA"})
+        self.assertEqual(mock_transcribe.call_count, 2)
+
+    def test_invalid_clinic_returns_400(self, mock_transcribe, mock_load_audio):
+        """Test a non-numeric clinic id is rejected before any decoding."""
+        res = self.client.post(VOICE_RECOGNITION_MOBILE_URL + "?clinic=north", {"data": "AAAA"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_load_audio.assert_not_called()
@@ -1,9 +1,26 @@
 from django.urls import path
-from voice_recognition.views import VoiceRecognitionAPIView, VoiceRecognitionMobileAPIView
+from voice_recognition.views import (
+    VoiceRecognitionAPIView, VoiceRecognitionMobileAPIView, VoiceRecognitionStatusAPIView,
+    TranscriptionJobCreateAPIView, TranscriptionJobRetrieveAPIView, VoiceRecognitionStreamAPIView,
+    VoiceRecognitionBatchAPIView
+)
 
 urlpatterns = [
     path("", VoiceRecognitionAPIView.as_view(),
          name="Voice Recognition Speech to Text for Web"),
     path("mobile/", VoiceRecognitionMobileAPIView.as_view(),
-         name="Voice Recognition Speech to Text for Mobile")
+         name="Voice Recognition Speech to Text for Mobile"),
+    # Short voice commands don't need the language model.
+    path("mobile/commands/", VoiceRecognitionMobileAPIView.as_view(decoder_profile="fast"),
+         name="Voice Recognition Speech to Text for Mobile Commands"),
+    path("stream/", VoiceRecognitionStreamAPIView.as_view(),
+         name="Voice Recognition Streaming Speech to Text"),
+    path("batch/", VoiceRecognitionBatchAPIView.as_view(),
+         name="Voice Recognition Batch Speech to Text"),
+    path("status/", VoiceRecognitionStatusAPIView.as_view(),
+         name="Voice Recognition Status"),
+    path("jobs/", TranscriptionJobCreateAPIView.as_view(),
+         name="Voice Recognition Job Create"),
+    path("jobs/<uuid:pk>/", TranscriptionJobRetrieveAPIView.as_view(),
+         name="Voice Recognition Job Detail"),
 ]
@@ -0,0 +1,69 @@
+"""Energy based voice activity detection for splitting long recordings at silence."""
+
+import numpy as np
+from voice_recognition.models import SAMPLE_RATE
+
+FRAME_MS = 30
+# Frames quieter than this RMS are always silence, whatever the background level.
+SILENCE_FLOOR = 300
+# Frames louder than this many times the background level (or within this factor
+# of the loudest frame, for recordings with no pauses at all) are speech.
+NOISE_RATIO = 3.0
+NOISE_PERCENTILE = 10
+
+
+def frame_energy(samples, frame_size):
+    """Return the RMS energy of each whole frame of int16 ``samples``."""
+    count = len(samples) // frame_size
+    frames = samples[:count * frame_size].reshape(count, frame_size).astype(np.float32)
+    return np.sqrt(np.mean(np.square(frames), axis=1))
+
+
+def split_on_silence(samples, sample_rate=SAMPLE_RATE, min_silence_ms=300, max_segment_seconds=20):
+    """Split audio into speech segments at pauses.
+
+    Segments are cut in the middle of every pause of at least
+    ``min_silence_ms``; segments still longer than ``max_segment_seconds`` are
+    cut again at their quietest frame. Segments without any speech are
+    dropped.
+    :returns: list of (start, end) sample offsets, in order
+    """
+    frame_size = sample_rate * FRAME_MS // 1000
+    energy = frame_energy(samples, frame_size)
+    if not len(energy):
+        return [(0, len(samples))] if len(samples) else []
+    noise = np.percentile(energy, NOISE_PERCENTILE)
+    threshold = max(SILENCE_FLOOR, min(noise * NOISE_RATIO, energy.max() / NOISE_RATIO))
+    voiced = energy > threshold
+
+    # Cut points, in frames, at the middle of each long enough run of silence.
+    min_silence = max(1, min_silence_ms // FRAME_MS)
+    cuts = [0]
+    run_start = None
+    for index, is_voiced in enumerate(np.append(voiced, True)):
+        if not is_voiced and run_start is None:
+            run_start = index
+        elif is_voiced and run_start is not None:
+            if index - run_start >= min_silence:
+                cuts.append((run_start + index) // 2)
+            run_start = None
+    cuts.append(len(energy))
+
+    max_frames = max(2, max_segment_seconds * 1000 // FRAME_MS)
+    segments = []
+    for start, end in zip(cuts, cuts[1:]):
+        while end - start > max_frames:
+            # Cut at the quietest frame in the second half of the allowed length.
+            window = energy[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            if voiced[start:cut].any():
+                segments.append((start, cut))
+            start = cut
+        if voiced[start:end].any():
+            segments.append((start, end))
+
+    # Convert to samples; the last segment keeps the samples after the last whole frame.
+    offsets = [(start * frame_size, end * frame_size) for start, end in segments]
+    if offsets and segments[-1][1] == len(energy):
+        offsets[-1] = (offsets[-1][0], len(samples))
+    return offsets
@@ -1,52 +1,122 @@
 """View for Voice Recognition API."""
 
+import zipfile
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.generics import CreateAPIView
-from rest_framework.parsers import FileUploadParser
-from voice_recognition.models import DeepSpeechModel, decode_using_pyav
-from voice_recognition.serializers import WavFileSerializer, Base64EncodedStringSerializer
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
-from base64 import b64decode
-from io import BytesIO
-from sys import getsizeof
-from django.core.files.uploadedfile import InMemoryUploadedFile
-
-
-def error_response(msg, status_code):
+from rest_framework.generics import CreateAPIView, RetrieveAPIView
+from rest_framework.views import APIView
+from rest_framework.parsers import FileUploadParser, JSONParser, FormParser, MultiPartParser
+from voice_recognition.models import AudioTooLarge, TranscriptionJob
+from voice_recognition.registry import get_model, get_profile
+from voice_recognition.pool import pool, PoolFull
+from voice_recognition.metrics import metrics
+from voice_recognition.jobs import enqueue_job
+from voice_recognition.batch import BatchTranscription
+from voice_recognition.streaming import BodyReader, TranscriptStream, stream_slots
+from voice_recognition.audio import (
+    BufferReader, RawAudioParser, base64_length, check_audio_limits, check_content_length,
+    decode_base64_audio
+)
+from voice_recognition.pipeline import transcribe_file
+from voice_recognition.metadata import verbose_payload
+from voice_recognition.vocabulary import requested_vocabulary
+from voice_recognition.serializers import (
+    WavFileSerializer, Base64EncodedStringSerializer, TranscriptionJobSerializer
+)
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from users.authentication import CachedTokenAuthentication
+from users.models import User
+
+
+def error_response(msg, status_code, headers=None):
     payload = {
         "detail": msg,
     }
-    return Response(payload, status_code)
+    return Response(payload, status_code, headers=headers)
+
+
+def busy_response(exc):
+    """Return 503 with a Retry-After header when the inference queue is full."""
+    return error_response("Speech to text is busy, please try again later.",
+                          status.HTTP_503_SERVICE_UNAVAILABLE,
+                          headers={"Retry-After": str(exc.retry_after)})
+
+
+def too_large_response(exc):
+    """Return 413 when an upload is over the size or duration limit."""
+    return error_response(str(exc), status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+def oversized_upload_response(request, max_bytes=None):
+    """Return a 413 response if the request declares a body over the upload limit, before it is read."""
+    try:
+        check_content_length(request, max_bytes or settings.STT_MAX_UPLOAD_BYTES)
+    except AudioTooLarge as exc:
+        return too_large_response(exc)
+    return None
+
+
+def requested_profile(request, view):
+    """Return the decoder profile chosen with ?profile=, or the view's own default."""
+    return request.query_params.get("profile") or view.decoder_profile
+
+
+def requested_verbose(request):
+    """Check if the request asks for token timings and candidates with ?verbose=true."""
+    return request.query_params.get("verbose", "").lower() in ("1", "true", "yes")
+
+
+def transcript_response(request, audio_file, view):
+    """Transcribe an uploaded audio file and return the text and word count.
+
+    Uses the decoder profile and clinic vocabulary chosen by the request (or
+    the view), and returns the token timings and candidate confidences too
+    with ?verbose=true.
+    """
+    try:
+        profile = get_profile(requested_profile(request, view))
+        vocabulary = requested_vocabulary(request)
+    except ValueError as exc:
+        return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+    try:
+        transcript = transcribe_file(audio_file, profile, requested_verbose(request), vocabulary)
+    except PoolFull as exc:
+        return busy_response(exc)
+    except AudioTooLarge as exc:
+        return too_large_response(exc)
+    txt = transcript.text
+    print(f"Transcribed: {txt}")
+    payload = {
+        "data": {
+            "text": txt,
+            "words": len(txt.split())
+        }
+    }
+    if transcript.metadata is not None:
+        payload["data"] = verbose_payload(transcript.metadata)
+    headers = {"X-STT-Decoder": transcript.decoder, "X-STT-Profile": profile}
+    return Response(payload, status.HTTP_200_OK, headers=headers)
 
 
 class VoiceRecognitionAPIView(CreateAPIView):
     """CreateAPI view to upload .wav file and convert speech to text."""
     serializer_class = WavFileSerializer
     parser_classes = [FileUploadParser]
-
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.stt = DeepSpeechModel()
+    # Decoder profile when the request doesn't pass ?profile= (None uses STT_DEFAULT_PROFILE).
+    decoder_profile = None
 
     def post(self, request, format="audio/wave"):
         """Transcribe the wav audio file speech to text."""
+        response = oversized_upload_response(request)
+        if response:
+            return response
         try:
             wav_file = request.data['file']  # get django InMemoryUploadedFile
         except KeyError:
             return error_response("Audio file must be uploaded", status.HTTP_400_BAD_REQUEST)
-        # audio_stream = wav_file.read()  # convert to bytes stream
-        audio_bytes_stream = decode_using_pyav(wav_file)
-        txt = self.stt.transcribe_batch_with_buffer(audio_bytes_stream)
-        print(f"Transcribed: {txt}")
-        payload = {
-            "data": {
-                "text": txt,
-                "words": len(txt.split())
-            }
-        }
-        return Response(payload, status.HTTP_200_OK)
+        return transcript_response(request, wav_file, self)
 
 
 class VoiceRecognitionMobileAPIView(CreateAPIView):
@@ -60,45 +130,178 @@ class VoiceRecognitionMobileAPIView(CreateAPIView):
     base64 string within the request body, processes this base64 string into an
     audio buffer, and perform the speech to text conversion.
 
+    The base64 string is decoded once into a single buffer that PyAV reads in
+    place. Clients that can send the recording as a raw binary body (any
+    Content-Type, e.g. audio/aac) or as a multipart "file" field skip base64
+    entirely, which keeps memory close to one copy of the audio.
+
     Reference links:
     Write .wav file: https://stackoverflow.com/questions/62587308/python-how-to-use-speech-recognition-or-other-modules-to-convert-base64-audio
-    Initialise io buffer: https://stackoverflow.com/questions/71280669/how-to-convert-base64-format-audio-files-into-wav-files-without-storage-them-on
-    Intialise InMemoryUploadedFile object: https://stackoverflow.com/questions/67244002/how-to-create-inmemoryuploadedfile-objects-proper-in-django
     """
     serializer_class = Base64EncodedStringSerializer
-
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.stt = DeepSpeechModel()
+    parser_classes = [JSONParser, FormParser, MultiPartParser, RawAudioParser]
+    decoder_profile = None
 
     def post(self, request, *args, **kwargs):
         """Transcribe the encoded string audio sent from Mobile to text."""
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        encoded_data = serializer.validated_data['data']
-        decode_bytes = b64decode(encoded_data)
-
-        with BytesIO() as buffer:
-            # Create a buffer
-            buffer.write(decode_bytes)
-            buffer.seek(0)  # go to the start of the buffer
-
-            # Initialise the InMemoryUploadedFile object
-            in_memory_file = InMemoryUploadedFile(
-                buffer,
-                None,
-                "speech.wav",
-                "audio/wave",
-                getsizeof(buffer),
-                "utf-8"
-            )
-            audio_bytes_stream = decode_using_pyav(in_memory_file)
-            txt = self.stt.transcribe_batch_with_buffer(audio_bytes_stream)
-            print(f"Transcribed: {txt}")
-            payload = {
-                "data": {
-                    "text": txt,
-                    "words": len(txt.split())
-                }
-            }
-            return Response(payload, status.HTTP_200_OK)
+        # Allow for base64 expanding the audio by a third.
+        response = oversized_upload_response(
+            request, base64_length(settings.STT_MAX_UPLOAD_BYTES) + 1024)
+        if response:
+            return response
+        if "file" in request.FILES:
+            # Raw binary or multipart upload
+            audio_file = request.FILES["file"]
+        elif "file" in request.data:
+            # e.g. a JSON "file" field, which isn't an upload
+            return error_response(
+                "Upload the file as multipart form data or a raw audio body, or send base64 as \"data\".",
+                status.HTTP_400_BAD_REQUEST)
+        else:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            encoded_data = serializer.validated_data['data']
+            audio_file = BufferReader(decode_base64_audio(encoded_data))
+        return transcript_response(request, audio_file, self)
+
+
+class VoiceRecognitionStatusAPIView(APIView):
+    """API view to inspect the speech to text models and inference pool of this web worker."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """Return the models loaded by each inference worker, the queue depth and timings."""
+        payload = {
+            # Inference runs in the pool workers, so ask them what they have loaded.
+            "workers": pool.worker_info(),
+            "pool": pool.stats(),
+            "metrics": metrics.snapshot(),
+        }
+        return Response(payload, status.HTTP_200_OK)
+
+
+class TranscriptionJobCreateAPIView(CreateAPIView):
+    """CreateAPI view to upload an audio file and transcribe it in the background.
+
+    Returns a job id immediately instead of holding the connection open for the
+    whole decode and inference, so long dictations don't hit load balancer timeouts.
+    """
+    serializer_class = WavFileSerializer
+    parser_classes = [FileUploadParser]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    decoder_profile = None
+
+    def post(self, request, format="audio/wave"):
+        """Store the audio file and queue it for transcription."""
+        response = oversized_upload_response(request)
+        if response:
+            return response
+        try:
+            wav_file = request.data['file']
+        except KeyError:
+            return error_response("Audio file must be uploaded", status.HTTP_400_BAD_REQUEST)
+        try:
+            profile = get_profile(requested_profile(request, self))
+            vocabulary = requested_vocabulary(request)
+        except ValueError as exc:
+            return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+        try:
+            check_audio_limits(wav_file, settings.STT_MAX_UPLOAD_BYTES, settings.STT_MAX_AUDIO_SECONDS)
+        except AudioTooLarge as exc:
+            return too_large_response(exc)
+        job = TranscriptionJob.objects.create(
+            job_audio=wav_file.read(), job_profile=profile,
+            job_clinic_id=vocabulary.clinic_id if vocabulary else None, job_created_by=request.user)
+        enqueue_job(job)
+        return_serializer = TranscriptionJobSerializer(job)
+        return Response(return_serializer.data, status.HTTP_202_ACCEPTED)
+
+
+class TranscriptionJobRetrieveAPIView(RetrieveAPIView):
+    """Get the status and result of a transcription job."""
+    serializer_class = TranscriptionJobSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    queryset = TranscriptionJob.objects.defer("job_audio")
+
+    def get_queryset(self):
+        """Retrieve jobs created by the authenticated user. Admins can see all jobs."""
+        user = self.request.user
+        if user.role == User.Role.ADMIN:
+            return self.queryset.all()
+        return self.queryset.filter(job_created_by=user)
+
+
+class VoiceRecognitionStreamAPIView(APIView):
+    """API view to transcribe audio while it is being uploaded.
+
+    The raw request body (any streamable container, e.g. wav, aac, ogg or webm)
+    is decoded as it arrives and fed to a DeepSpeech stream. The response is
+    newline delimited JSON: ``{"partial": ...}`` lines while audio is coming in,
+    followed by the same ``{"data": {"text", "words"}}`` payload as the other views.
+    """
+    # No parsers: the body is read by the decoder, not buffered by DRF.
+    parser_classes = []
+    decoder_profile = None
+
+    def post(self, request, *args, **kwargs):
+        """Stream partial and final transcripts of the request body."""
+        try:
+            profile = get_profile(requested_profile(request, self))
+            vocabulary = requested_vocabulary(request)
+        except ValueError as exc:
+            return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+        response = oversized_upload_response(request)
+        if response:
+            return response
+        if not stream_slots.acquire(blocking=False):
+            return busy_response(PoolFull(retry_after=1))
+        try:
+            body = BodyReader(request, settings.STT_MAX_UPLOAD_BYTES)
+            transcript = TranscriptStream(
+                body, get_model(profile, vocabulary), verbose=requested_verbose(request))
+        except Exception:
+            # Until the TranscriptStream exists nothing else releases the slot.
+            stream_slots.release()
+            raise
+        return StreamingHttpResponse(transcript, content_type="application/x-ndjson")
+
+
+class VoiceRecognitionBatchAPIView(APIView):
+    """API view to transcribe many audio files in one request.
+
+    Accepts several files in a multipart request (under any field names), or
+    a zip archive of audio files, either as a multipart file or as the raw
+    body. The files are decoded concurrently and transcribed through the
+    shared inference pool. The response is newline delimited JSON with one
+    line per file, in the order they finish: ``{"index", "name", "data"}``
+    or ``{"index", "name", "status", "detail"}`` for files that failed.
+    """
+    parser_classes = [MultiPartParser, RawAudioParser]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    decoder_profile = None
+
+    def post(self, request, *args, **kwargs):
+        """Stream the transcripts of every uploaded file as they finish."""
+        response = oversized_upload_response(request, settings.STT_BATCH_MAX_BYTES)
+        if response:
+            return response
+        try:
+            profile = get_profile(requested_profile(request, self))
+            vocabulary = requested_vocabulary(request)
+        except ValueError as exc:
+            return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+        files = request.FILES
+        # RawAudioParser returns a plain dict with a single "file" rather than a MultiValueDict.
+        getlist = getattr(files, "getlist", lambda field: [files[field]])
+        uploads = [upload for field in files for upload in getlist(field)]
+        batch = BatchTranscription(uploads, profile, requested_verbose(request), vocabulary)
+        try:
+            batch.open()
+        except (ValueError, zipfile.BadZipFile) as exc:
+            batch.close()
+            return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+        return StreamingHttpResponse(batch, content_type="application/x-ndjson")
@@ -0,0 +1,56 @@
+"""Per-clinic vocabularies passed to the inference workers."""
+
+from typing import NamedTuple, Optional, Tuple
+from rest_framework.exceptions import PermissionDenied
+from voice_recognition.models import ClinicVocabulary
+
+
+class Vocabulary(NamedTuple):
+    """A clinic's scorer and hot words, small enough to send to a pool worker with every task."""
+    clinic_id: int
+    # Changes whenever the vocabulary is edited, so workers load the new version.
+    version: str
+    scorer: Optional[str]
+    hot_words: Tuple[Tuple[str, float], ...]
+
+
+def load_vocabulary(clinic_id):
+    """Return the vocabulary of a clinic, or None if it doesn't have one."""
+    if clinic_id is None:
+        return None
+    vocabulary = ClinicVocabulary.objects.filter(vocabulary_clinic_id=clinic_id).first()
+    if vocabulary is None or not (vocabulary.vocabulary_scorer or vocabulary.vocabulary_hot_words):
+        return None
+    return Vocabulary(
+        clinic_id=clinic_id,
+        version=vocabulary.vocabulary_updated_at.isoformat(),
+        scorer=vocabulary.vocabulary_scorer or None,
+        hot_words=tuple(sorted((word, float(boost))
+                               for word, boost in vocabulary.vocabulary_hot_words.items())),
+    )
+
+
+def user_clinic_id(user):
+    """Return the clinic of a signed in doctor or admin, or None."""
+    profile = getattr(user, "profile", None)
+    return getattr(profile, "doctor_clinic_id", None) or getattr(profile, "admin_clinic_id", None)
+
+
+def requested_vocabulary(request):
+    """Return the vocabulary of the clinic chosen with ?clinic=, or else of the user's own clinic.
+
+    Only staff can choose any clinic; other users only their own.
+    Raises ValueError if the clinic id isn't a number, and PermissionDenied
+    for another clinic.
+    """
+    own_clinic_id = user_clinic_id(request.user)
+    clinic_id = request.query_params.get("clinic")
+    if not clinic_id:
+        return load_vocabulary(own_clinic_id)
+    try:
+        clinic_id = int(clinic_id)
+    except ValueError:
+        raise ValueError(f"Invalid clinic '{clinic_id}'.")
+    if clinic_id != own_clinic_id and not request.user.is_staff:
+        raise PermissionDenied("You can only use the vocabulary of your own clinic.")
+    return load_vocabulary(clinic_id)